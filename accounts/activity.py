@@ -0,0 +1,77 @@
+"""
+Coalesced last_access tracking.
+
+Authenticated requests only record a timestamp in an in-process buffer. The
+buffer is handed to a Celery task at most once per LAST_ACCESS_FLUSH_INTERVAL
+seconds, and the task writes every buffered user in a single UPDATE.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class LastAccessBuffer:
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def record(self, user_id):
+        if not settings.LAST_ACCESS_TRACKING:
+            return
+        with self._lock:
+            self._pending[str(user_id)] = timezone.now().isoformat()
+            due = (
+                time.monotonic() - self._last_flush
+                >= settings.LAST_ACCESS_FLUSH_INTERVAL
+            )
+            if not due:
+                return
+            batch, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        self._dispatch(batch)
+
+    def drain(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return batch
+
+    def _dispatch(self, batch):
+        from .tasks import flush_last_access
+
+        try:
+            flush_last_access.delay(batch)
+        except Exception:
+            # Losing one batch of access times must never fail a request.
+            logger.warning("Could not queue last_access flush", exc_info=True)
+
+
+last_access_buffer = LastAccessBuffer()
+
+
+def write_last_access(accesses):
+    """
+    Apply {user_id: iso timestamp} in one UPDATE. Greatest() keeps a newer
+    value already written by another process.
+    """
+    if not accesses:
+        return 0
+    User = get_user_model()
+    whens = [
+        When(pk=user_id, then=Value(parse_datetime(accessed_at)))
+        for user_id, accessed_at in accesses.items()
+    ]
+    return User.objects.filter(pk__in=list(accesses)).update(
+        last_access=Greatest("last_access", Case(*whens, output_field=DateTimeField()))
+    )
@@ -1,6 +1,14 @@
 # accounts/authentication.py
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+
+from .activity import last_access_buffer
+from .tokens import verify_access_token
 
 
 class CustomJWTAuthentication(JWTAuthentication):
@@ -13,7 +21,58 @@ class CustomJWTAuthentication(JWTAuthentication):
         if token is None:
             return None
 
-        # Modify the request to include the token in the header.
-        request.META["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        # Reuses the middleware's verification of this token, if it ran.
+        try:
+            validated_token = verify_access_token(request, token)
+        except TokenError as e:
+            raise InvalidToken({"detail": e.args[0], "code": "token_not_valid"})
+
+        user = self.get_user(validated_token)
+        last_access_buffer.record(user.pk)
+        return user, validated_token
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    A user built from the signed claims of an access token.
+
+    id/pk, email, user_type and store_id are read from the token; touching
+    any other attribute loads the accounts.User row once and delegates to it.
+    """
+
+    def __init__(self, validated_token):
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        super().__init__(lambda: self._load_user(user_id))
+        # Stored on the wrapper itself so reading them never triggers a load.
+        self.__dict__.update(
+            id=user_id,
+            pk=user_id,
+            email=validated_token.get("email"),
+            user_type=validated_token.get("user_type"),
+            store_id=validated_token.get("store_id"),
+            is_active=True,
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+
+    @staticmethod
+    def _load_user(user_id):
+        try:
+            return get_user_model().objects.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+    def __bool__(self):
+        return True
+
+
+class ClaimsJWTAuthentication(CustomJWTAuthentication):
+    """
+    Opt-in (JWT_CLAIMS_USER=True): authenticates without reading the users
+    table; request.user is a ClaimsUser.
+    """
 
-        return super().authenticate(request)
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ClaimsUser(validated_token)
@@ -1,14 +1,21 @@
+import logging
+
 from django.utils.deprecation import MiddlewareMixin
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.conf import settings
-from datetime import datetime, timezone
-import jwt
 from rest_framework_simplejwt.exceptions import TokenError
 
+from .tokens import remember_access_token, verify_access_token
+
+logger = logging.getLogger(__name__)
+
 
 class JWTRefreshMiddleware(MiddlewareMixin):
     def process_request(self, request):
-        print("Middleware called")
+        # Admin, static files and docs don't authenticate with JWT cookies.
+        if not request.path.startswith(settings.JWT_REFRESH_MIDDLEWARE_PATHS):
+            return
+
         refresh_token = request.COOKIES.get(settings.SIMPLE_JWT["AUTH_COOKIE_REFRESH"])
         access_token = request.COOKIES.get(settings.SIMPLE_JWT["AUTH_COOKIE"])
 
@@ -16,37 +23,26 @@ class JWTRefreshMiddleware(MiddlewareMixin):
             return  # No way to refresh without refresh token
 
         try:
-            # Check if the access token is expired using SimpleJWT's built-in check
+            # Verify the access token (signature and expiry); the result is
+            # shared with CustomJWTAuthentication for the rest of the request.
             if access_token:
-                token = AccessToken(access_token)
-                token.check_exp()  # Raises TokenError if expired
+                verify_access_token(request, access_token)
                 return  # Token is valid, no need to refresh
         except TokenError:
-            pass  # Access token is expired
+            pass  # Access token is expired or invalid
         # Try refreshing the access token
         try:
-            # Manually decode refresh token to check its validity
-            decoded = jwt.decode(
-                refresh_token,
-                settings.SIMPLE_JWT["SIGNING_KEY"],
-                algorithms=["HS256"],  # Adjust based on your JWT settings
-            )
-            # Generate a new access token
+            # RefreshToken verifies the signature and expiry itself
             refresh = RefreshToken(refresh_token)
-            new_access_token = str(refresh.access_token)
+            new_access_token = remember_access_token(request, refresh.access_token)
 
             # Add new access token to request
             request.META["HTTP_AUTHORIZATION"] = f"Bearer {new_access_token}"
 
             # Store new access token for response
             request.new_access_token = new_access_token
-            # print("New access token issued via refresh token")
-        except jwt.ExpiredSignatureError:
-            print("Refresh token is expired")
-        except jwt.InvalidTokenError:
-            print("Invalid refresh token")
         except TokenError as e:
-            print(f"Refresh token error: {e}")
+            logger.info("Refresh token error: %s", e)
 
     def process_response(self, request, response):
         if hasattr(request, "new_access_token"):
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_user_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='last_access',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_alter_user_last_access"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["phone_number", "user_type"], name="user_phone_type_idx"
+            ),
+        ),
+    ]
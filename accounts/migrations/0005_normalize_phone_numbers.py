@@ -0,0 +1,48 @@
+import re
+
+from django.db import migrations
+
+# A frozen copy of accounts.phone.normalize_phone_number as it was when this
+# migration was written, with DEFAULT_PHONE_COUNTRY_CODE fixed, so later
+# changes to the live code or settings can't change what it does.
+COUNTRY_CODE = "234"
+SEPARATORS = re.compile(r"[\s().\-/]")
+E164 = re.compile(r"^\+[1-9]\d{6,14}$")
+
+
+def normalize_phone_number(value):
+    number = SEPARATORS.sub("", str(value))
+    whatsapp = number.startswith("whatsapp:")
+    number = number.removeprefix("whatsapp:")
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    elif number.startswith("0"):
+        number = f"+{COUNTRY_CODE}{number[1:]}"
+    elif whatsapp and not number.startswith("+"):
+        number = "+" + number
+    return number if E164.match(number) else None
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    # Rewrite stored numbers in E.164 so WhatsApp lookups are plain equality.
+    # Numbers that can't be read are left as they are.
+    User = apps.get_model("accounts", "User")
+    users = User.objects.exclude(phone_number__isnull=True).exclude(phone_number="")
+    changed = []
+    for user in users.only("id", "phone_number").iterator():
+        normalized = normalize_phone_number(user.phone_number)
+        if normalized and normalized != user.phone_number:
+            user.phone_number = normalized
+            changed.append(user)
+    User.objects.bulk_update(changed, ["phone_number"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser, Group, Permission
 import uuid
 
+from .phone import forget_phone_numbers, normalize_phone_number
+
 
 class User(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -23,7 +26,8 @@ class User(AbstractUser):
     username = models.CharField(max_length=150, unique=True, blank=True, null=True)
     full_name = models.CharField(max_length=255)
     phone_number = models.CharField(max_length=20, blank=True, null=True)  # Optional
-    last_access = models.DateTimeField(auto_now=True)
+    # Maintained in batches by accounts.activity, not on every save.
+    last_access = models.DateTimeField(default=timezone.now)
     is_email_verified = models.BooleanField(default=False)
     address = models.TextField(blank=True, null=True)
     preferred_language = models.CharField(max_length=10, default="en")
@@ -34,6 +38,42 @@ class User(AbstractUser):
 
     class Meta:
         ordering = ["-created_at"]  # newest first
+        indexes = [
+            # WhatsApp webhook: seller lookup by sender number
+            models.Index(
+                fields=["phone_number", "user_type"], name="user_phone_type_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # What the WhatsApp seller lookup last saw, to tell when it's stale
+        user._loaded_phone = (
+            user.__dict__.get("phone_number"),
+            user.__dict__.get("user_type"),
+        )
+        return user
+
+    def save(self, *args, **kwargs):
+        if self.phone_number:
+            self.phone_number = (
+                normalize_phone_number(self.phone_number) or self.phone_number
+            )
+        super().save(*args, **kwargs)
+        loaded_phone_number, loaded_user_type = getattr(
+            self, "_loaded_phone", (None, None)
+        )
+        if (self.phone_number, self.user_type) != (
+            loaded_phone_number,
+            loaded_user_type,
+        ):
+            forget_phone_numbers(loaded_phone_number, self.phone_number)
+            self._loaded_phone = (self.phone_number, self.user_type)
+
+    def delete(self, *args, **kwargs):
+        forget_phone_numbers(self.phone_number)
+        return super().delete(*args, **kwargs)
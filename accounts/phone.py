@@ -0,0 +1,106 @@
+"""
+Phone numbers in E.164 form, and the cached phone -> (seller, store) lookup
+used by the WhatsApp webhook.
+
+Numbers are normalized when they are written (User.save), so finding the
+sender of a message is an indexed equality lookup. The answer is cached,
+including "no such seller", until the seller's number, type or store changes.
+"""
+
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+_SEPARATORS = re.compile(r"[\s().\-/]")
+_E164 = re.compile(r"^\+[1-9]\d{6,14}$")
+
+# Cached for numbers that belong to no seller
+UNKNOWN = "unknown"
+
+
+def normalize_phone_number(value):
+    """
+    Return value in E.164 form (+<country code><number>), or None if it can't
+    be read as a phone number. A WhatsApp address ("whatsapp:+234...") is
+    accepted, "00" is read as the international prefix, and a national number
+    with a leading 0 gets DEFAULT_PHONE_COUNTRY_CODE. Other bare digits are
+    rejected: without a prefix there's no telling where the country code ends.
+    """
+    if not value:
+        return None
+    number = _SEPARATORS.sub("", str(value))
+    whatsapp = number.startswith("whatsapp:")
+    number = number.removeprefix("whatsapp:")
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    elif number.startswith("0"):
+        number = f"+{settings.DEFAULT_PHONE_COUNTRY_CODE}{number[1:]}"
+    elif whatsapp and not number.startswith("+"):
+        # WhatsApp addresses always carry the country code
+        number = "+" + number
+    return number if _E164.match(number) else None
+
+
+def _cache_key(phone_number):
+    return f"seller-phone:{phone_number}"
+
+
+def _lookup(phone_number):
+    from django.contrib.auth import get_user_model
+    from stores.models import Store
+
+    User = get_user_model()
+    # The seller's first store, as in the JWT store_id claim
+    store = Store.objects.filter(owner=models.OuterRef("pk")).order_by("pk")
+    return (
+        User.objects.filter(phone_number=phone_number, user_type="seller")
+        .annotate(store_id=models.Subquery(store.values("id")[:1]))
+        .values_list("id", "store_id")
+        .first()
+    )
+
+
+def resolve_seller(phone_number):
+    """
+    (seller_id, store_id) of the seller registered with phone_number, with
+    store_id None if they have no store yet; None if no seller uses it.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if phone_number is None:
+        return None
+    key = _cache_key(phone_number)
+    resolved = cache.get(key)
+    if resolved is None:
+        resolved = _lookup(phone_number)
+        if resolved is None:
+            resolved = UNKNOWN
+            cache.set(key, UNKNOWN, settings.SELLER_PHONE_NEGATIVE_CACHE_TIMEOUT)
+        else:
+            cache.set(key, resolved, settings.SELLER_PHONE_CACHE_TIMEOUT)
+    return None if resolved == UNKNOWN else tuple(resolved)
+
+
+def forget_phone_numbers(*phone_numbers):
+    """Drop cached resolutions of these numbers once the transaction commits."""
+    keys = [
+        _cache_key(phone_number)
+        for phone_number in map(normalize_phone_number, phone_numbers)
+        if phone_number
+    ]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_sellers(*user_ids):
+    """Drop cached resolutions of these users' numbers (after a store change)."""
+    from django.contrib.auth import get_user_model
+
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if user_ids:
+        forget_phone_numbers(
+            *get_user_model()
+            .objects.filter(id__in=user_ids, phone_number__isnull=False)
+            .values_list("phone_number", flat=True)
+        )
@@ -2,10 +2,25 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.utils.text import slugify
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .phone import normalize_phone_number
 
 User = get_user_model()
 
 
+def validate_phone_number(value):
+    """Store phone numbers in E.164 so the WhatsApp lookup is an equality."""
+    if not value:
+        return value
+    phone_number = normalize_phone_number(value)
+    if phone_number is None:
+        raise serializers.ValidationError(
+            "Enter a valid phone number, e.g. +2348012345678."
+        )
+    return phone_number
+
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True, required=True, validators=[validate_password]
@@ -31,6 +46,9 @@ class UserSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("account_balance", "created_at", "updated_at")
 
+    def validate_phone_number(self, value):
+        return validate_phone_number(value)
+
     def create(self, validated_data):
         validated_data.pop("password2", None)  # Remove password2 from data
 
@@ -104,3 +122,21 @@ class MeUserSerializer(serializers.ModelSerializer):
             # "password2",
         )
         read_only_fields = ("created_at", "updated_at")
+
+    def validate_phone_number(self, value):
+        return validate_phone_number(value)
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Signs the claims ClaimsUser serves without a database read."""
+
+    @classmethod
+    def get_token(cls, user):
+        from stores.models import Store
+
+        token = super().get_token(user)
+        token["email"] = user.email
+        token["user_type"] = user.user_type
+        store_id = Store.objects.filter(owner=user).values_list("id", flat=True).first()
+        token["store_id"] = str(store_id) if store_id else None
+        return token
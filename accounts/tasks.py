@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .activity import write_last_access
+
+
+@shared_task
+def flush_last_access(accesses):
+    """Write a batch of buffered last_access timestamps."""
+    return write_last_access(accesses)
@@ -1,3 +1,253 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from orders.models import Cart
+from stores.models import Store
+from .activity import LastAccessBuffer, write_last_access
+from .authentication import ClaimsJWTAuthentication
+from .phone import normalize_phone_number, resolve_seller
+from .serializers import CustomTokenObtainPairSerializer
+from .tokens import verified_tokens
+
+User = get_user_model()
+
+
+@override_settings(LAST_ACCESS_TRACKING=False)
+class JWTVerificationTests(TestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def set_cookies(self, access_token):
+        self.client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = str(access_token)
+        self.client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE_REFRESH"]] = str(
+            self.refresh
+        )
+
+    def count_decodes(self):
+        return mock.patch.object(
+            TokenBackend, "decode", autospec=True, side_effect=TokenBackend.decode
+        )
+
+    def test_access_token_is_verified_once_per_request(self):
+        self.set_cookies(self.refresh.access_token)
+        with self.count_decodes() as decode:
+            response = self.client.get("/api/v1/accounts/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_verified_token_is_reused_across_requests(self):
+        self.set_cookies(self.refresh.access_token)
+        self.client.get("/api/v1/accounts/me/")
+        with self.count_decodes() as decode:
+            response = self.client.get("/api/v1/accounts/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(decode.call_count, 0)
+
+    def test_non_api_paths_skip_token_handling(self):
+        self.set_cookies(self.refresh.access_token)
+        with self.count_decodes() as decode:
+            self.client.get("/admin/login/")
+        self.assertEqual(decode.call_count, 0)
+
+    def test_expired_access_token_is_refreshed(self):
+        expired = AccessToken.for_user(self.user)
+        expired.set_exp(lifetime=-timedelta(minutes=1))
+        self.set_cookies(expired)
+
+        response = self.client.get("/api/v1/accounts/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(settings.SIMPLE_JWT["AUTH_COOKIE"], response.cookies)
+
+    def test_invalid_access_token_without_refresh_is_rejected(self):
+        self.client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = "not-a-token"
+        response = self.client.get("/api/v1/accounts/me/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(LAST_ACCESS_TRACKING=False)
+class ClaimsUserTests(TestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        self.user = User.objects.create_user(
+            username="seller",
+            email="seller@example.com",
+            password="password",
+            full_name="Ada Seller",
+            user_type="seller",
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.user)
+        self.token = str(
+            CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        )
+        self.request = APIRequestFactory().get("/api/v1/accounts/me/")
+        self.request.COOKIES[settings.SIMPLE_JWT["AUTH_COOKIE"]] = self.token
+
+    def test_claims_are_served_without_reading_the_users_table(self):
+        with self.assertNumQueries(0):
+            user, _ = ClaimsJWTAuthentication().authenticate(self.request)
+            self.assertTrue(user)
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(user.pk, str(self.user.pk))
+            self.assertEqual(user.email, "seller@example.com")
+            self.assertEqual(user.user_type, "seller")
+            self.assertEqual(user.store_id, str(self.store.id))
+
+    def test_other_fields_load_the_user_once(self):
+        user, _ = ClaimsJWTAuthentication().authenticate(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.full_name, "Ada Seller")
+            self.assertEqual(user.username, "seller")
+        self.assertIsInstance(user, User)
+
+    def test_owned_resources_are_filtered_without_loading_the_user(self):
+        self.client = APIClient()
+        self.client.cookies[settings.SIMPLE_JWT["AUTH_COOKIE"]] = self.token
+        Cart.objects.create(user=self.user, store=self.store, status="active")
+
+        # As with JWT_CLAIMS_USER=True, which is read once at startup.
+        with mock.patch.object(
+            APIView, "authentication_classes", [ClaimsJWTAuthentication]
+        ):
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/v1/orders/cart/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["items"], [])
+
+            with self.assertNumQueries(2):
+                response = self.client.get("/api/v1/seller_dashboard/sales/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class LastAccessTests(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(3)
+        ]
+
+    def test_batch_is_written_in_one_query(self):
+        accessed_at = timezone.now() + timedelta(minutes=5)
+        accesses = {str(user.pk): accessed_at.isoformat() for user in self.users}
+        with self.assertNumQueries(1):
+            self.assertEqual(write_last_access(accesses), 3)
+        for user in self.users:
+            user.refresh_from_db()
+            self.assertEqual(user.last_access, accessed_at)
+
+    def test_older_timestamp_does_not_overwrite_newer(self):
+        user = self.users[0]
+        stale = (user.last_access - timedelta(minutes=5)).isoformat()
+        write_last_access({str(user.pk): stale})
+        self.assertGreater(
+            User.objects.get(pk=user.pk).last_access,
+            user.last_access - timedelta(minutes=1),
+        )
+
+    @override_settings(LAST_ACCESS_FLUSH_INTERVAL=3600)
+    def test_buffer_coalesces_until_flush_is_due(self):
+        buffer = LastAccessBuffer()
+        with mock.patch("accounts.tasks.flush_last_access.delay") as delay:
+            for _ in range(5):
+                buffer.record(self.users[0].pk)
+            buffer.record(self.users[1].pk)
+            delay.assert_not_called()
+
+            with override_settings(LAST_ACCESS_FLUSH_INTERVAL=0):
+                buffer.record(self.users[2].pk)
+        delay.assert_called_once()
+        self.assertEqual(
+            set(delay.call_args.args[0]), {str(user.pk) for user in self.users}
+        )
+        self.assertEqual(buffer.drain(), {})
+
+
+class SellerPhoneResolutionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            username="seller",
+            email="seller@example.com",
+            password="password",
+            user_type="seller",
+            phone_number="0803 000 0001",
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+
+    def test_numbers_are_normalized_to_e164(self):
+        self.assertEqual(self.seller.phone_number, "+2348030000001")
+        self.assertEqual(
+            normalize_phone_number("whatsapp:+234 (803) 000-0001"), "+2348030000001"
+        )
+        self.assertEqual(normalize_phone_number("0044 20 7946 0000"), "+442079460000")
+        self.assertIsNone(normalize_phone_number("call me"))
+        # A national number without its leading 0 is not an E.164 number
+        self.assertIsNone(normalize_phone_number("8012345678"))
+        self.assertEqual(
+            normalize_phone_number("whatsapp:2348030000001"), "+2348030000001"
+        )
+
+    def test_resolution_is_cached_including_unknown_numbers(self):
+        sender = "whatsapp:+2348030000001"
+        with self.assertNumQueries(1):
+            resolved = resolve_seller(sender)
+        self.assertEqual(resolved, (self.seller.id, self.store.id))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_seller(sender), resolved)
+
+        resolve_seller("whatsapp:+2348030000002")
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_seller("whatsapp:+2348030000002"))
+
+    def test_phone_and_store_changes_invalidate(self):
+        resolve_seller("+2348030000001")
+        resolve_seller("+2348030000002")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.phone_number = "+234 803 000 0002"
+            self.seller.save()
+        self.assertIsNone(resolve_seller("+2348030000001"))
+        self.assertEqual(
+            resolve_seller("+2348030000002"), (self.seller.id, self.store.id)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.store.delete()
+        self.assertEqual(resolve_seller("+2348030000002"), (self.seller.id, None))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            store = Store.objects.create(name="New Store", owner=self.seller)
+        self.assertEqual(resolve_seller("+2348030000002"), (self.seller.id, store.id))
+
+    def test_register_rejects_unreadable_numbers(self):
+        response = APIClient().post(
+            "/api/v1/auth/register",
+            {
+                "email": "new@example.com",
+                "full_name": "New Seller",
+                "phone_number": "not a number",
+                "user_type": "seller",
+                "password": "S3cure-password!",
+                "password2": "S3cure-password!",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("phone_number", response.data)
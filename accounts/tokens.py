@@ -0,0 +1,94 @@
+"""
+Access-token verification shared by JWTRefreshMiddleware and
+CustomJWTAuthentication.
+
+A token is verified at most once per request (the result is memoised on the
+request) and, once verified, is remembered process-wide for a short while so
+repeat requests with the same cookie skip the signature check entirely.
+"""
+
+import hashlib
+import threading
+import time
+
+from cachetools import TLRUCache
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+_REQUEST_MEMO = "_verified_access_tokens"
+
+
+def _time_to_use(key, token, now):
+    # Never trust a cached token past its own expiry, nor longer than the
+    # configured TTL (bounds exposure after a signing key rotation).
+    return min(token["exp"], now + settings.JWT_VERIFIED_TOKEN_CACHE_TTL)
+
+
+class VerifiedTokenCache:
+    """Thread-safe LRU of verified access tokens keyed by token hash."""
+
+    def __init__(self, maxsize):
+        self._tokens = TLRUCache(maxsize=maxsize, ttu=_time_to_use, timer=time.time)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(raw_token):
+        return hashlib.sha256(raw_token.encode()).hexdigest()
+
+    def get(self, raw_token):
+        with self._lock:
+            return self._tokens.get(self._key(raw_token))
+
+    def add(self, raw_token, token):
+        with self._lock:
+            self._tokens[self._key(raw_token)] = token
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+verified_tokens = VerifiedTokenCache(maxsize=settings.JWT_VERIFIED_TOKEN_CACHE_SIZE)
+
+
+def _request_memo(request):
+    # DRF wraps the Django request; memoise on the underlying one so the
+    # middleware and the authentication class see the same entries.
+    request = getattr(request, "_request", request)
+    memo = getattr(request, _REQUEST_MEMO, None)
+    if memo is None:
+        memo = {}
+        setattr(request, _REQUEST_MEMO, memo)
+    return memo
+
+
+def verify_access_token(request, raw_token):
+    """
+    Return the verified AccessToken for raw_token, raising TokenError if it is
+    invalid or expired.
+    """
+    memo = _request_memo(request)
+    if raw_token in memo:
+        result = memo[raw_token]
+    else:
+        result = verified_tokens.get(raw_token)
+        if result is None:
+            try:
+                result = AccessToken(raw_token)
+                verified_tokens.add(raw_token, result)
+            except TokenError as e:
+                result = e
+        memo[raw_token] = result
+
+    if isinstance(result, TokenError):
+        raise result
+    return result
+
+
+def remember_access_token(request, token):
+    """Record a token minted during this request as already verified."""
+    raw_token = str(token)
+    _request_memo(request)[raw_token] = token
+    verified_tokens.add(raw_token, token)
+    return raw_token
@@ -13,6 +13,7 @@ from .serializers import (
     PasswordResetSerializer,
     PasswordResetConfirmSerializer,
     MeUserSerializer,
+    CustomTokenObtainPairSerializer,
 )
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
@@ -22,6 +23,8 @@ from orders.models import Cart
 from stores.models import Store
 from seller_dashboard.models import Dashboard
 from orders.models import Cart, CartItem
+from stores.cache import bump_store_version
+from seller_dashboard.metrics import customer_joined
 
 
 class RegisterView(APIView):
@@ -36,6 +39,8 @@ class RegisterView(APIView):
                 store_id = request.data.get("store_id")
                 store = Store.objects.get(id=store_id)
                 store.customers.add(user)
+                bump_store_version(store.id)
+                customer_joined(store.id)
                 cart = Cart.objects.create(user=user, store=store)
                 cart.save()
 
@@ -165,6 +170,8 @@ class PasswordResetConfirmView(APIView):
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = CustomTokenObtainPairSerializer
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         if response.status_code == 200:
@@ -0,0 +1,77 @@
+"""
+Load-test the WhatsApp AI gateway offline against FakeBackend and print its
+counters.
+
+    python benchmarks/ai_gateway_load.py [--sellers 50] [--questions 2000] [--distinct 200] [--latency 0.3]
+
+Questions are drawn from a pool of --distinct prompts (with varied case and
+spacing), so the cache hit rate reflects how repetitive the traffic is.
+Budgets are kept in a private in-memory cache, so the run neither reads nor
+wipes the configured one.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from django.test import override_settings
+
+from whatsapp_bot.ai import AIBudgetExceeded, AIGateway, FakeBackend
+
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ai-gateway-load",
+    }
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sellers", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    backend = FakeBackend(latency=args.latency)
+    gateway = AIGateway(backend)
+    prompts = [f"How do I price item {i}?" for i in range(args.distinct)]
+
+    def ask(_):
+        prompt = random.choice(prompts)
+        if random.random() < 0.5:
+            prompt = f"  {prompt.upper()} "
+        try:
+            gateway.ask(random.randrange(args.sellers), prompt)
+        except AIBudgetExceeded:
+            pass
+
+    started = time.monotonic()
+    with override_settings(CACHES=BENCHMARK_CACHES):
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(ask, range(args.questions)))
+    elapsed = time.monotonic() - started
+
+    print(f"{args.questions} questions in {elapsed:.2f}s, {backend.calls} model calls")
+    for name, value in gateway.stats().items():
+        print(
+            f"  {name}: {value:.3f}"
+            if isinstance(value, float)
+            else f"  {name}: {value}"
+        )
+
+
+if __name__ == "__main__":
+    main()
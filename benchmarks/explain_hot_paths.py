@@ -0,0 +1,237 @@
+"""
+Seed a throwaway database and print EXPLAIN plans for the hot lookup paths,
+first without and then with the indexes added by the *_hot_path_indexes
+migrations.
+
+    python benchmarks/explain_hot_paths.py [--stores 50] [--per-store 2000] [--analyze]
+
+Uses a test database created from DATABASES["default"] (test_<name> on
+Postgres), which is destroyed afterwards; the real database is not touched.
+Plans are only meaningful on Postgres.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+import django
+
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from orders.models import Cart, Order
+from products.models import Category, Product
+from seller_dashboard.models import Loan
+from stores.models import Store
+
+User = get_user_model()
+
+# (model, index or constraint name) added for the hot paths
+HOT_PATH_INDEXES = [
+    (User, "user_phone_type_idx"),
+    (Cart, "cart_user_status_idx"),
+    (Cart, "one_active_cart_per_user"),
+    (Order, "order_store_status_idx"),
+    (Order, "order_store_created_idx"),
+    (Order, "order_updated_idx"),
+    (Product, "product_store_created_idx"),
+    (Category, "category_store_name_idx"),
+    (Loan, "loan_borrower_status_idx"),
+]
+
+BATCH_SIZE = 2000
+
+
+def seed(stores, per_store):
+    started = time.monotonic()
+    sellers = User.objects.bulk_create(
+        [
+            User(
+                email=f"seller{i}@bench.test",
+                username=f"seller{i}",
+                user_type="seller",
+                phone_number=f"+234800{i:07d}",
+            )
+            for i in range(stores)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    customers = User.objects.bulk_create(
+        [
+            User(
+                email=f"customer{i}@bench.test",
+                username=f"customer{i}",
+                phone_number=f"+234900{i:07d}",
+            )
+            for i in range(stores * 10)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    store_rows = Store.objects.bulk_create(
+        [Store(owner=seller, name=f"Store {i}") for i, seller in enumerate(sellers)]
+    )
+    Category.objects.bulk_create(
+        [
+            Category(store=store, name=f"Category {j}")
+            for store in store_rows
+            for j in range(20)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    Product.objects.bulk_create(
+        [
+            Product(store=store, name=f"Product {j}", price=j % 100 + 1, stock=10)
+            for store in store_rows
+            for j in range(per_store)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    carts = []
+    for customer in customers:
+        store = random.choice(store_rows)
+        carts.append(Cart(user=customer, store=store, status="active"))
+        carts.extend(
+            Cart(user=customer, store=store, status="inactive") for _ in range(4)
+        )
+    Cart.objects.bulk_create(carts, batch_size=BATCH_SIZE)
+    Order.objects.bulk_create(
+        [
+            Order(
+                user=random.choice(customers),
+                store=store,
+                total_price=random.randint(1, 500),
+                status=random.choice(
+                    ["pending", "delivered", "delivered", "cancelled"]
+                ),
+            )
+            for store in store_rows
+            for _ in range(per_store)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    # Only the latest orders changed since the sales rollup's watermark
+    recent = Order.objects.order_by("-id").values_list("id", flat=True)[per_store]
+    Order.objects.filter(id__lte=recent).update(
+        updated_at=timezone.now() - timedelta(days=30)
+    )
+    Loan.objects.bulk_create(
+        [
+            Loan(
+                borrower=seller,
+                loan_id=f"LOAN-{i}-{n}",
+                loan_type="working capital",
+                purpose="stock",
+                amount=1000,
+                interest_rate=5.0,
+                term_months=12,
+                start_date=date(2025, 1, 1),
+                end_date=date(2025, 1, 1) + timedelta(days=365),
+                status="active" if n == 0 else "closed",
+            )
+            for i, seller in enumerate(sellers)
+            for n in range(3)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    print(f"Seeded in {time.monotonic() - started:.1f}s")
+    return store_rows[len(store_rows) // 2], customers[len(customers) // 2]
+
+
+def hot_paths(store, customer):
+    """The lookups the indexes exist for, as (label, queryset) pairs."""
+    now = timezone.now()
+    return [
+        ("Active cart", Cart.objects.filter(user=customer, status="active")),
+        (
+            "Pending orders",
+            Order.objects.filter(store=store, status="pending").values("id"),
+        ),
+        (
+            "Order history page",
+            Order.objects.filter(store=store).order_by("-created_at", "-id")[:50],
+        ),
+        (
+            "Catalog page",
+            Product.objects.filter(store=store).order_by("created_at", "id")[:50],
+        ),
+        ("Category by name", Category.objects.filter(store=store, name="Category 7")),
+        (
+            "Seller by phone",
+            User.objects.filter(
+                phone_number=store.owner.phone_number, user_type="seller"
+            ),
+        ),
+        ("Active loan", Loan.objects.filter(borrower=store.owner, status="active")),
+        (
+            "Rollup watermark scan",
+            Order.objects.filter(
+                updated_at__gt=now - timedelta(minutes=10), updated_at__lte=now
+            ).values_list("store_id", "created_at"),
+        ),
+    ]
+
+
+def explain_all(paths, analyze):
+    options = {"analyze": True} if analyze and connection.vendor == "postgresql" else {}
+    return {label: queryset.explain(**options) for label, queryset in paths}
+
+
+def set_indexes(enabled):
+    with connection.schema_editor() as editor:
+        for model, name in HOT_PATH_INDEXES:
+            meta = model._meta
+            index = next((i for i in meta.indexes if i.name == name), None)
+            if index is not None:
+                (editor.add_index if enabled else editor.remove_index)(model, index)
+                continue
+            constraint = next(c for c in meta.constraints if c.name == name)
+            (editor.add_constraint if enabled else editor.remove_constraint)(
+                model, constraint
+            )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stores", type=int, default=50)
+    parser.add_argument("--per-store", type=int, default=2000)
+    parser.add_argument(
+        "--analyze", action="store_true", help="EXPLAIN ANALYZE (Postgres only)"
+    )
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        store, customer = seed(args.stores, args.per_store)
+        paths = hot_paths(store, customer)
+
+        set_indexes(False)
+        before = explain_all(paths, args.analyze)
+        set_indexes(True)
+        after = explain_all(paths, args.analyze)
+
+        for label, _ in paths:
+            print(f"\n=== {label} ===")
+            print("-- before --")
+            print(before[label])
+            print("-- after --")
+            print(after[label])
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
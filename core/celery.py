@@ -9,3 +9,4 @@ app.autodiscover_tasks()
 
 # celery -A core worker -l INFO
 # celery -A core worker -l INFO -P solo
+# celery -A core beat -l INFO
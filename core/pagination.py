@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by (created_at, id).
+
+    The cursor carries the last created_at seen, so each page is a range scan
+    from that point instead of an OFFSET, and rows inserted while a client is
+    paging never shift or repeat items. Clients pick the page size with
+    ?page_size=, capped at max_page_size; the default comes from PAGE_SIZE.
+    """
+
+    ordering = ("created_at", "id")
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class NewestFirstCursorPagination(CreatedAtCursorPagination):
+    ordering = ("-created_at", "-id")
@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 from decouple import config
 import dj_database_url
 
@@ -104,6 +105,28 @@ DATABASES = {
     "default": default_db_config,
 }
 
+# Cache
+# Local memory unless CACHE_REDIS_URL is set (production points it at the same
+# Redis instance used as the Celery broker, on its own database number).
+CACHE_REDIS_URL = config("CACHE_REDIS_URL", default="")
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Seconds a serialized storefront payload (products, categories, store) is kept.
+STOREFRONT_CACHE_TIMEOUT = config("STOREFRONT_CACHE_TIMEOUT", default=300, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -148,10 +171,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Opt-in: authenticate from signed token claims without loading the user row.
+JWT_CLAIMS_USER = config("JWT_CLAIMS_USER", default=False, cast=bool)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "accounts.authentication.CustomJWTAuthentication",
+        (
+            "accounts.authentication.ClaimsJWTAuthentication"
+            if JWT_CLAIMS_USER
+            else "accounts.authentication.CustomJWTAuthentication"
+        ),
     ],
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.CreatedAtCursorPagination",
+    "PAGE_SIZE": config("PAGE_SIZE", default=50, cast=int),
 }
 
 SIMPLE_JWT = {
@@ -170,6 +202,17 @@ SIMPLE_JWT = {
 }
 AUTH_USER_MODEL = "accounts.User"
 
+# JWTRefreshMiddleware only runs for these path prefixes.
+JWT_REFRESH_MIDDLEWARE_PATHS = ("/api/",)
+# Verified access tokens are remembered per process (keyed by token hash) for
+# at most JWT_VERIFIED_TOKEN_CACHE_TTL seconds and never past their expiry.
+JWT_VERIFIED_TOKEN_CACHE_SIZE = 4096
+JWT_VERIFIED_TOKEN_CACHE_TTL = 300
+
+# last_access is buffered per process and written at most this often (seconds).
+LAST_ACCESS_TRACKING = config("LAST_ACCESS_TRACKING", default=True, cast=bool)
+LAST_ACCESS_FLUSH_INTERVAL = 60
+
 # smtp
 MAILERSEND_API_KEY = config("MAILERSEND_API_KEY")
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -251,7 +294,76 @@ JAZZMIN_SETTINGS = {
 # celery docker redis works on local
 CELERY_BROKER_URL = "redis://localhost:6379/0"
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
+CELERY_TASK_ALWAYS_EAGER = config("CELERY_TASK_ALWAYS_EAGER", default=False, cast=bool)
+CELERY_BEAT_SCHEDULE = {
+    "refresh-daily-sales": {
+        "task": "seller_dashboard.tasks.refresh_daily_sales",
+        "schedule": config("SALES_ROLLUP_INTERVAL", default=300, cast=int),
+    },
+    "requeue-stale-whatsapp-messages": {
+        "task": "whatsapp_bot.tasks.requeue_stale_messages",
+        "schedule": 60,
+    },
+}
+
+# Orders updated more recently than this are rolled up on the next run
+SALES_ROLLUP_LAG_SECONDS = 60
+
+# WhatsApp webhook: reject requests without a valid X-Twilio-Signature.
+# WHATSAPP_WEBHOOK_URL is the public URL configured in Twilio, needed when a
+# proxy changes the scheme or host Django sees.
+TWILIO_ACCOUNT_SID = config("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = config("TWILIO_AUTH_TOKEN")
+TWILIO_VALIDATE_SIGNATURE = config("TWILIO_VALIDATE_SIGNATURE", default=True, cast=bool)
+WHATSAPP_WEBHOOK_URL = config("WHATSAPP_WEBHOOK_URL", default="")
+# Messages still unprocessed this long after arriving (or after a worker
+# claimed them) are queued again by requeue_stale_messages
+WHATSAPP_STALE_AFTER = 10 * 60
+# Phone numbers are stored in E.164; national numbers (leading 0) get this
+# country code. Seller lookups by WhatsApp number are cached, unknown numbers
+# for less time.
+DEFAULT_PHONE_COUNTRY_CODE = config("DEFAULT_PHONE_COUNTRY_CODE", default="234")
+SELLER_PHONE_CACHE_TIMEOUT = 24 * 60 * 60
+SELLER_PHONE_NEGATIVE_CACHE_TIMEOUT = 5 * 60
+
+# WhatsApp `ai` command (see whatsapp_bot.ai): model backend, answer cache,
+# and per-seller budgets (questions in flight, questions per window)
+GOOGLE_GENERATIVE_AI_API_KEY = config("GOOGLE_GENERATIVE_AI_API_KEY", default="")
+AI_BACKEND = config("AI_BACKEND", default="whatsapp_bot.ai.GeminiBackend")
+AI_MODEL = "gemini-2.0-flash-lite"
+AI_CACHE_SIZE = 512
+AI_CACHE_TTL = 60 * 60
+AI_MAX_CONCURRENT_PER_SELLER = 2
+AI_RATE_LIMIT = config("AI_RATE_LIMIT", default=30, cast=int)
+AI_RATE_WINDOW = 60 * 60
+AI_REQUEST_TIMEOUT = 60
+# Longest WhatsApp message; longer list replies are paged (see
+# whatsapp_bot.pages) and the remaining pages kept this long for `more`
+WHATSAPP_MESSAGE_LIMIT = 1600
+WHATSAPP_PAGES_TIMEOUT = 30 * 60
+# Parallel media downloads/uploads per WhatsApp message, and per-file timeout
+WHATSAPP_MEDIA_WORKERS = 8
+WHATSAPP_MEDIA_TIMEOUT = 30
+
+# Product image uploads: parallel Cloudinary uploads per request, and where
+# deferred uploads are spooled for the Celery worker (must be shared with it)
+PRODUCT_IMAGE_UPLOAD_WORKERS = 4
+PRODUCT_IMAGE_SPOOL_DIR = config(
+    "PRODUCT_IMAGE_SPOOL_DIR",
+    default=os.path.join(tempfile.gettempdir(), "ecomx-image-spool"),
+)
 
+# Bulk catalog import (products.catalog_import): products per INSERT
+CATALOG_IMPORT_BATCH_SIZE = 500
+
+# Responsive image variants, rendered after upload: longest edge in pixels.
+# Clients pick one with ?variant=; the backend decides where the files live.
+IMAGE_VARIANTS = {"thumbnail": 160, "card": 480, "full": 1600}
+DEFAULT_IMAGE_VARIANT = "full"
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_BACKEND = config(
+    "IMAGE_VARIANT_BACKEND", default="products.variants.CloudinaryVariantBackend"
+)
 
 # Use Cloudinary for default file storage
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
@@ -1,7 +1,21 @@
 from django.contrib import admin
+from django.db import transaction
 
+from seller_dashboard.metrics import order_placed, order_status_changed
 from .models import Cart, CartItem, Order
 
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    # Keep store metrics in step with orders edited by staff.
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if not change:
+                order_placed(obj)
+            elif "status" in form.changed_data:
+                order_status_changed(obj, form.initial["status"])
+
+
 admin.site.register(CartItem)
 admin.site.register(Cart)
-admin.site.register(Order)
@@ -0,0 +1,99 @@
+"""
+Cart writes that must not lose updates under concurrent requests.
+"""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum, Window
+
+from products.models import primary_image
+from products.variants import variant_url
+from .models import CartItem
+from .pricing import LINE_TOTAL
+
+
+def add_cart_lines(cart, quantities):
+    """
+    Add quantities ({product_id: quantity}) to the cart's lines in a single
+    INSERT ... ON CONFLICT DO UPDATE, so concurrent adds of the same product
+    accumulate instead of overwriting each other. Relies on the
+    unique_cart_product constraint.
+    """
+    if not quantities:
+        return
+    quote = connection.ops.quote_name
+    table = quote(CartItem._meta.db_table)
+    rows = sorted(quantities.items())
+    values = ", ".join(["(%s, %s, %s)"] * len(rows))
+    params = []
+    for product_id, quantity in rows:
+        params.extend([cart.id, product_id, quantity])
+
+    sql = (
+        f"INSERT INTO {table} ({quote('cart_id')}, {quote('product_id')}, {quote('quantity')}) "
+        f"VALUES {values} "
+        f"ON CONFLICT ({quote('cart_id')}, {quote('product_id')}) "
+        f"DO UPDATE SET {quote('quantity')} = {table}.{quote('quantity')} + excluded.{quote('quantity')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _line_rows(cart, product_ids=None):
+    items = CartItem.objects.filter(cart=cart, product__isnull=False)
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    return (
+        items.annotate(
+            product_image=primary_image("product_id"),
+            product_image_variants=primary_image("product_id", "variants"),
+            line_total=LINE_TOTAL,
+        )
+        .values(
+            "id",
+            "product_id",
+            "product__name",
+            "product__price",
+            "quantity",
+            "line_total",
+            "product_image",
+            "product_image_variants",
+        )
+        .order_by("product_id")
+    )
+
+
+def _line(row, variant):
+    return {
+        "id": row["product_id"],
+        "product_name": row["product__name"],
+        "quantity": row["quantity"],
+        "price": row["product__price"],
+        "line_total": row["line_total"],
+        "product_image": variant_url(
+            row["product_image_variants"], row["product_image"], variant
+        ),
+    }
+
+
+def cart_lines(cart, product_ids=None, variant="thumbnail"):
+    """
+    The cart's lines with product name, price, line total and primary image (as
+    the given variant) in one joined query, shaped for API responses.
+    """
+    return [_line(row, variant) for row in _line_rows(cart, product_ids)]
+
+
+def cart_contents(cart, variant="thumbnail"):
+    """
+    Return (lines, subtotal) for the whole cart from the same single query; the
+    subtotal is a window Sum over the line totals.
+    """
+    rows = list(
+        _line_rows(cart).annotate(
+            subtotal=Window(Sum(LINE_TOTAL), output_field=LINE_TOTAL.output_field)
+        )
+    )
+    subtotal = rows[0]["subtotal"] if rows else Decimal("0")
+    return [_line(row, variant) for row in rows], subtotal
@@ -0,0 +1,111 @@
+"""
+Checkout: converts a user's active cart into an order as one atomic unit of
+work with a fixed number of queries, however many lines the cart has.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Now
+
+from products.models import Product
+from seller_dashboard.metrics import order_placed, order_status_changed
+from seller_dashboard.models import Dashboard
+from stores.cache import bump_store_version
+from .models import Cart, Order
+from .pricing import price_cart, snapshot_lines
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for products: {product_ids}")
+
+
+def reserve_stock(quantities):
+    """
+    Decrement stock for {product_id: quantity} in a single UPDATE that only
+    touches rows with enough stock. Raises OutOfStock (rolling back the
+    enclosing transaction) unless every product could be decremented.
+    """
+    has_stock = Q()
+    decrements = []
+    for product_id, quantity in quantities.items():
+        has_stock |= Q(id=product_id, stock__gte=quantity)
+        decrements.append(When(id=product_id, then=Value(quantity)))
+
+    updated = Product.objects.filter(has_stock).update(
+        stock=F("stock") - Case(*decrements, output_field=IntegerField()),
+        updated_at=Now(),
+    )
+    if updated != len(quantities):
+        short = [
+            product_id
+            for product_id, stock in Product.objects.filter(
+                id__in=list(quantities)
+            ).values_list("id", "stock")
+            if stock < quantities[product_id]
+        ]
+        raise OutOfStock(sorted(short) or sorted(quantities))
+
+
+@transaction.atomic
+def place_order(user_id, payment_method=None, shipping_address=None):
+    # Lock the cart row: a concurrent checkout of the same cart blocks here
+    # and then no longer finds it active.
+    cart = (
+        Cart.objects.select_for_update(of=("self",))
+        .select_related("store")
+        .get(user_id=user_id, status="active")
+    )
+
+    lines, total_price = price_cart(cart)
+    if not lines:
+        raise EmptyCart("Your cart is empty.")
+
+    reserve_stock({line["product_id"]: line["total_quantity"] for line in lines})
+
+    order = Order.objects.create(
+        cart=cart,
+        user_id=user_id,
+        store=cart.store,
+        total_price=total_price,
+        status="pending",
+        payment_method=payment_method,
+        shipping_address=shipping_address,
+    )
+    snapshot_lines(order, lines)
+
+    Cart.objects.filter(id=cart.id).update(status="inactive")
+    Cart.objects.create(user_id=user_id, store=cart.store, status="active")
+
+    order_placed(order)
+    Dashboard.objects.filter(owner_id=cart.store.owner_id).update(
+        eligibility_score=F("eligibility_score") + 10
+    )
+
+    # Stock is part of the storefront product payload.
+    bump_store_version(cart.store_id)
+    return order
+
+
+@transaction.atomic
+def change_order_status(store, order_id, new_status):
+    """
+    Move one of the store's orders to new_status, updating the store's metrics
+    in the same transaction. Raises Order.DoesNotExist for unknown orders.
+    """
+    order = Order.objects.select_for_update().get(id=order_id, store=store)
+    previous_status = order.status
+    if previous_status != new_status:
+        order.status = new_status
+        order.save(update_fields=["status", "updated_at"])
+        order_status_changed(order, previous_status)
+    return order
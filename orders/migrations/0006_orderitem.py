@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_order_items(apps, schema_editor):
+    # Orders placed before line snapshots existed are priced from their cart
+    # at the current product price; that is the best record left.
+    Order = apps.get_model("orders", "Order")
+    CartItem = apps.get_model("orders", "CartItem")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    items = []
+    for order in Order.objects.filter(cart__isnull=False).iterator():
+        for cart_item in CartItem.objects.filter(
+            cart_id=order.cart_id, product__isnull=False
+        ).select_related("product"):
+            items.append(
+                OrderItem(
+                    order=order,
+                    product=cart_item.product,
+                    product_name=cart_item.product.name,
+                    unit_price=cart_item.product.price,
+                    quantity=cart_item.quantity,
+                )
+            )
+    OrderItem.objects.bulk_create(items, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_alter_order_status_alter_order_store'),
+        ('products', '0004_category_updated_at_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=255)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.order')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='products.product')),
+            ],
+        ),
+        migrations.RunPython(backfill_order_items, migrations.RunPython.noop),
+    ]
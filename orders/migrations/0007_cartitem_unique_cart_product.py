@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # Fold repeated (cart, product) lines into the oldest one before the
+    # unique constraint is added.
+    CartItem = apps.get_model("orders", "CartItem")
+    duplicates = (
+        CartItem.objects.filter(cart__isnull=False, product__isnull=False)
+        .values("cart_id", "product_id")
+        .annotate(lines=Count("id"), keep=Min("id"), total=Sum("quantity"))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        CartItem.objects.filter(id=row["keep"]).update(quantity=row["total"])
+        CartItem.objects.filter(
+            cart_id=row["cart_id"], product_id=row["product_id"]
+        ).exclude(id=row["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_orderitem'),
+        ('products', '0004_category_updated_at_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def deactivate_extra_active_carts(apps, schema_editor):
+    # Keep each user's newest active cart before enforcing one per user.
+    Cart = apps.get_model("orders", "Cart")
+    duplicates = (
+        Cart.objects.filter(status="active")
+        .values("user_id")
+        .annotate(carts=Count("id"), keep=Max("id"))
+        .filter(carts__gt=1)
+    )
+    for row in duplicates:
+        Cart.objects.filter(user_id=row["user_id"], status="active").exclude(
+            id=row["keep"]
+        ).update(status="inactive")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_order_updated_at"),
+        ("stores", "0006_store_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cart",
+            index=models.Index(fields=["user", "status"], name="cart_user_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["store", "status"], name="order_store_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["store", "-created_at", "-id"], name="order_store_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ),
+        migrations.RunPython(deactivate_extra_active_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cart",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "active")),
+                fields=("user",),
+                name="one_active_cart_per_user",
+            ),
+        ),
+    ]
@@ -11,6 +11,19 @@ class Cart(models.Model):
     store = models.ForeignKey(Store, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, default="active")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "status"], name="cart_user_status_idx"),
+        ]
+        constraints = [
+            # A user has at most one active cart; also serves active-cart lookups.
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(status="active"),
+                name="one_active_cart_per_user",
+            ),
+        ]
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(
@@ -19,6 +32,14 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            # One line per product; AddToCart upserts against this.
+            models.UniqueConstraint(
+                fields=["cart", "product"], name="unique_cart_product"
+            )
+        ]
+
 
 class Order(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, null=True)
@@ -37,4 +58,41 @@ class Order(models.Model):
     )
     payment_method = models.CharField(max_length=200, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     shipping_address = models.CharField(max_length=300, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["store", "status"], name="order_store_status_idx"),
+            # Order history, newest first
+            models.Index(
+                fields=["store", "-created_at", "-id"], name="order_store_created_idx"
+            ),
+            # Sales rollup watermark scans
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ]
+
+
+class OrderItem(models.Model):
+    """
+    A line of a placed order. Name, unit price and quantity are snapshotted at
+    checkout, so order history never depends on the live catalog. Rows are
+    immutable once created.
+    """
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(
+        Product, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    product_name = models.CharField(max_length=255)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Order items are immutable once created.")
+        super().save(*args, **kwargs)
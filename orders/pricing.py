@@ -0,0 +1,50 @@
+"""
+Cart pricing computed in the database.
+"""
+
+from decimal import Decimal
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+from .models import CartItem, OrderItem
+
+LINE_TOTAL = ExpressionWrapper(
+    F("quantity") * F("product__price"),
+    output_field=DecimalField(max_digits=12, decimal_places=2),
+)
+
+
+def price_cart(cart):
+    """
+    Return (lines, total) for a cart in one query. Each line is a dict with
+    product_id, product_name, unit_price, total_quantity and line_total, where
+    line_total is Sum(quantity * price) computed by the database; duplicate
+    lines for a product are merged.
+    """
+    lines = list(
+        CartItem.objects.filter(cart=cart, product__isnull=False)
+        .values("product_id")
+        .annotate(
+            product_name=F("product__name"),
+            unit_price=F("product__price"),
+            line_total=Sum(LINE_TOTAL),
+            total_quantity=Sum("quantity"),
+        )
+        .order_by("product_id")
+    )
+    total = sum((line["line_total"] for line in lines), Decimal("0"))
+    return lines, total
+
+
+def snapshot_lines(order, lines):
+    """Persist priced cart lines as the order's immutable line items."""
+    return OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            product_id=line["product_id"],
+            product_name=line["product_name"],
+            unit_price=line["unit_price"],
+            quantity=line["total_quantity"],
+        )
+        for line in lines
+    )
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Cart, CartItem, Order
 from stores.models import Store
 from products.models import Product
+from products.variants import requested_variant, variant_url
 
 # If you have a ProductSerializer already, you can import it; otherwise, here’s a simple one.
 # from products.serializers import ProductSerializer
@@ -25,7 +26,8 @@ class ProductSerializer(serializers.ModelSerializer):
         # get all images of the product and return the url of the first one if it exists
         images = obj.images.all()
         if images:
-            return images[0].image.url
+            variant = requested_variant(self.context.get("request"), "thumbnail")
+            return variant_url(images[0].variants, images[0].image, variant)
         return None
 
 
@@ -42,6 +44,16 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ("product", "product_id", "quantity")  # "id"
 
 
+class CartLineSerializer(serializers.Serializer):
+    # One {product_id, quantity} line of an add-to-cart request.
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class OrderStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order._meta.get_field("status").choices)
+
+
 class CartSerializer(serializers.ModelSerializer):
     # Represent the user as a string (for example, username); set this from the authenticated user in your view.
     user = serializers.StringRelatedField(read_only=True)
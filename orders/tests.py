@@ -1,10 +1,16 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from rest_framework.test import APIClient
 from rest_framework import status
 from stores.models import Store
-from products.models import Product
-from orders.models import Cart, CartItem, Order
+from products.models import Image, Product
+from orders.models import Cart, CartItem, Order, OrderItem
+from seller_dashboard.metrics import rebuild_store_metrics
+from seller_dashboard.models import Dashboard, StoreMetrics
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 User = get_user_model()
 
@@ -25,10 +31,10 @@ class CartAndOrderTests(TestCase):
 
         # Create products
         self.product1 = Product.objects.create(
-            name="Leather Jacket", price=79.99, store=self.store
+            name="Leather Jacket", price=79.99, store=self.store, stock=10
         )
         self.product2 = Product.objects.create(
-            name="Leather Jacket 2", price=67.99, store=self.store
+            name="Leather Jacket 2", price=67.99, store=self.store, stock=10
         )
 
         # Create a cart for the user
@@ -42,18 +48,23 @@ class CartAndOrderTests(TestCase):
         """Test adding a product to the cart."""
         data = {"product_id": self.product1.id, "quantity": 2}
 
-        response = self.client.post("/api/cart/add/", data, format="json")
+        response = self.client.post("/api/v1/orders/cart/add/", data, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(response.data["message"], "Product added to cart!")
+        # Added to the existing line of the active cart, which is returned
+        self.assertEqual(response.data["id"], self.product1.id)
+        self.assertEqual(response.data["product_name"], "Leather Jacket")
+        self.assertEqual(response.data["quantity"], 4)
+        self.assertEqual(CartItem.objects.get(cart=self.cart).quantity, 4)
 
     def test_view_cart(self):
         """Test retrieving cart items."""
-        response = self.client.get("/api/cart/")
+        response = self.client.get("/api/v1/orders/cart/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["product_name"], "Leather Jacket")
+        self.assertEqual(len(response.data["items"]), 1)
+        self.assertEqual(response.data["items"][0]["product_name"], "Leather Jacket")
+        self.assertEqual(response.data["subtotal"], Decimal("159.98"))
 
     def test_place_order(self):
         """Test placing an order."""
@@ -63,10 +74,19 @@ class CartAndOrderTests(TestCase):
             "shipping_address": "123 Test St, NY",
         }
 
-        response = self.client.post("/api/orders/create/", data, format="json")
+        response = self.client.post("/api/v1/orders/create/", data, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn("order_id", response.data)
+        order = Order.objects.get(id=response.data["order_id"])
+        self.assertEqual(order.total_price, Decimal("159.98"))
+        self.assertEqual(
+            list(order.items.values_list("product_name", "unit_price", "quantity")),
+            [("Leather Jacket", Decimal("79.99"), 2)],
+        )
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 8)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.status, "inactive")
 
     def test_get_order_details(self):
         """Test retrieving order details."""
@@ -78,9 +98,299 @@ class CartAndOrderTests(TestCase):
             total_price=159.98,
             status="pending",
         )
+        OrderItem.objects.create(
+            order=order,
+            product=self.product1,
+            product_name="Leather Jacket",
+            unit_price=Decimal("79.99"),
+            quantity=2,
+        )
+        # The line is a snapshot: later catalog edits don't change it.
+        Product.objects.filter(id=self.product1.id).update(
+            name="Renamed", price=Decimal("1.00")
+        )
 
-        response = self.client.get(f"/api/orders/{order.id}/")
+        response = self.client.get(f"/api/v1/orders/{order.id}/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["status"], "pending")
-        self.assertEqual(response.data["items"][0]["product"], "Leather Jacket")
+        self.assertEqual(
+            response.data["items"],
+            [
+                {
+                    "product": "Leather Jacket",
+                    "quantity": 2,
+                    "price": Decimal("79.99"),
+                    "line_total": Decimal("159.98"),
+                }
+            ],
+        )
+
+
+class AddToCartTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.customer)
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.products = [
+            Product.objects.create(name=f"Product {i}", price=10, store=self.store)
+            for i in range(3)
+        ]
+
+    def add(self, data):
+        return self.client.post("/api/v1/orders/cart/add/", data, format="json")
+
+    def test_add_creates_cart_and_accumulates_quantity(self):
+        product = self.products[0]
+        response = self.add({"product_id": product.id, "quantity": 2})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["quantity"], 2)
+
+        response = self.add({"product_id": product.id, "quantity": 3})
+        self.assertEqual(response.data["id"], product.id)
+        self.assertEqual(response.data["quantity"], 5)
+        self.assertEqual(response.data["product_image"], None)
+
+        cart = Cart.objects.get(user=self.customer, status="active")
+        self.assertEqual(cart.store, self.store)
+        self.assertEqual(CartItem.objects.get(cart=cart).quantity, 5)
+
+    def test_batch_add_merges_lines(self):
+        first, second, _ = self.products
+        second.images.add(Image.objects.create(image="image/upload/v1/shoe.jpg"))
+        response = self.add(
+            {
+                "items": [
+                    {"product_id": first.id, "quantity": 1},
+                    {"product_id": second.id, "quantity": 4},
+                    {"product_id": first.id, "quantity": 2},
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(item["id"], item["quantity"]) for item in response.data["items"]],
+            [(first.id, 3), (second.id, 4)],
+        )
+        self.assertTrue(response.data["items"][1]["product_image"].endswith("shoe.jpg"))
+
+    def test_add_query_count_is_independent_of_batch_size(self):
+        Cart.objects.create(user=self.customer, store=self.store)
+        # products, cart, upsert, response fetch
+        with self.assertNumQueries(4):
+            self.add({"product_id": self.products[0].id})
+        with self.assertNumQueries(4):
+            self.add({"items": [{"product_id": p.id} for p in self.products]})
+
+    def test_unknown_product_is_rejected(self):
+        response = self.add({"items": [{"product_id": 0}]})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data["product_ids"], [0])
+        self.assertFalse(CartItem.objects.exists())
+
+    def view_cart_with(self, count):
+        cart = Cart.objects.create(user=self.customer, store=self.store)
+        for i in range(count):
+            product = Product.objects.create(
+                name=f"Line {i}", price=2, store=self.store
+            )
+            product.images.add(Image.objects.create(image=f"image/upload/v1/{i}.jpg"))
+            CartItem.objects.create(cart=cart, product=product, quantity=3)
+        # active cart, lines
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/orders/cart/")
+        cart.delete()
+        return response
+
+    def test_view_cart_query_count_is_constant(self):
+        small = self.view_cart_with(1)
+        large = self.view_cart_with(100)
+
+        self.assertEqual(small.data["subtotal"], 6)
+        self.assertEqual(large.data["subtotal"], 600)
+        self.assertEqual(len(large.data["items"]), 100)
+        self.assertEqual(large.data["items"][0]["line_total"], 6)
+
+    def test_view_empty_cart(self):
+        response = self.client.get(
+            "/api/v1/orders/cart/", {"store_id": str(self.store.id)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"items": [], "subtotal": 0})
+
+    def test_invalid_quantity_is_rejected(self):
+        response = self.add({"product_id": self.products[0].id, "quantity": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.customer)
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.dashboard = Dashboard.objects.create(owner=self.seller)
+        StoreMetrics.objects.create(store=self.store)
+        self.cart = Cart.objects.create(user=self.customer, store=self.store)
+
+    def add_products(self, count, stock=5, quantity=2):
+        products = []
+        for i in range(count):
+            product = Product.objects.create(
+                name=f"Product {i}", price=10, stock=stock, store=self.store
+            )
+            CartItem.objects.create(cart=self.cart, product=product, quantity=quantity)
+            products.append(product)
+        return products
+
+    def checkout(self):
+        return self.client.post(
+            "/api/v1/orders/create/",
+            {"payment_method": "card", "shipping_address": "123 Test St"},
+            format="json",
+        )
+
+    def test_checkout_decrements_stock_and_converts_cart(self):
+        products = self.add_products(2)
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 3)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.status, "inactive")
+        self.assertTrue(
+            Cart.objects.filter(user=self.customer, status="active").exists()
+        )
+        self.dashboard.refresh_from_db()
+        self.assertEqual(self.dashboard.eligibility_score, 10)
+        metrics = StoreMetrics.objects.get(store=self.store)
+        self.assertEqual(metrics.total_orders, 1)
+        self.assertEqual(metrics.pending_orders, 1)
+        self.assertEqual(metrics.total_revenue, 40)
+
+    def test_oversell_fails_without_side_effects(self):
+        in_stock, short = self.add_products(2)
+        short.stock = 1
+        short.save()
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data["product_ids"], [short.id])
+        in_stock.refresh_from_db()
+        self.assertEqual(in_stock.stock, 5)
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.status, "active")
+        self.assertFalse(Order.objects.exists())
+        self.dashboard.refresh_from_db()
+        self.assertEqual(self.dashboard.eligibility_score, 0)
+        self.assertEqual(StoreMetrics.objects.get(store=self.store).total_orders, 0)
+
+    def test_cart_cannot_be_checked_out_twice(self):
+        self.add_products(1)
+        self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+        # The replacement cart is empty.
+        self.assertEqual(self.checkout().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_query_count_is_independent_of_cart_size(self):
+        self.add_products(1)
+        with CaptureQueriesContext(connection) as small:
+            self.checkout()
+
+        self.cart = Cart.objects.get(user=self.customer, status="active")
+        self.add_products(20)
+        with CaptureQueriesContext(connection) as large:
+            self.checkout()
+
+        self.assertEqual(len(small), len(large))
+
+    def test_total_accounts_for_quantity(self):
+        self.add_products(2, quantity=3)
+        response = self.checkout()
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_price, 60)
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(sum(item.line_total for item in order.items.all()), 60)
+
+    def test_order_detail_reads_checkout_snapshot(self):
+        (product,) = self.add_products(1, quantity=2)
+        self.checkout()
+        order = Order.objects.get()
+
+        product.name = "Renamed"
+        product.price = 99
+        product.save()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/v1/orders/{order.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (item,) = response.data["items"]
+        self.assertEqual(item["product"], "Product 0")
+        self.assertEqual(item["price"], 10)
+        self.assertEqual(item["line_total"], 20)
+
+    def test_order_items_are_immutable(self):
+        self.add_products(1)
+        self.checkout()
+        item = Order.objects.get().items.get()
+        item.quantity = 5
+        with self.assertRaises(ValueError):
+            item.save()
+
+
+class OrderDashboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.seller)
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        statuses = ["pending", "pending", "delivered", "cancelled"]
+        for i, order_status in enumerate(statuses):
+            customer = User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password",
+                first_name="Ada" if i == 0 else "",
+            )
+            Order.objects.create(
+                user=customer, store=self.store, total_price=10, status=order_status
+            )
+        rebuild_store_metrics(self.store.id)
+
+    def test_summary_and_history_in_constant_queries(self):
+        # store, summary aggregate, history page
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/orders/", {"page_size": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["order_summary"],
+            {"new_orders": 4, "pending_orders": 2, "delivered": 1},
+        )
+        history = response.data["order_history"]
+        self.assertEqual(len(history), 3)
+        self.assertEqual(
+            [order["customer_name"] for order in history],
+            ["customer3", "customer2", "customer1"],
+        )
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["order_history"][0]["customer_name"], "Ada")
@@ -4,6 +4,7 @@ from .views import (
     ViewCartAPIView,
     CreateOrderAPIView,
     OrderDetailAPIView,
+    OrderStatusAPIView,
     ListOrderAPIView,
 )
 
@@ -14,4 +15,5 @@ urlpatterns = [
     path("cart/", ViewCartAPIView.as_view(), name="cart-view"),
     path("create/", CreateOrderAPIView.as_view(), name="order-create"),
     path("<int:order_id>/", OrderDetailAPIView.as_view(), name="order-detail"),
+    path("<int:order_id>/status/", OrderStatusAPIView.as_view(), name="order-status"),
 ]
@@ -4,59 +4,69 @@ from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from .models import Cart, CartItem, Order
 from products.models import Product
+from products.variants import requested_variant
 from stores.models import Store
 from .serializers import (
     CartSerializer,
     OrderSerializer,
-    ProductSerializer,
-    CartItemSerializer,
+    CartLineSerializer,
+    OrderStatusSerializer,
 )
-from django.db.models import Sum
+from .cart import add_cart_lines, cart_contents, cart_lines
 
 
 class AddToCartAPIView(APIView):
     """
     POST /api/cart/add/
-    Adds a product to the user's active cart.
+    Adds a product to the user's active cart. Send {"items": [{product_id,
+    quantity}, ...]} instead to add a whole local cart in one request.
     """
 
     def post(self, request):
-        user = request.user  # Get the logged-in user
-        product_id = request.data.get("product_id")
-        quantity = request.data.get("quantity", 1)
-
-        product = get_object_or_404(Product, id=product_id)
-        store = product.store
+        batch = "items" in request.data
+        lines = request.data.get("items") if batch else [request.data]
+
+        serializer = CartLineSerializer(data=lines, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        quantities = {}
+        for line in serializer.validated_data:
+            product_id = line["product_id"]
+            quantities[product_id] = quantities.get(product_id, 0) + line["quantity"]
+
+        stores = dict(
+            Product.objects.filter(id__in=quantities).values_list("id", "store_id")
+        )
+        missing = sorted(set(quantities) - set(stores))
+        if missing:
+            return Response(
+                {"error": "Product not found.", "product_ids": missing},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
         # Get or create an active cart for the user
         cart, created = Cart.objects.get_or_create(
-            user=user, status="active"
-        )  # store=store,
+            user_id=request.user.id,
+            status="active",
+            defaults={"store_id": stores[next(iter(quantities))]},
+        )
 
-        # Check if product already exists in the cart
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        if not created:
-            cart_item.quantity += int(quantity)
-        else:
-            cart_item.quantity = int(quantity)
-        cart_item.save()
-        serializer = CartItemSerializer(cart_item)
-        data = serializer.data
-        temp_result = serializer.data.copy()
-        final_result = {}
-        final_result["id"] = temp_result["product"]["id"]
-        final_result["product_name"] = temp_result["product"]["name"]
-        final_result["quantity"] = temp_result["quantity"]
-        final_result["price"] = temp_result["product"]["price"]
-        final_result["product_image"] = temp_result["product"]["product_image"]
-        return Response(final_result, status=status.HTTP_201_CREATED)
+        add_cart_lines(cart, quantities)
+        items = cart_lines(
+            cart,
+            product_ids=quantities,
+            variant=requested_variant(request, "thumbnail"),
+        )
+        if batch:
+            return Response({"items": items}, status=status.HTTP_201_CREATED)
+        return Response(items[0], status=status.HTTP_201_CREATED)
 
     def delete(self, request):
-        user = request.user
         product_id = request.data.get("product_id")
         product = get_object_or_404(Product, id=product_id)
         store = product.store
-        cart = Cart.objects.get(user=user, status="active")  # store=store,
+        cart = Cart.objects.get(
+            user_id=request.user.id, status="active"
+        )  # store=store,
         cart_item = CartItem.objects.get(cart=cart, product=product)
         cart_item.delete()
         return Response(
@@ -98,93 +108,58 @@ from rest_framework import status
 from django.shortcuts import get_object_or_404
 from stores.models import Store
 from orders.models import Cart, CartItem
-from seller_dashboard.models import Dashboard
+from .checkout import EmptyCart, OutOfStock, change_order_status, place_order
 
 
 class ViewCartAPIView(APIView):
     """
     GET /api/cart/?store_id={store_id}
-    Retrieves all items in the user's active cart.
+    Retrieves all items in the user's active cart with line totals and the
+    cart subtotal. store_id is only needed when no active cart exists yet.
     """
 
     def get(self, request):
-        user = request.user
-        store_id = request.query_params.get("store_id")
-        store = get_object_or_404(Store, id=store_id)
+        user_id = request.user.id
+        variant = requested_variant(request, "thumbnail")
 
         # Retrieve the active cart if it exists; otherwise, create a new one.
-        cart = Cart.objects.filter(user=user, status="active").first()
-        print(cart)
+        cart = Cart.objects.filter(user_id=user_id, status="active").first()
         if not cart:
-            print("cart not gotten ")
-            cart = Cart.objects.create(user=user, store=store, status="active")
-
-        cart_items = CartItem.objects.filter(cart=cart)
-        cart_data = []
-        for item in cart_items:
-            # Reuse ProductSerializer to get the product_image field
-            product_serializer = ProductSerializer(
-                item.product, context={"request": request}
-            )
-            cart_data.append(
-                {
-                    "id ": item.id,
-                    "product_name": item.product.name,
-                    "quantity": item.quantity,
-                    "price": item.product.price,
-                    "product_image": product_serializer.data.get("product_image"),
-                }
-            )
+            store_id = request.query_params.get("store_id")
+            store = get_object_or_404(Store, id=store_id)
+            cart = Cart.objects.create(user_id=user_id, store=store, status="active")
 
-        return Response(cart_data, status=status.HTTP_200_OK)
+        items, subtotal = cart_contents(cart, variant)
+        return Response(
+            {"items": items, "subtotal": subtotal}, status=status.HTTP_200_OK
+        )
 
 
 class CreateOrderAPIView(APIView):
     """
     POST /api/orders/create/
     Converts the user's cart into an order and clears the cart.
+    Responds 409 if any product doesn't have enough stock; nothing is changed.
     """
 
     def post(self, request):
-        user = request.user
-        cart = get_object_or_404(Cart, user=user, status="active")
         try:
-
-            store = cart.store
-            dashboard = get_object_or_404(Dashboard, owner=store.owner)
-            dashboard.elegibility_score += 10
-            dashboard.save()
-        except:
-            pass
-
-        payment_method = request.data.get("payment_method")
-        shipping_address = request.data.get("shipping_address")
-
-        # Calculate total price
-        total_price = (
-            CartItem.objects.filter(cart=cart).aggregate(Sum("product__price"))[
-                "product__price__sum"
-            ]
-            or 0
-        )
-
-        # Create an order from the cart
-        order = Order.objects.create(
-            cart=cart,
-            user=user,
-            store=cart.store,
-            total_price=total_price,
-            status="pending",
-            payment_method=payment_method,
-            shipping_address=shipping_address,
-        )
-
-        # Change cart status to inactive
-        cart.status = "inactive"
-        cart.save()
-
-        # Create a new active cart for the user
-        Cart.objects.create(user=user, store=cart.store, status="active")
+            order = place_order(
+                request.user.id,
+                payment_method=request.data.get("payment_method"),
+                shipping_address=request.data.get("shipping_address"),
+            )
+        except Cart.DoesNotExist:
+            return Response(
+                {"error": "No active cart found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        except EmptyCart as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OutOfStock as e:
+            return Response(
+                {"error": "Insufficient stock.", "product_ids": e.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         return Response(
             {"message": "Order placed successfully!", "order_id": order.id},
@@ -219,49 +194,75 @@ class CreateOrderAPIView(APIView):
 
 from django.utils import timezone
 from datetime import timedelta
+from core.pagination import NewestFirstCursorPagination
+from seller_dashboard.metrics import rebuild_store_metrics
+from seller_dashboard.models import StoreMetrics
 
 
 class ListOrderAPIView(APIView):
     """
-    GET /api/store/orders/dashboard/
-    Returns a summary of orders and order history for the store dashboard.
+    GET /api/store/orders/dashboard/[?cursor=...][&page_size=N]
+    Returns a summary of orders and a page of order history (newest first)
+    for the store dashboard.
     """
 
+    pagination_class = NewestFirstCursorPagination
+
     def get(self, request):
-        user = request.user
-        store = get_object_or_404(Store, owner=user)
+        store = get_object_or_404(
+            Store.objects.select_related("metrics"), owner_id=request.user.id
+        )
+        try:
+            metrics = store.metrics
+        except StoreMetrics.DoesNotExist:
+            metrics = rebuild_store_metrics(store.id)
 
         # Get all orders for this store
         orders = Order.objects.filter(store=store)
 
-        # Calculate counts for the order summary
+        # Status counts come from the store's running metrics; only the
+        # 30-day window needs counting
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        new_orders_count = orders.filter(created_at__gte=thirty_days_ago).count()
-        pending_orders_count = orders.filter(status="pending").count()
-        delivered_orders_count = orders.filter(status="delivered").count()
+        summary = {
+            "new_orders": orders.filter(created_at__gte=thirty_days_ago).count(),
+            "pending_orders": metrics.pending_orders,
+            "delivered": metrics.delivered_orders,
+        }
 
-        # Prepare order history data
+        # Prepare order history data for the requested page, fetching only
+        # the columns shown (customer names come from the joined user row)
+        history = orders.values(
+            "id",
+            "created_at",
+            "total_price",
+            "status",
+            "user__first_name",
+            "user__last_name",
+            "user__username",
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(history, request, view=self)
         order_history = []
-        for order in orders:
+        for order in page:
+            full_name = (
+                f"{order['user__first_name']} {order['user__last_name']}".strip()
+            )
             order_history.append(
                 {
-                    "order_id": order.id,
-                    "ordered_date": order.created_at.strftime("%d-%m-%Y"),
-                    "customer_name": order.user.get_full_name() or order.user.username,
-                    # "product_name": order.cart.items.first().product.name if order.cart and order.cart.items.exists() else "N/A",
-                    "total_price": str(order.total_price),
-                    "status": order.status,
+                    "order_id": order["id"],
+                    "ordered_date": order["created_at"].strftime("%d-%m-%Y"),
+                    "customer_name": full_name or order["user__username"],
+                    "total_price": str(order["total_price"]),
+                    "status": order["status"],
                 }
             )
 
         # Format the response
         response_data = {
-            "order_summary": {
-                "new_orders": new_orders_count,
-                "pending_orders": pending_orders_count,
-                "delivered": delivered_orders_count,
-            },
+            "order_summary": summary,
             "order_history": order_history,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -274,20 +275,50 @@ class OrderDetailAPIView(APIView):
     """
 
     def get(self, request, order_id):
-        order = get_object_or_404(Order, id=order_id, user=request.user)
+        order = get_object_or_404(
+            Order.objects.prefetch_related("items"),
+            id=order_id,
+            user_id=request.user.id,
+        )
 
-        order_items = CartItem.objects.filter(cart=order.cart)
+        # Items are the prices and quantities snapshotted at checkout.
         order_data = {
             "id": order.id,
             "status": order.status,
+            "total_price": order.total_price,
             "items": [
                 {
-                    "product": item.product.name,
+                    "product": item.product_name,
                     "quantity": item.quantity,
-                    "price": item.product.price,
+                    "price": item.unit_price,
+                    "line_total": item.line_total,
                 }
-                for item in order_items
+                for item in order.items.all()
             ],
         }
 
         return Response(order_data, status=status.HTTP_200_OK)
+
+
+class OrderStatusAPIView(APIView):
+    """
+    PATCH /api/v1/orders/{order_id}/status/
+    Lets the store owner move an order to pending, delivered or cancelled.
+    """
+
+    def patch(self, request, order_id):
+        store = get_object_or_404(Store, owner_id=request.user.id)
+        serializer = OrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            order = change_order_status(
+                store, order_id, serializer.validated_data["status"]
+            )
+        except Order.DoesNotExist:
+            return Response(
+                {"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            {"id": order.id, "status": order.status}, status=status.HTTP_200_OK
+        )
@@ -0,0 +1,201 @@
+"""
+Bulk catalog import from CSV, JSON Lines or XLSX files.
+
+Rows are read from the file one at a time and validated. Valid rows are
+inserted with bulk_create in batches of CATALOG_IMPORT_BATCH_SIZE, all in one
+transaction. The store's categories are loaded once; categories the file
+introduces are created in bulk, one statement per batch. Invalid rows are
+skipped and reported by row number.
+"""
+
+import csv
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from stores.cache import bump_store_version
+from .models import Category, Product
+from .serializers import CatalogRowSerializer
+
+ImportReport = namedtuple("ImportReport", ["created", "errors"])
+
+COLUMNS = ("name", "category", "price", "description", "stock")
+REQUIRED_COLUMNS = ("name", "price")
+
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".xlsx": "xlsx"}
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+
+class CatalogImportError(Exception):
+    """The file as a whole can't be read."""
+
+
+def detect_format(filename=None, content_type=None):
+    """'csv', 'jsonl' or 'xlsx' from the file name or content type, else None."""
+    if filename:
+        for extension, file_format in _EXTENSIONS.items():
+            if filename.lower().endswith(extension):
+                return file_format
+    if content_type:
+        return _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def _text_lines(source):
+    # Iterating a file or an HttpRequest yields binary lines without reading
+    # the rest of the body.
+    for number, line in enumerate(source):
+        yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+def _clean(row):
+    return {
+        key.strip().lower(): value
+        for key, value in row.items()
+        if key and value is not None
+    }
+
+
+def _check_header(header):
+    header = {str(column).strip().lower() for column in header if column}
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise CatalogImportError(
+            f"Missing column(s): {', '.join(missing)}. "
+            f"Expected: {', '.join(COLUMNS)}."
+        )
+
+
+def _csv_rows(source):
+    reader = csv.DictReader(_text_lines(source))
+    _check_header(reader.fieldnames or [])
+    for row in reader:
+        # line_num is the last line of the row; fields may span lines
+        yield reader.line_num, _clean(row)
+
+
+def _jsonl_rows(source):
+    for number, line in enumerate(_text_lines(source), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, "Not valid JSON."
+            continue
+        if not isinstance(row, dict):
+            yield number, "Expected a JSON object."
+            continue
+        yield number, _clean(row)
+
+
+def _xlsx_rows(source):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise CatalogImportError(
+            "XLSX import needs the openpyxl package; upload a CSV file instead."
+        )
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except Exception as e:
+        raise CatalogImportError(f"Could not read the spreadsheet: {e}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell or "") for cell in next(rows, ())]
+        _check_header(header)
+        for number, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield number, _clean(dict(zip(header, values)))
+    finally:
+        workbook.close()
+
+
+_READERS = {"csv": _csv_rows, "jsonl": _jsonl_rows, "xlsx": _xlsx_rows}
+
+
+def read_catalog(source, file_format):
+    """
+    Yield (row number, row) from a catalog file. A row is a dict of column
+    values, or an error message when the row can't be parsed at all.
+    """
+    try:
+        yield from _READERS[file_format](source)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise CatalogImportError(f"Could not read the file: {e}")
+
+
+def _insert(store, rows, categories):
+    missing = {row["category"] for row in rows if row.get("category")}
+    missing.difference_update(categories)
+    if missing:
+        for category in Category.objects.bulk_create(
+            [Category(store=store, name=name) for name in sorted(missing)]
+        ):
+            categories[category.name] = category.id
+
+    Product.objects.bulk_create(
+        [
+            Product(
+                store=store,
+                category_id=categories.get(row.get("category")),
+                name=row["name"],
+                price=row["price"],
+                description=row.get("description") or "",
+                stock=row["stock"],
+            )
+            for row in rows
+        ]
+    )
+
+
+def import_catalog(store, rows):
+    """
+    Create a product for every valid row of rows (as yielded by read_catalog)
+    in store. Returns an ImportReport with the number created and a list of
+    {"row", "errors"} for the rows that were skipped.
+    """
+    batch_size = settings.CATALOG_IMPORT_BATCH_SIZE
+    created = 0
+    errors = []
+    batch = []
+    with transaction.atomic():
+        categories = dict(
+            Category.objects.filter(store=store).values_list("name", "id")
+        )
+        for number, row in rows:
+            if isinstance(row, str):
+                errors.append({"row": number, "errors": {"row": [row]}})
+                continue
+            serializer = CatalogRowSerializer(data=row)
+            if not serializer.is_valid():
+                errors.append(
+                    {
+                        "row": number,
+                        "errors": {
+                            field: [str(error) for error in field_errors]
+                            for field, field_errors in serializer.errors.items()
+                        },
+                    }
+                )
+                continue
+            batch.append(serializer.validated_data)
+            if len(batch) >= batch_size:
+                _insert(store, batch, categories)
+                created += len(batch)
+                batch = []
+        if batch:
+            _insert(store, batch, categories)
+            created += len(batch)
+        if created:
+            bump_store_version(store.id)
+    return ImportReport(created=created, errors=errors)
@@ -0,0 +1,52 @@
+import requests
+from django.core.management.base import BaseCommand
+
+from products.models import Image
+from products.variants import fetch_variants
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the responsive variants of product and store hero images "
+        "uploaded before variants existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--timeout", type=int, default=30)
+
+    def backfill(self, rows, field, variants_field, timeout):
+        built = failed = 0
+        for row in rows.iterator():
+            resource = getattr(row, field)
+            try:
+                variants = fetch_variants(resource, timeout)
+            except requests.RequestException as e:
+                failed += 1
+                self.stderr.write(f"{row._meta.label} {row.pk}: {e}")
+                continue
+            if not variants:
+                failed += 1
+                continue
+            type(row).objects.filter(pk=row.pk).update(**{variants_field: variants})
+            built += 1
+        return built, failed
+
+    def handle(self, *args, **options):
+        timeout = options["timeout"]
+        images = Image.objects.filter(variants={}).exclude(image__isnull=True)
+        stores = (
+            Store.objects.filter(hero_image_variants={})
+            .exclude(hero_image__isnull=True)
+            .exclude(hero_image="")
+        )
+        built, failed = self.backfill(images, "image", "variants", timeout)
+        hero_built, hero_failed = self.backfill(
+            stores, "hero_image", "hero_image_variants", timeout
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built variants for {built} image(s) and {hero_built} hero "
+                f"image(s); {failed + hero_failed} failed."
+            )
+        )
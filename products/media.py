@@ -0,0 +1,202 @@
+"""
+Attaching uploaded image files to products, and detaching them.
+
+Uploads to Cloudinary run in parallel on a bounded thread pool; the Image rows
+and the product links are then written with one bulk insert each. Variants
+are rendered afterwards by a Celery job, so a request only pays for the
+originals. Large uploads can be deferred to a Celery job too, in which case
+the files are spooled to PRODUCT_IMAGE_SPOOL_DIR (which must be shared with
+the workers) and the variants are rendered there from the same files.
+"""
+
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from .models import Image, Product
+from .variants import build_variants, variant_public_ids
+
+logger = logging.getLogger(__name__)
+
+
+def _upload(image_file, with_variants=False):
+    # CloudinaryField uploads UploadedFile values in pre_save; do that here,
+    # off the request thread, so bulk_create only writes the resulting ids.
+    image = Image(image=image_file)
+    Image._meta.get_field("image").pre_save(image, add=True)
+    if with_variants:
+        image.variants = build_variants(image_file, image.image.public_id)
+    return image
+
+
+def upload_images(image_files, with_variants=False):
+    """
+    Upload image files concurrently and return unsaved Image instances in the
+    same order, with their variants if with_variants. Any failed upload raises.
+    """
+    if not image_files:
+        return []
+    workers = min(settings.PRODUCT_IMAGE_UPLOAD_WORKERS, len(image_files))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(
+            pool.map(lambda image_file: _upload(image_file, with_variants), image_files)
+        )
+
+
+def attach_images(product, image_files, with_variants=False):
+    """
+    Upload image_files and link them to product; returns the new Images. The
+    variants are rendered here if with_variants (already in a worker), else
+    by a job queued once the images are committed.
+    """
+    # Upload before opening the transaction, so no connection is held for the
+    # length of the network calls.
+    images = upload_images(image_files, with_variants)
+    with transaction.atomic():
+        images = Image.objects.bulk_create(images)
+        # One through-table insert, which also drops a stale images prefetch
+        product.images.add(*images)
+        if not with_variants and images:
+            image_ids = [image.id for image in images]
+            transaction.on_commit(lambda: _queue_image_variants(image_ids))
+    return images
+
+
+def _queue_image_variants(image_ids):
+    from .tasks import render_image_variants
+
+    try:
+        render_image_variants.delay(image_ids)
+    except Exception:
+        # The images are saved and served as originals until they have
+        # variants; build_image_variants renders any a lost job missed.
+        logger.warning(
+            "Could not queue variants for images %s", image_ids, exc_info=True
+        )
+
+
+def spool_images(image_files):
+    """Save uploaded files where a worker can read them; returns the paths."""
+    os.makedirs(settings.PRODUCT_IMAGE_SPOOL_DIR, exist_ok=True)
+    paths = []
+    for image_file in image_files:
+        name = f"{uuid.uuid4().hex}-{os.path.basename(image_file.name)}"
+        path = os.path.join(settings.PRODUCT_IMAGE_SPOOL_DIR, name)
+        with open(path, "wb") as spooled:
+            for chunk in image_file.chunks():
+                spooled.write(chunk)
+        paths.append(path)
+    return paths
+
+
+def discard_spooled_images(paths):
+    """Remove spooled files; ones already gone are skipped."""
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def attach_spooled_images(product, paths):
+    """Attach images spooled by spool_images, removing the files afterwards."""
+    files = []
+    try:
+        for path in paths:
+            name = os.path.basename(path).split("-", 1)[1]
+            files.append(UploadedFile(open(path, "rb"), name=name))
+        return attach_images(product, files, with_variants=True)
+    finally:
+        for image_file in files:
+            image_file.close()
+        discard_spooled_images(paths)
+
+
+# public_id in a Cloudinary delivery URL: after .../upload/[transformations/][vNNN/]
+_URL_PUBLIC_ID = re.compile(
+    r"/upload/(?:(?:[^/]*/)*?v\d+/)?(?P<public_id>.+?)(?:\.\w+)?$"
+)
+
+
+def image_key(reference):
+    """
+    Normalise an image reference sent by a client (an Image id, a public_id or
+    a URL as returned in images_urls) to ("id", int) or ("public_id", str).
+    URLs outside Cloudinary (variants in file storage) are keyed on their path
+    without the extension, so absolute and relative forms match.
+    """
+    reference = str(reference).strip()
+    if reference.isdigit():
+        return ("id", int(reference))
+    match = _URL_PUBLIC_ID.search(reference)
+    if match:
+        return ("public_id", match.group("public_id"))
+    return ("public_id", os.path.splitext(urlparse(reference).path)[0])
+
+
+def _image_keys(image_id, image, variants):
+    # Every reference a client may hold for an image: its id, its public_id
+    # and the URL of each of its variants.
+    keys = {("id", image_id)}
+    if image is not None:
+        keys.add(("public_id", image.public_id))
+    keys.update(image_key(url) for url in (variants or {}).values())
+    return keys
+
+
+@transaction.atomic
+def remove_images_except(product, keep):
+    """
+    Detach every image of product not referenced in keep, delete the Image
+    rows no other product uses, and queue their Cloudinary assets (originals
+    and variants) for deletion. Returns the number of images detached.
+    """
+    keys = {image_key(reference) for reference in keep}
+    current = Product.images.through.objects.filter(product_id=product.id)
+    remove_ids = {
+        image_id
+        for image_id, image, variants in current.values_list(
+            "image_id", "image__image", "image__variants"
+        )
+        if keys.isdisjoint(_image_keys(image_id, image, variants))
+    }
+    if not remove_ids:
+        return 0
+
+    # Also drops the product's images prefetch, now stale
+    product.images.remove(*remove_ids)
+    orphans = list(
+        Image.objects.filter(id__in=remove_ids, products__isnull=True).values_list(
+            "id", "image", "variants"
+        )
+    )
+    Image.objects.filter(id__in=[image_id for image_id, _, _ in orphans]).delete()
+    public_ids = []
+    for _, image, variants in orphans:
+        if image:
+            public_ids.append(image.public_id)
+            public_ids.extend(variant_public_ids(image.public_id, variants or {}))
+    if public_ids:
+        transaction.on_commit(lambda: _queue_destroy(public_ids))
+    return len(remove_ids)
+
+
+def _queue_destroy(public_ids):
+    from .tasks import destroy_cloudinary_images
+
+    try:
+        destroy_cloudinary_images.delay(public_ids)
+    except Exception:
+        # Only leaves unused files behind in Cloudinary; the rows are gone.
+        logger.warning(
+            "Could not queue deletion of Cloudinary images %s",
+            public_ids,
+            exc_info=True,
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_category_updated_at_product_updated_at"),
+        ("stores", "0006_store_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["store", "name"], name="category_store_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["store", "created_at", "id"], name="product_store_created_idx"
+            ),
+        ),
+    ]
@@ -9,6 +9,12 @@ class Category(models.Model):
     )
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["store", "name"], name="category_store_name_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.store.name}"
@@ -16,12 +22,38 @@ class Category(models.Model):
 
 class Image(models.Model):
     image = CloudinaryField("products/images", null=True)
+    # {variant: url} rendered after upload, see products.variants
+    variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.image}"
 
 
+def primary_image(product_ref="pk", field="image"):
+    """
+    Subquery for a field of a product's first image, for annotating rows that
+    need a thumbnail without prefetching every image. The image field resolves
+    to a CloudinaryResource, variants to a dict of URLs.
+    """
+    return models.Subquery(
+        Image.objects.filter(products=models.OuterRef(product_ref))
+        .order_by("id")
+        .values(field)[:1]
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def for_catalog(self):
+        """
+        Everything a serialized product touches: the store, the category (and the
+        category's store, used by Category.__str__) and the images.
+        """
+        return self.select_related("store", "category__store").prefetch_related(
+            "images"
+        )
+
+
 class Product(models.Model):
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name="products")
     category = models.ForeignKey(
@@ -43,6 +75,17 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     rating = models.DecimalField(max_digits=2, default=0, decimal_places=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Storefront catalog pages (cursor ordered by created_at, id)
+            models.Index(
+                fields=["store", "created_at", "id"], name="product_store_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.price} - {self.store.name}"
@@ -53,9 +53,16 @@ class CategorySerializer(serializers.ModelSerializer):
 #         )
 
 
+from decimal import Decimal
+
 from rest_framework import serializers
+from django.db import transaction
 from .models import Product, Image
+from .media import attach_images, remove_images_except, spool_images
+from .tasks import attach_product_images
+from .variants import requested_variant, variant_url
 from stores.models import Store
+from stores.cache import bump_store_version
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -64,7 +71,7 @@ class ProductSerializer(serializers.ModelSerializer):
     )
     category = serializers.StringRelatedField(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
-        queryset=Category.objects.all(),
+        queryset=Category.objects.select_related("store"),
         source="category",
         required=False,
     )
@@ -76,6 +83,10 @@ class ProductSerializer(serializers.ModelSerializer):
     existing_images = serializers.ListField(
         child=serializers.CharField(), write_only=True, required=False
     )
+    # Upload the images in a background job and return the product at once.
+    defer_images = serializers.BooleanField(
+        write_only=True, required=False, default=False
+    )
     # For reading, return image URLs from related Image objects.
     images_urls = serializers.SerializerMethodField(read_only=True)
 
@@ -87,6 +98,7 @@ class ProductSerializer(serializers.ModelSerializer):
             "selling_type",
             "images",  # new image files for upload
             "existing_images",  # list of URLs to keep
+            "defer_images",
             "images_urls",  # read-only URLs from associated images
             "weight",
             "dimensions",
@@ -100,25 +112,43 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def get_images_urls(self, obj):
         request = self.context.get("request")
-        return [
-            request.build_absolute_uri(image.image.url) if request else image.image.url
+        variant = requested_variant(request)
+        urls = [
+            variant_url(image.variants, image.image, variant)
             for image in obj.images.all()
         ]
+        if request:
+            return [request.build_absolute_uri(url) for url in urls]
+        return urls
+
+    def add_images(self, product, images_data, defer):
+        if not images_data:
+            return
+        if defer:
+            paths = spool_images(images_data)
+            transaction.on_commit(
+                lambda: attach_product_images.delay(product.id, paths)
+            )
+        else:
+            attach_images(product, images_data)
 
     def create(self, validated_data):
         images_data = validated_data.pop("images", [])
         # existing_images is not used on create.
         validated_data.pop("existing_images", None)
+        defer_images = validated_data.pop("defer_images", False)
         product = Product.objects.create(**validated_data)
-        for image_file in images_data:
-            img_instance = Image.objects.create(image=image_file)
-            product.images.add(img_instance)
+        self.add_images(product, images_data, defer_images)
+        bump_store_version(product.store_id)
         return product
 
     def update(self, instance, validated_data):
         # Pop out new images and the list of existing images to keep.
         images_data = validated_data.pop("images", None)
         existing_images = validated_data.pop("existing_images", None)
+        defer_images = validated_data.pop("defer_images", False)
+
+        previous_store_id = instance.store_id
 
         # Update all other fields.
         for attr, value in validated_data.items():
@@ -126,25 +156,28 @@ class ProductSerializer(serializers.ModelSerializer):
         instance.save()
 
         # If existing_images is provided, remove only images not in that list.
+        # Entries may be image ids, public_ids or the URLs from images_urls.
         if existing_images is not None:
-            # Build a list of URLs that we want to keep.
-            request = self.context.get("request")
-
-            def get_image_url(image):
-                url = image.image.url
-                if request:
-                    return request.build_absolute_uri(url)
-                return url
-
-            # For each associated image, remove if its URL is not in existing_images.
-            for img in list(instance.images.all()):
-                if get_image_url(img) not in existing_images:
-                    # Remove image from product and optionally delete it.
-                    instance.images.remove(img)
-                    img.delete()
+            remove_images_except(instance, existing_images)
         # If new images are provided, add them.
         if images_data is not None:
-            for image_file in images_data:
-                img_instance = Image.objects.create(image=image_file)
-                instance.images.add(img_instance)
+            self.add_images(instance, images_data, defer_images)
+        bump_store_version(instance.store_id)
+        if instance.store_id != previous_store_id:
+            bump_store_version(previous_store_id)
         return instance
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    # One row of a bulk catalog import (see products.catalog_import).
+    name = serializers.CharField(max_length=255)
+    category = serializers.CharField(
+        max_length=255, required=False, allow_blank=True, allow_null=True
+    )
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0")
+    )
+    description = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True, default=""
+    )
+    stock = serializers.IntegerField(min_value=0, required=False, default=0)
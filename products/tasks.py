@@ -0,0 +1,71 @@
+import requests
+from celery import shared_task
+from cloudinary import api
+from django.utils import timezone
+
+from stores.cache import bump_store_version
+from .media import attach_spooled_images, discard_spooled_images
+from .models import Image, Product
+from .variants import fetch_variants
+
+
+@shared_task
+def attach_product_images(product_id, paths):
+    """Upload images deferred by a product create/update and attach them."""
+    product = Product.objects.filter(id=product_id).first()
+    if product is None:
+        # Deleted before the job ran; the spooled files are no longer needed.
+        discard_spooled_images(paths)
+        return 0
+    images = attach_spooled_images(product, paths)
+    # Linking images doesn't save the product; touch it for conditional GETs.
+    Product.objects.filter(id=product.id).update(updated_at=timezone.now())
+    bump_store_version(product.store_id)
+    return len(images)
+
+
+@shared_task(bind=True, max_retries=3)
+def render_image_variants(self, image_ids):
+    """
+    Render the variants of images uploaded in a request, from the originals
+    on Cloudinary. Images that already have variants are skipped, so a retry
+    only redoes the ones that failed to download.
+    """
+    failed = []
+    rendered = 0
+    for image in Image.objects.filter(id__in=image_ids, variants={}).exclude(
+        image__isnull=True
+    ):
+        try:
+            variants = fetch_variants(image.image)
+        except requests.RequestException:
+            failed.append(image.id)
+            continue
+        if variants:
+            Image.objects.filter(id=image.id).update(variants=variants)
+            rendered += 1
+    if rendered:
+        # The products' images changed; touch them for conditional GETs.
+        products = Product.objects.filter(images__id__in=image_ids)
+        store_ids = set(products.values_list("store_id", flat=True))
+        products.update(updated_at=timezone.now())
+        for store_id in store_ids:
+            bump_store_version(store_id)
+    if failed:
+        raise self.retry(args=(failed,), countdown=30)
+    return rendered
+
+
+# Cloudinary's Admin API deletes at most 100 assets per call
+DESTROY_BATCH_SIZE = 100
+
+
+@shared_task(bind=True, max_retries=3)
+def destroy_cloudinary_images(self, public_ids):
+    """Delete image assets from Cloudinary in batches."""
+    try:
+        for i in range(0, len(public_ids), DESTROY_BATCH_SIZE):
+            api.delete_resources(public_ids[i : i + DESTROY_BATCH_SIZE])
+    except api.Error as e:
+        # delete_resources is idempotent, so retrying whole batches is safe.
+        raise self.retry(exc=e, countdown=30)
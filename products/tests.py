@@ -1,38 +1,700 @@
-import requests
-
-# Base URL of your Django server (update if different)
-BASE_URL = "http://127.0.0.1:8000/api/v1/products/"
-
-# Sample data for creating a product
-PRODUCT_DATA = {
-    "store_id": "850df182-beea-4f83-bacb-992247fa0932",  # Replace with actual store ID
-    # "sku": "TEST123",
-    "selling_type": "Retail",
-    "weight": "2.5",
-    "dimensions": "20x10x5",
-    "name": "Test Product",
-    "description": "This is a test product",
-    "price": "49.99",
-    "stock": "10",
-    "category_id": 1,  # Replace with actual category ID
-}
-
-# Image files to upload
-image_files = [
-    ("images", ("download_4.jpg", open("download_4.jpg", "rb"), "image/jpeg")),
-    ("images", ("download_4.jpg", open("download_4.jpg", "rb"), "image/jpeg")),
-]
-
-# Send POST request to create a product
-response = requests.post(BASE_URL, data=PRODUCT_DATA, files=image_files)
-
-# Print the response
-print("Status Code:", response.status_code)
-print("Response JSON:", response.json())
-
-# Close the files
-for _, file in image_files:
-    file[1].close()
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from cloudinary import CloudinaryResource
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+from PIL import Image as PILImage
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from stores.models import Store
+from .media import spool_images
+from .models import Category, Image, Product
+from .tasks import (
+    attach_product_images,
+    destroy_cloudinary_images,
+    render_image_variants,
+)
+
+User = get_user_model()
+
+
+class ProductListQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        self.category = Category.objects.create(store=self.store, name="Jackets")
+
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                store=self.store,
+                category=self.category,
+                name=f"Product {i}",
+                price=10,
+            )
+            image = Image.objects.create(image=f"products/images/sample_{i}")
+            product.images.add(image)
+
+    def get_products(self):
+        return self.client.get("/api/v1/products/", {"store": str(self.store.id)})
+
+    def test_query_count_does_not_grow_with_catalog_size(self):
+        """
+        Conditional-GET validators, store lookup, products with category/store
+        joined, prefetched images.
+        """
+        self.create_products(1)
+        with self.assertNumQueries(4):
+            response = self.get_products()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.create_products(25)
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.get_products()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(len(results), 26)
+        self.assertEqual(results[0]["category"], "Jackets - Test Store")
+        self.assertEqual(len(results[0]["images_urls"]), 1)
+
+    def test_product_detail_uses_catalog_query(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/v1/products/{product.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "Product 0")
+
+
+class ProductListPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        for i in range(5):
+            Product.objects.create(store=self.store, name=f"Product {i}", price=10)
+
+    def test_cursor_pages_are_stable_under_inserts(self):
+        response = self.client.get(
+            "/api/v1/products/", {"store": str(self.store.id), "page_size": 2}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seen = [item["name"] for item in response.data["results"]]
+        self.assertIsNone(response.data["previous"])
+
+        # A product created mid-pagination lands after the cursor, not on a
+        # page the client already read.
+        Product.objects.create(store=self.store, name="Product 5", price=10)
+
+        next_url = response.data["next"]
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(item["name"] for item in response.data["results"])
+            next_url = response.data["next"]
+
+        self.assertEqual(seen, [f"Product {i}" for i in range(6)])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(
+            "/api/v1/products/", {"store": str(self.store.id), "page_size": 1000}
+        )
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+
+
+class StorefrontCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        self.product = Product.objects.create(
+            store=self.store, name="Leather Jacket", price=10
+        )
+
+    def get_products(self):
+        return self.client.get("/api/v1/products/", {"store": str(self.store.id)})
+
+    def test_repeat_reads_are_served_from_cache(self):
+        self.get_products()
+        with self.assertNumQueries(0):
+            response = self.get_products()
+        self.assertEqual(response.data["results"][0]["name"], "Leather Jacket")
+
+    def test_product_update_invalidates_store_payloads(self):
+        self.get_products()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f"/api/v1/products/{self.product.id}/",
+                {"name": "Suede Jacket"},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.get_products()
+        self.assertEqual(response.data["results"][0]["name"], "Suede Jacket")
+
+    def test_category_delete_invalidates_category_list(self):
+        category = Category.objects.create(store=self.store, name="Jackets")
+        url = "/api/v1/categories/"
+        self.assertEqual(
+            len(self.client.get(url, {"store": str(self.store.id)}).data["results"]), 1
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/categories/{category.id}/")
+        self.assertEqual(
+            len(self.client.get(url, {"store": str(self.store.id)}).data["results"]), 0
+        )
+
+    def test_unknown_store_is_not_cached(self):
+        response = self.client.get("/api/v1/products/", {"store": "not-a-store"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        self.product = Product.objects.create(
+            store=self.store, name="Leather Jacket", price=10
+        )
+        self.list_params = {"store": str(self.store.id)}
+
+    def test_product_list_answers_if_none_match_with_304(self):
+        response = self.client.get("/api/v1/products/", self.list_params)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        # Served from the cached validators: no queries, no serialization.
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/v1/products/", self.list_params, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Cold cache: only the validators query runs.
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/api/v1/products/", self.list_params, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_product_list_etag_changes_on_delete(self):
+        response = self.client.get("/api/v1/products/", self.list_params)
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/products/{self.product.id}/")
+
+        response = self.client.get(
+            "/api/v1/products/", self.list_params, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_product_detail_honours_if_modified_since(self):
+        url = f"/api/v1/products/{self.product.id}/"
+        response = self.client.get(url)
+        last_modified = response["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_product_detail_etag_changes_on_update(self):
+        url = f"/api/v1/products/{self.product.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.client.put(url, {"stock": 5}, format="multipart")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stock"], 5)
+
+
+if __name__ == "__main__":
+    # Manual smoke test against a running server:
+    # python products/tests.py (from the products/ directory)
+    import requests
+
+    # Base URL of your Django server (update if different)
+    BASE_URL = "http://127.0.0.1:8000/api/v1/products/"
+
+    # Sample data for creating a product
+    PRODUCT_DATA = {
+        "store_id": "850df182-beea-4f83-bacb-992247fa0932",  # Replace with actual store ID
+        # "sku": "TEST123",
+        "selling_type": "Retail",
+        "weight": "2.5",
+        "dimensions": "20x10x5",
+        "name": "Test Product",
+        "description": "This is a test product",
+        "price": "49.99",
+        "stock": "10",
+        "category_id": 1,  # Replace with actual category ID
+    }
+
+    # Image files to upload
+    image_files = [
+        ("images", ("download_4.jpg", open("download_4.jpg", "rb"), "image/jpeg")),
+        ("images", ("download_4.jpg", open("download_4.jpg", "rb"), "image/jpeg")),
+    ]
+
+    # Send POST request to create a product
+    response = requests.post(BASE_URL, data=PRODUCT_DATA, files=image_files)
+
+    # Print the response
+    print("Status Code:", response.status_code)
+    print("Response JSON:", response.json())
+
+    # Close the files
+    for _, file in image_files:
+        file[1].close()
 
 
 # http://127.0.0.1:8000/admin/stores/store/850df182-beea-4f83-bacb-992247fa0932/change/
+
+
+def png_bytes(size=(4, 4)):
+    buffer = BytesIO()
+    PILImage.new("RGB", size, "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def png_file(name, size=(4, 4)):
+    return SimpleUploadedFile(name, png_bytes(size), content_type="image/png")
+
+
+def serve_originals(content):
+    """Answer the variant jobs' downloads of uploaded originals with content."""
+    return mock.patch(
+        "products.variants.requests.get",
+        return_value=mock.Mock(content=content, raise_for_status=lambda: None),
+    )
+
+
+def run_task(task):
+    """Run a task in-process when it is queued."""
+    return mock.patch.object(
+        task, "delay", side_effect=lambda *args: task.apply(args=args)
+    )
+
+
+# Variants go to an in-memory storage instead of Cloudinary.
+VARIANT_STORAGE = override_settings(
+    IMAGE_VARIANT_BACKEND="products.variants.StorageVariantBackend",
+    STORAGES={
+        "default": {
+            "BACKEND": "django.core.files.storage.InMemoryStorage",
+            "OPTIONS": {"base_url": "/media/"},
+        },
+        "staticfiles": {
+            "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+        },
+    },
+)
+
+
+def slow_upload(file, **options):
+    time.sleep(0.2)
+    return CloudinaryResource(
+        public_id=os.path.splitext(file.name)[0],
+        version="1",
+        format="png",
+        type="upload",
+        resource_type="image",
+    )
+
+
+@VARIANT_STORAGE
+@mock.patch("cloudinary.models.uploader.upload_resource", side_effect=slow_upload)
+class ProductImageUploadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+
+    def create_product(self, count, size=(4, 4), **extra):
+        data = {
+            "store_id": str(self.store.id),
+            "name": "Jacket",
+            "price": "10.00",
+            "images": [png_file(f"photo{i}.png", size) for i in range(count)],
+            **extra,
+        }
+        with run_task(render_image_variants), serve_originals(
+            png_bytes(size)
+        ) as download, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/products/", data, format="multipart")
+        self.downloads = download.call_count
+        return response
+
+    def test_uploads_run_in_parallel_and_insert_in_bulk(self, upload):
+        # No upload finishes until all four are in flight; run one at a time,
+        # the first would time out waiting and fail the request.
+        in_flight = threading.Barrier(4, timeout=5)
+
+        def parallel_upload(file, **options):
+            in_flight.wait()
+            return slow_upload(file, **options)
+
+        upload.side_effect = parallel_upload
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create_product(4)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(upload.call_count, 4)
+        self.assertFalse(in_flight.broken)
+        inserts = [q["sql"] for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(sum('"products_image"' in sql for sql in inserts), 1, inserts)
+        self.assertEqual(
+            sum('"products_product_images"' in sql for sql in inserts), 1, inserts
+        )
+        product = Product.objects.get()
+        self.assertEqual(
+            sorted(image.image.public_id for image in product.images.all()),
+            [f"photo{i}" for i in range(4)],
+        )
+
+    def test_variants_are_rendered_once_and_served_by_query_param(self, upload):
+        response = self.create_product(1, size=(800, 600))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = Image.objects.get()
+        # Rendered by the job queued on commit; the response has the original.
+        self.assertEqual(response.data["data"]["images_urls"], [image.image.url])
+        self.assertEqual(self.downloads, 1)
+
+        self.assertEqual(set(image.variants), {"thumbnail", "card", "full"})
+        sizes = {}
+        for variant, url in image.variants.items():
+            with default_storage.open(url.removeprefix("/media/")) as stored:
+                sizes[variant] = PILImage.open(stored).size
+        # Fitted to the longest edge, never upscaled.
+        self.assertEqual(
+            sizes, {"thumbnail": (160, 120), "card": (480, 360), "full": (800, 600)}
+        )
+
+        url = f"/api/v1/products/{Product.objects.get().id}/"
+        response = self.client.get(url, {"variant": "thumbnail"})
+        self.assertEqual(
+            response.data["images_urls"],
+            [f"http://testserver{image.variants['thumbnail']}"],
+        )
+        response = self.client.get(url)
+        self.assertEqual(
+            response.data["images_urls"],
+            [f"http://testserver{image.variants['full']}"],
+        )
+        response = self.client.get(url, {"variant": "huge"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_images_without_variants_fall_back_to_original(self, upload):
+        product = Product.objects.create(store=self.store, name="Coat", price=10)
+        product.images.add(Image.objects.create(image="image/upload/v1/old.png"))
+
+        response = self.client.get(
+            f"/api/v1/products/{product.id}/", {"variant": "card"}
+        )
+        self.assertEqual(len(response.data["images_urls"]), 1)
+        self.assertTrue(response.data["images_urls"][0].endswith("/v1/old.png"))
+
+    def test_upload_succeeds_when_variant_job_cannot_be_queued(self, upload):
+        data = {
+            "store_id": str(self.store.id),
+            "name": "Jacket",
+            "price": "10.00",
+            "images": [png_file("photo0.png")],
+        }
+        with mock.patch.object(
+            render_image_variants, "delay", side_effect=ConnectionError("broker down")
+        ), self.assertLogs("products.media", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/v1/products/", data, format="multipart"
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        image = Image.objects.get()
+        self.assertEqual(image.variants, {})
+        self.assertEqual(response.data["data"]["images_urls"], [image.image.url])
+
+    def test_deferred_images_are_attached_by_background_job(self, upload):
+        spool_dir = tempfile.mkdtemp()
+        with override_settings(PRODUCT_IMAGE_SPOOL_DIR=spool_dir), run_task(
+            attach_product_images
+        ):
+            response = self.create_product(2, defer_images="true")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The response was built before the job ran.
+        self.assertEqual(response.data["data"]["images_urls"], [])
+        images = Product.objects.get().images.all()
+        self.assertEqual(len(images), 2)
+        # Rendered in the job from the spooled files, without downloading.
+        self.assertEqual(self.downloads, 0)
+        self.assertTrue(all(image.variants for image in images))
+        self.assertEqual(os.listdir(spool_dir), [])
+
+    def test_update_response_lists_uploaded_images(self, upload):
+        product = Product.objects.create(store=self.store, name="Coat", price=10)
+        with run_task(render_image_variants), serve_originals(
+            png_bytes()
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f"/api/v1/products/{product.id}/",
+                {"images": [png_file("photo.png")]},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Served from the product loaded with its images prefetched
+        self.assertEqual(
+            response.data["data"]["images_urls"], [Image.objects.get().image.url]
+        )
+
+    def test_spooled_images_of_a_deleted_product_are_removed(self, upload):
+        spool_dir = tempfile.mkdtemp()
+        with override_settings(PRODUCT_IMAGE_SPOOL_DIR=spool_dir):
+            paths = spool_images([png_file("photo.png")])
+
+        self.assertEqual(attach_product_images.apply(args=(0, paths)).get(), 0)
+        self.assertEqual(os.listdir(spool_dir), [])
+        upload.assert_not_called()
+
+
+class ProductImageRemovalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        self.product = Product.objects.create(store=self.store, name="Jacket", price=10)
+        self.images = [
+            Image.objects.create(
+                image=f"image/upload/v1/photo{i}.png",
+                variants={
+                    variant: CloudinaryResource(
+                        f"photo{i}_{variant}", format="webp", version="2"
+                    ).url
+                    for variant in ("thumbnail", "card", "full")
+                },
+            )
+            for i in range(4)
+        ]
+        self.product.images.add(*self.images)
+
+    def test_existing_images_diff_removes_in_bulk(self):
+        # Another product still uses photo3, so only its link goes.
+        other = Product.objects.create(store=self.store, name="Coat", price=10)
+        other.images.add(self.images[3])
+        url = Image.objects.get(id=self.images[0].id).image.url
+
+        with mock.patch.object(destroy_cloudinary_images, "delay") as destroy:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.put(
+                    f"/api/v1/products/{self.product.id}/",
+                    {"existing_images": [f"http://testserver{url}", self.images[1].id]},
+                    format="multipart",
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(response.data["data"]["images_urls"]),
+            [self.images[0].variants["full"], self.images[1].variants["full"]],
+        )
+        self.assertEqual(
+            set(self.product.images.values_list("id", flat=True)),
+            {self.images[0].id, self.images[1].id},
+        )
+        self.assertFalse(Image.objects.filter(id=self.images[2].id).exists())
+        self.assertTrue(Image.objects.filter(id=self.images[3].id).exists())
+        destroy.assert_called_once_with(
+            ["photo2", "photo2_thumbnail", "photo2_card", "photo2_full"]
+        )
+
+    def test_images_urls_round_trip_as_existing_images(self):
+        # Variants in file storage are served as relative URLs, made absolute
+        self.images[0].variants = {"full": "/media/photo0_full.webp"}
+        self.images[0].save()
+        url = f"/api/v1/products/{self.product.id}/"
+        for variant in ("full", "thumbnail"):
+            images_urls = self.client.get(url, {"variant": variant}).data["images_urls"]
+            with mock.patch.object(destroy_cloudinary_images, "delay") as destroy:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.put(
+                        url, {"existing_images": images_urls}, format="multipart"
+                    )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                response.data["data"]["images_urls"],
+                self.client.get(url).data["images_urls"],
+            )
+            self.assertEqual(len(response.data["data"]["images_urls"]), 4)
+            self.assertEqual(self.product.images.count(), 4)
+            destroy.assert_not_called()
+
+    def test_diff_query_count_does_not_grow_with_images(self):
+        self.product.images.add(
+            *[
+                Image.objects.create(image=f"image/upload/v1/extra{i}.png")
+                for i in range(20)
+            ]
+        )
+        from .media import remove_images_except
+
+        with mock.patch.object(destroy_cloudinary_images, "delay"):
+            # savepoint, current links, link delete, orphans, then the
+            # collector's fetch, cascade and image delete, release
+            with self.assertNumQueries(8):
+                removed = remove_images_except(self.product, ["photo0"])
+        self.assertEqual(removed, 23)
+
+
+@override_settings(CATALOG_IMPORT_BATCH_SIZE=500)
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        Category.objects.create(store=self.store, name="Shoes")
+        self.url = f"/api/v1/products/import/?store={self.store.id}"
+
+    def catalog_csv(self, count):
+        lines = ["Name,Category,Price,Description,Stock"]
+        for i in range(count):
+            category = "Shoes" if i % 2 else f"Bags {i % 3}"
+            lines.append(f'Item {i},{category},{i}.50,"Item, number {i}",{i}')
+        return "\n".join(lines) + "\n"
+
+    def test_csv_upload_is_inserted_in_batches_with_a_row_report(self):
+        rows = self.catalog_csv(1200).splitlines()
+        rows[3] = "Item 2,Shoes,cheap,,1"
+        rows[1001] = ",Shoes,1,,1"
+        upload = SimpleUploadedFile(
+            "catalog.csv", "\n".join(rows).encode(), content_type="text/csv"
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    self.url, {"file": upload}, format="multipart"
+                )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1198)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [4, 1002])
+        self.assertIn("price", response.data["errors"][0]["errors"])
+        self.assertIn("name", response.data["errors"][1]["errors"])
+
+        inserts = [q["sql"] for q in queries if q["sql"].startswith("INSERT")]
+        # Three batches; SQLite's bound-parameter limit splits each further.
+        self.assertLess(sum('"products_product"' in sql for sql in inserts), 20)
+        self.assertEqual(sum('"products_category"' in sql for sql in inserts), 1)
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)),
+            ["Bags 0", "Bags 1", "Bags 2", "Shoes"],
+        )
+        product = Product.objects.get(name="Item 7")
+        self.assertEqual(
+            (product.category.name, product.price, product.description, product.stock),
+            ("Shoes", Decimal("7.50"), "Item, number 7", 7),
+        )
+
+    def test_streamed_jsonl_body(self):
+        body = "\n".join(
+            [
+                '{"name": "Cap", "price": "5", "category": "Hats"}',
+                "not json",
+                '{"name": "Scarf", "price": 7.25, "stock": 3}',
+            ]
+        )
+        response = self.client.post(self.url, body, content_type="application/x-ndjson")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+        self.assertEqual(Product.objects.get(name="Scarf").stock, 3)
+        self.assertIsNone(Product.objects.get(name="Scarf").category)
+
+    def test_xlsx_upload(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Name", "Category", "Price", "Description", "Stock"])
+        sheet.append(["Boot", "Shoes", 19.99, None, 4])
+        sheet.append([None, None, None, None, None])
+        sheet.append(["Belt", None, "free", None, None])
+        sheet.append(["Tote", "Bags", 12, "Canvas", None])
+        content = BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile(
+            "catalog.xlsx",
+            content.getvalue(),
+            content_type="application/vnd.openxmlformats-officedocument"
+            ".spreadsheetml.sheet",
+        )
+
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [4])
+        self.assertIn("price", response.data["errors"][0]["errors"])
+        boot = Product.objects.get(name="Boot")
+        self.assertEqual(
+            (boot.category.name, boot.price, boot.stock),
+            ("Shoes", Decimal("19.99"), 4),
+        )
+        self.assertEqual(Product.objects.get(name="Tote").category.name, "Bags")
+
+    def test_rejects_files_it_cannot_read(self):
+        response = self.client.post(
+            self.url, "title,cost\nCap,5\n", content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Missing column(s): name, price", response.data["error"])
+        self.assertFalse(Product.objects.exists())
+
+    def test_only_the_store_owner_can_import(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="password"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.post(
+            self.url, self.catalog_csv(1), content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
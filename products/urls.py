@@ -1,12 +1,17 @@
 from django.urls import path, include
-from .views import CategoryAPIView, ProductAPIView, ProductDetailAPIView
-
+from .views import (
+    CatalogImportAPIView,
+    CategoryAPIView,
+    ProductAPIView,
+    ProductDetailAPIView,
+)
 
 app_name = "products"
 
 
 urlpatterns = [
     path("", ProductAPIView.as_view(), name="list-create"),
+    path("import/", CatalogImportAPIView.as_view(), name="import"),
     path("<int:product_id>/", ProductDetailAPIView.as_view(), name="detail"),
     #     path("", CategoryAPIView.as_view(), name="list-create"),
 ]
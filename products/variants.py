@@ -0,0 +1,131 @@
+"""
+Responsive variants (thumbnail, card, full) of product and store images.
+
+Variants are rendered once per upload with Pillow, off the request path (by
+a Celery job, or inline where the upload already runs in one), and written
+through the backend named by IMAGE_VARIANT_BACKEND. Their URLs are stored next
+to the original, so serializers read a string instead of building a URL
+through the Cloudinary SDK on every response. Until a variant exists, readers
+fall back to the original.
+"""
+
+from io import BytesIO
+
+import requests
+from cloudinary.uploader import upload
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+from PIL import Image as PILImage
+from PIL import ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+VARIANT_FORMAT = "WEBP"
+
+
+class CloudinaryVariantBackend:
+    """Upload each variant as its own Cloudinary asset."""
+
+    def save(self, name, content):
+        result = upload(content, public_id=name, overwrite=True)
+        return result["secure_url"]
+
+
+class StorageVariantBackend:
+    """Write variants to Django's default file storage."""
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    def save(self, name, content):
+        path = self.storage.save(
+            f"{name}.{VARIANT_FORMAT.lower()}", ContentFile(content)
+        )
+        return self.storage.url(path)
+
+
+def get_variant_backend():
+    return import_string(settings.IMAGE_VARIANT_BACKEND)()
+
+
+def variant_name(public_id, variant):
+    """Name a variant of public_id is stored under (its Cloudinary public_id)."""
+    return f"{public_id}_{variant}"
+
+
+def variant_public_ids(public_id, variants):
+    """Public ids of the stored variants of public_id, for deleting them."""
+    return [variant_name(public_id, variant) for variant in variants]
+
+
+def render_variants(source):
+    """
+    Yield (variant, encoded bytes) for every size in IMAGE_VARIANTS. Each
+    variant fits its longest edge to the configured size; smaller originals
+    are never upscaled.
+    """
+    with PILImage.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.mode else "RGB")
+        for variant, size in settings.IMAGE_VARIANTS.items():
+            resized = original.copy()
+            resized.thumbnail((size, size), PILImage.LANCZOS)
+            buffer = BytesIO()
+            resized.save(
+                buffer, format=VARIANT_FORMAT, quality=settings.IMAGE_VARIANT_QUALITY
+            )
+            yield variant, buffer.getvalue()
+
+
+def build_variants(source, public_id, backend=None):
+    """
+    Render and store the variants of the image in source (a path or a
+    file-like object); returns {variant: url}. Files Pillow cannot decode get
+    no variants, and readers fall back to the original.
+    """
+    backend = backend or get_variant_backend()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    try:
+        return {
+            variant: backend.save(variant_name(public_id, variant), content)
+            for variant, content in render_variants(source)
+        }
+    except (UnidentifiedImageError, OSError):
+        return {}
+
+
+def fetch_variants(resource, timeout=30, backend=None):
+    """
+    Download an uploaded original (a CloudinaryResource) and build its
+    variants. Raises requests.RequestException if the download fails.
+    """
+    response = requests.get(resource.url, timeout=timeout)
+    response.raise_for_status()
+    return build_variants(BytesIO(response.content), resource.public_id, backend)
+
+
+def requested_variant(request, default=None):
+    """The variant asked for by the ?variant= query parameter, else default."""
+    default = default or settings.DEFAULT_IMAGE_VARIANT
+    if request is None:
+        return default
+    variant = request.query_params.get("variant", default)
+    if variant not in settings.IMAGE_VARIANTS:
+        raise serializers.ValidationError(
+            {"variant": [f"Choose one of: {', '.join(settings.IMAGE_VARIANTS)}."]}
+        )
+    return variant
+
+
+def variant_url(variants, original, variant):
+    """
+    Stored URL of the variant; images uploaded before variants existed fall
+    back to the original asset.
+    """
+    url = (variants or {}).get(variant)
+    if url is None and original:
+        url = original.url
+    return url
@@ -13,32 +13,61 @@ from rest_framework import status
 from .models import Product
 from stores.models import Store
 from .serializers import ProductSerializer
+from django.core.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from core.pagination import CreatedAtCursorPagination
+from .catalog_import import (
+    CatalogImportError,
+    detect_format,
+    import_catalog,
+    read_catalog,
+)
+from stores.cache import bump_store_version
+from stores.conditional import (
+    category_list_validators,
+    not_modified_response,
+    product_list_validators,
+    product_validators,
+    set_validator_headers,
+    storefront_response,
+)
 
 
 class CategoryAPIView(APIView):
     """
     Handles:
-      - GET /api/categories/?store={store_id}
+      - GET /api/categories/?store={store_id}[&cursor=...][&page_size=N]
       - POST /api/categories/
     """
 
+    pagination_class = CreatedAtCursorPagination
+
     def get(self, request):
-        print("get called")
+        store_id = request.query_params.get("store")
+        return storefront_response(
+            request,
+            store_id,
+            "categories",
+            category_list_validators,
+            lambda: self.list_categories(request, store_id),
+        )
+
+    def list_categories(self, request, store_id):
         try:
-            print("Getting categories")
-            store_id = request.query_params.get("store")
             store = Store.objects.get(id=store_id)
             categories = store.categories.all()  # Use .all() to get the queryset
-            print(len(categories), "categories found")
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(categories, request, view=self)
+        serializer = CategorySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = CategorySerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            category = serializer.save()
+            bump_store_version(category.store_id)
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED,
@@ -49,24 +78,34 @@ class CategoryAPIView(APIView):
 class ProductAPIView(APIView):
     """
     Handles:
-      - GET /api/products/?store={store_id}
+      - GET /api/products/?store={store_id}[&cursor=...][&page_size=N]
       - POST /api/products/ (supports multiple images)
     """
 
     parser_classes = (MultiPartParser, FormParser)  # Support file uploads
+    pagination_class = CreatedAtCursorPagination
 
     def get(self, request):
+        store_id = request.query_params.get("store")
+        return storefront_response(
+            request,
+            store_id,
+            "products",
+            product_list_validators,
+            lambda: self.list_products(request, store_id),
+        )
+
+    def list_products(self, request, store_id):
         try:
-            store_id = request.query_params.get("store")
             store = Store.objects.get(id=store_id)
-            products = store.products.all()
+            products = Product.objects.for_catalog().filter(store=store)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = ProductSerializer(
-            products, many=True, context={"request": request}
-        )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(products, request, view=self)
+        serializer = ProductSerializer(page, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request):
         serializer = ProductSerializer(data=request.data, context={"request": request})
@@ -79,6 +118,63 @@ class ProductAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CatalogImportAPIView(APIView):
+    """
+    Handles:
+      - POST /api/products/import/?store={store_id}
+
+    Creates products in bulk from a catalog file with the columns name,
+    category, price, description and stock. Send it as the "file" field of a
+    multipart form (CSV, JSONL or XLSX), or stream it as the request body
+    with Content-Type text/csv or application/x-ndjson. Valid rows are
+    imported; the others are reported by row number.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            store = Store.objects.get(
+                id=request.query_params.get("store"), owner_id=request.user.id
+            )
+        except (Store.DoesNotExist, ValueError, ValidationError):
+            return Response(
+                {"error": "Store not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        # A raw body is read straight off the request, line by line; touching
+        # request.data would buffer it first.
+        file_format = detect_format(content_type=request.content_type)
+        if file_format in ("csv", "jsonl"):
+            source = request._request
+        else:
+            source = request.FILES.get("file")
+            if source is None:
+                return Response(
+                    {"error": "Upload a catalog file as 'file'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            file_format = detect_format(source.name, source.content_type)
+            if file_format is None:
+                return Response(
+                    {"error": "Upload a CSV, JSONL or XLSX file."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        try:
+            report = import_catalog(store, read_catalog(source, file_format))
+        except CatalogImportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"created": report.created, "errors": report.errors},
+            status=(
+                status.HTTP_201_CREATED
+                if report.created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+
 class ProductDetailAPIView(APIView):
     """
     Handles:
@@ -91,18 +187,24 @@ class ProductDetailAPIView(APIView):
 
     def get_object(self, product_id):
         try:
-            return Product.objects.get(id=product_id)
+            return Product.objects.for_catalog().get(id=product_id)
         except Product.DoesNotExist:
             return None
 
     def get(self, request, product_id):
+        validators = product_validators(request, product_id)
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
         product = self.get_object(product_id)
         if not product:
             return Response(
                 {"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND
             )
         serializer = ProductSerializer(product, context={"request": request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validator_headers(response, validators)
 
     def put(self, request, product_id):
         product = self.get_object(product_id)
@@ -129,6 +231,7 @@ class ProductDetailAPIView(APIView):
                 {"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND
             )
         product.delete()
+        bump_store_version(product.store_id)
         return Response(
             {"message": "Product deleted successfully!"}, status=status.HTTP_200_OK
         )
@@ -163,9 +266,14 @@ class CategoryDetailAPIView(APIView):
             return Response(
                 {"error": "Category not found."}, status=status.HTTP_404_NOT_FOUND
             )
+        category_store_id = category.store_id
         serializer = CategorySerializer(category, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            category = serializer.save()
+            bump_store_version(category_store_id)
+            # The category may have been moved to another store.
+            if category.store_id != category_store_id:
+                bump_store_version(category.store_id)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -176,6 +284,7 @@ class CategoryDetailAPIView(APIView):
                 {"error": "Category not found."}, status=status.HTTP_404_NOT_FOUND
             )
         category.delete()
+        bump_store_version(category.store_id)
         return Response(
             {"message": "Category deleted successfully!"}, status=status.HTTP_200_OK
         )
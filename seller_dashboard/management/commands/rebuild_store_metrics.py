@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from stores.models import Store
+from seller_dashboard.metrics import rebuild_store_metrics
+from seller_dashboard.models import StoreMetrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute StoreMetrics from orders and customers. Reports stores whose "
+        "stored counters had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "store_ids", nargs="*", help="Stores to rebuild (default: all stores)"
+        )
+
+    def handle(self, *args, **options):
+        store_ids = options["store_ids"] or Store.objects.values_list("id", flat=True)
+        fields = [
+            field.name
+            for field in StoreMetrics._meta.concrete_fields
+            if field.name not in ("store", "updated_at")
+        ]
+
+        rebuilt = drifted = 0
+        for store_id in store_ids:
+            before = (
+                StoreMetrics.objects.filter(store_id=store_id).values(*fields).first()
+            )
+            metrics = rebuild_store_metrics(store_id)
+            after = {field: getattr(metrics, field) for field in fields}
+            if before is not None and before != after:
+                drifted += 1
+                self.stdout.write(f"Store {store_id}: {before} -> {after}")
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rebuilt} store(s), {drifted} had drifted.")
+        )
@@ -0,0 +1,112 @@
+"""
+Event-driven store metrics.
+
+Order writes call order_placed / order_status_changed inside their own
+transaction; each event is a single UPDATE with F() expressions on the store's
+StoreMetrics row, so readers get the figures with one primary-key lookup.
+rebuild_store_metrics recomputes a row from the orders table and is used to
+seed missing rows and to reconcile drift.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from orders.models import Order
+from stores.models import Store
+from .models import StoreMetrics
+
+STATUS_COUNTERS = {
+    "pending": "pending_orders",
+    "delivered": "delivered_orders",
+    "cancelled": "cancelled_orders",
+}
+
+
+def _order_deltas(order, sign):
+    """Counter changes contributed by an order in its current status."""
+    deltas = {}
+    counter = STATUS_COUNTERS.get(order.status)
+    if counter:
+        deltas[counter] = sign
+    if order.status != "cancelled":
+        deltas["total_revenue"] = sign * order.total_price
+    if order.status == "delivered":
+        deltas["delivered_revenue"] = sign * order.total_price
+    return deltas
+
+
+def _merge(*delta_sets):
+    merged = {}
+    for deltas in delta_sets:
+        for field, delta in deltas.items():
+            merged[field] = merged.get(field, 0) + delta
+    return merged
+
+
+def _apply(store_id, deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates:
+        return
+    if not StoreMetrics.objects.filter(store_id=store_id).update(**updates):
+        # First event for this store: build the row from the source tables,
+        # which already include the write being recorded.
+        rebuild_store_metrics(store_id)
+
+
+def order_placed(order):
+    """Record a newly created order."""
+    _apply(order.store_id, _merge({"total_orders": 1}, _order_deltas(order, 1)))
+
+
+def order_status_changed(order, previous_status):
+    """Record an order moving from previous_status to order.status."""
+    if order.status == previous_status:
+        return
+    before = Order(status=previous_status, total_price=order.total_price)
+    _apply(order.store_id, _merge(_order_deltas(before, -1), _order_deltas(order, 1)))
+
+
+def customer_joined(store_id):
+    """Record a customer registering with a store."""
+    _apply(store_id, {"total_customers": 1})
+
+
+@transaction.atomic
+def rebuild_store_metrics(store_id):
+    """Recompute a store's metrics from its orders and customers."""
+    figures = Order.objects.filter(store_id=store_id).aggregate(
+        total_orders=Count("id"),
+        pending_orders=Count("id", filter=Q(status="pending")),
+        delivered_orders=Count("id", filter=Q(status="delivered")),
+        cancelled_orders=Count("id", filter=Q(status="cancelled")),
+        total_revenue=Sum("total_price", filter=~Q(status="cancelled")),
+        delivered_revenue=Sum("total_price", filter=Q(status="delivered")),
+    )
+    figures["total_revenue"] = figures["total_revenue"] or Decimal("0")
+    figures["delivered_revenue"] = figures["delivered_revenue"] or Decimal("0")
+    figures["total_customers"] = Store.customers.through.objects.filter(
+        store_id=store_id
+    ).count()
+    metrics, created = StoreMetrics.objects.update_or_create(
+        store_id=store_id, defaults=figures
+    )
+    return metrics
+
+
+def get_store_metrics(store_id):
+    """The store's metrics row, built on first use."""
+    metrics = StoreMetrics.objects.filter(store_id=store_id).first()
+    return metrics or rebuild_store_metrics(store_id)
+
+
+def metrics_for_owner(owner_id):
+    """Metrics of the store owned by owner_id, or None if they have no store."""
+    metrics = StoreMetrics.objects.filter(store__owner_id=owner_id).first()
+    if metrics is None:
+        store_id = (
+            Store.objects.filter(owner_id=owner_id).values_list("id", flat=True).first()
+        )
+        metrics = rebuild_store_metrics(store_id) if store_id else None
+    return metrics
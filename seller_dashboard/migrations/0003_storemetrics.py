@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seller_dashboard', '0002_dashboard_eligibility_score_and_more'),
+        ('stores', '0006_store_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoreMetrics',
+            fields=[
+                ('store', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='stores.store')),
+                ('total_orders', models.PositiveIntegerField(default=0)),
+                ('pending_orders', models.PositiveIntegerField(default=0)),
+                ('delivered_orders', models.PositiveIntegerField(default=0)),
+                ('cancelled_orders', models.PositiveIntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('delivered_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_customers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("seller_dashboard", "0004_dailysalesrollup_rollupwatermark"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="loan",
+            index=models.Index(
+                fields=["borrower", "status"], name="loan_borrower_status_idx"
+            ),
+        ),
+    ]
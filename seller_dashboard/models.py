@@ -62,6 +62,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 import uuid
 from datetime import date
+from stores.models import Store
 
 User = get_user_model()
 
@@ -97,6 +98,13 @@ class Loan(models.Model):
         max_length=20, choices=PAYMENT_STATUS_CHOICES, default="current"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["borrower", "status"], name="loan_borrower_status_idx"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.loan_id:
             self.loan_id = (
@@ -108,6 +116,66 @@ class Loan(models.Model):
         return f"{self.loan_id} - {self.loan_type} - {self.amount}"
 
 
+class StoreMetrics(models.Model):
+    """
+    Running order counters for a store, maintained by seller_dashboard.metrics
+    as orders are placed and change status. Rebuild with the
+    rebuild_store_metrics management command.
+    """
+
+    store = models.OneToOneField(
+        Store, on_delete=models.CASCADE, primary_key=True, related_name="metrics"
+    )
+    total_orders = models.PositiveIntegerField(default=0)
+    pending_orders = models.PositiveIntegerField(default=0)
+    delivered_orders = models.PositiveIntegerField(default=0)
+    cancelled_orders = models.PositiveIntegerField(default=0)
+    # Revenue of every order that has not been cancelled
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    delivered_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_customers = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metrics for {self.store.name}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Sales of one store on one (UTC) day, filled from orders by
+    seller_dashboard.rollup. Cancelled orders are excluded.
+    """
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    customers = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the index behind per-store date range scans.
+            models.UniqueConstraint(fields=["store", "day"], name="unique_store_day")
+        ]
+
+    def __str__(self):
+        return f"{self.store.name} - {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """How far (by Order.updated_at) a rollup has consumed the orders table."""
+
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
 class Payment(models.Model):
     """
     Stores each monthly payment made towards a Loan.
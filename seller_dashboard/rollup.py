@@ -0,0 +1,149 @@
+"""
+Daily sales rollup.
+
+refresh_sales_rollup() finds the (store, day) pairs touched by orders whose
+updated_at moved past the stored watermark, recomputes those days from the
+orders and order items, and upserts them into DailySalesRollup. Days are
+recomputed whole, so status changes and repeated runs are safe.
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import DailySalesRollup, RollupWatermark
+
+WATERMARK = "daily_sales"
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# (store, day) pairs recomputed per query
+CHUNK_SIZE = 200
+
+
+def _day_filter(pairs, prefix=""):
+    condition = Q()
+    for store_id, day in pairs:
+        start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+        condition |= Q(
+            **{
+                f"{prefix}store_id": store_id,
+                f"{prefix}created_at__gte": start,
+                f"{prefix}created_at__lt": start + timedelta(days=1),
+            }
+        )
+    return condition
+
+
+def _recompute(pairs):
+    """Upsert rollup rows for the given (store_id, day) pairs."""
+    counted = ~Q(status="cancelled")
+    totals = (
+        Order.objects.filter(_day_filter(pairs), counted)
+        .annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values("store_id", "day")
+        .annotate(
+            revenue=Sum("total_price"),
+            orders=Count("id"),
+            customers=Count("user", distinct=True),
+        )
+        .order_by()
+    )
+    units = (
+        OrderItem.objects.filter(
+            _day_filter(pairs, prefix="order__"), ~Q(order__status="cancelled")
+        )
+        .annotate(day=TruncDate("order__created_at", tzinfo=dt_timezone.utc))
+        .values("order__store_id", "day")
+        .annotate(units=Sum("quantity"))
+        .order_by()
+    )
+    units_by_pair = {
+        (row["order__store_id"], row["day"]): row["units"] for row in units
+    }
+    totals_by_pair = {(row["store_id"], row["day"]): row for row in totals}
+
+    rows = []
+    for store_id, day in pairs:
+        row = totals_by_pair.get((store_id, day), {})
+        rows.append(
+            DailySalesRollup(
+                store_id=store_id,
+                day=day,
+                revenue=row.get("revenue") or 0,
+                orders=row.get("orders", 0),
+                customers=row.get("customers", 0),
+                units_sold=units_by_pair.get((store_id, day)) or 0,
+            )
+        )
+    DailySalesRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["store", "day"],
+        update_fields=["revenue", "orders", "units_sold", "customers", "updated_at"],
+    )
+
+
+def refresh_sales_rollup(now=None):
+    """
+    Roll up orders changed since the last run. Orders updated within
+    SALES_ROLLUP_LAG_SECONDS of now are left for the next run, so rows from
+    transactions still in flight are not skipped past. Returns the number of
+    (store, day) rows refreshed.
+    """
+    now = now or timezone.now()
+    upper = now - timedelta(seconds=settings.SALES_ROLLUP_LAG_SECONDS)
+
+    with transaction.atomic():
+        watermark, created = RollupWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK, defaults={"position": EPOCH}
+        )
+        if upper <= watermark.position:
+            return 0
+
+        pairs = list(
+            Order.objects.filter(
+                updated_at__gt=watermark.position, updated_at__lte=upper
+            )
+            .annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+            .values_list("store_id", "day")
+            .exclude(store_id__isnull=True)
+            .distinct()
+            .order_by()
+        )
+        for i in range(0, len(pairs), CHUNK_SIZE):
+            _recompute(pairs[i : i + CHUNK_SIZE])
+
+        watermark.position = upper
+        watermark.save(update_fields=["position"])
+    return len(pairs)
+
+
+def distinct_customers(store_id, start, end, kind):
+    """
+    {period start: distinct customers} for the store's orders from start to
+    end (dates, inclusive), bucketed by week or month. Daily rollup counts
+    can't be added up for this: a customer who ordered on two days of the
+    same week would count twice.
+    """
+    return dict(
+        Order.objects.filter(
+            ~Q(status="cancelled"),
+            store_id=store_id,
+            created_at__gte=datetime.combine(start, time.min, tzinfo=dt_timezone.utc),
+            created_at__lt=datetime.combine(
+                end + timedelta(days=1), time.min, tzinfo=dt_timezone.utc
+            ),
+        )
+        .annotate(
+            period=Trunc(
+                "created_at", kind, output_field=DateField(), tzinfo=dt_timezone.utc
+            )
+        )
+        .values_list("period")
+        .annotate(customers=Count("user", distinct=True))
+        .order_by()
+    )
@@ -35,3 +35,23 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ["id", "loan", "amount", "payment_date"]
+
+
+class SalesSeriesQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(
+        choices=["day", "week", "month"], default="day"
+    )
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end.")
+        return attrs
+
+
+class PaymentHistoryQuerySerializer(serializers.Serializer):
+    payments_page = serializers.IntegerField(min_value=1, default=1)
+    payments_page_size = serializers.IntegerField(
+        min_value=1, max_value=200, required=False
+    )
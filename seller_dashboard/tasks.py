@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .rollup import refresh_sales_rollup
+
+
+@shared_task
+def refresh_daily_sales():
+    """Fold recently changed orders into the daily sales rollup."""
+    return refresh_sales_rollup()
@@ -1,3 +1,265 @@
-from django.test import TestCase
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from orders.checkout import change_order_status
+from orders.models import Order, OrderItem
+from stores.models import Store
+from whatsapp_bot.views import get_store_stats
+from .metrics import order_placed, rebuild_store_metrics
+from .models import DailySalesRollup, Dashboard, Loan, Payment, StoreMetrics
+from .rollup import refresh_sales_rollup
+
+User = get_user_model()
+
+
+class StoreMetricsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.seller)
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.store.customers.add(self.customer)
+        Dashboard.objects.create(owner=self.seller)
+
+    def place(self, total_price):
+        order = Order.objects.create(
+            user=self.customer,
+            store=self.store,
+            total_price=total_price,
+            status="pending",
+        )
+        order_placed(order)
+        return order
+
+    def set_status(self, order, new_status):
+        return self.client.patch(
+            f"/api/v1/orders/{order.id}/status/", {"status": new_status}, format="json"
+        )
+
+    def metrics(self):
+        return StoreMetrics.objects.get(store=self.store)
+
+    def test_status_changes_move_counters(self):
+        first = self.place(30)
+        second = self.place(20)
+
+        self.assertEqual(self.set_status(first, "delivered").status_code, 200)
+        self.set_status(second, "cancelled")
+        # Re-sending the same status is a no-op.
+        self.set_status(second, "cancelled")
+
+        metrics = self.metrics()
+        self.assertEqual(metrics.total_orders, 2)
+        self.assertEqual(metrics.pending_orders, 0)
+        self.assertEqual(metrics.delivered_orders, 1)
+        self.assertEqual(metrics.cancelled_orders, 1)
+        self.assertEqual(metrics.total_revenue, 30)
+        self.assertEqual(metrics.delivered_revenue, 30)
+        self.assertEqual(metrics.total_customers, 1)
+
+    def test_status_endpoint_rejects_unknown_status_and_foreign_orders(self):
+        order = self.place(10)
+        self.assertEqual(
+            self.set_status(order, "completed").status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="password"
+        )
+        Store.objects.create(name="Other Store", owner=other)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(
+            self.set_status(order, "delivered").status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(self.metrics().pending_orders, 1)
+
+    def test_dashboard_reads_metrics(self):
+        self.place(25)
+        # dashboard with metrics, then the (absent) active loan
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/seller_dashboard/")
+        self.assertEqual(response.data["total_orders"], 1)
+        self.assertEqual(response.data["total_revenue"], 25.0)
+        self.assertEqual(response.data["new_customers"], 1)
+
+    def test_dashboard_loan_summary_in_two_queries(self):
+        loan = Loan.objects.create(
+            borrower=self.seller,
+            loan_type="working capital",
+            purpose="stock",
+            amount=1200,
+            interest_rate=5.0,
+            term_months=12,
+            start_date=date(2025, 1, 1),
+            end_date=date(2026, 1, 1),
+        )
+        for month in range(1, 6):
+            Payment.objects.create(
+                loan=loan, amount=100, payment_date=date(2025, month + 1, 1)
+            )
+
+        rebuild_store_metrics(self.store.id)
+
+        # dashboard with metrics, then the active loan joined to its payments
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/seller_dashboard/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {
+                key: response.data["loan_summary"][key]
+                for key in ("loan_id", "amount", "term_months", "start_date")
+            },
+            {
+                "loan_id": loan.loan_id,
+                "amount": 1200.0,
+                "term_months": 12,
+                "start_date": "2025-01-01",
+            },
+        )
+        self.assertEqual(
+            response.data["payment_status"]["next_payment_due"], "2025-07-01"
+        )
+        self.assertEqual(
+            response.data["payment_status"]["repayment_progress"],
+            {"paid": 500.0, "total": 100.0},
+        )
+        self.assertEqual(len(response.data["payment_history"]), 5)
+        self.assertNotIn("payment_history_pagination", response.data)
+
+        response = self.client.get(
+            "/api/v1/seller_dashboard/", {"payments_page": 2, "payments_page_size": 2}
+        )
+        self.assertEqual(
+            [p["payment_date"] for p in response.data["payment_history"]],
+            ["2025-04-01", "2025-05-01"],
+        )
+        self.assertEqual(
+            response.data["payment_history_pagination"],
+            {"page": 2, "page_size": 2, "total": 5},
+        )
+
+    def test_store_stats_read_metrics(self):
+        order = self.place(40)
+        self.set_status(order, "delivered")
+        stats = get_store_stats(self.store)
+        self.assertIn("Total Orders: 1", stats)
+        self.assertIn("Total Revenue: N40.00", stats)
+
+    def test_rebuild_command_reconciles_drift(self):
+        self.place(15)
+        StoreMetrics.objects.filter(store=self.store).update(
+            total_orders=9, total_revenue=0
+        )
+        out = StringIO()
+        call_command("rebuild_store_metrics", stdout=out)
+
+        self.assertIn("1 had drifted", out.getvalue())
+        metrics = self.metrics()
+        self.assertEqual(metrics.total_orders, 1)
+        self.assertEqual(metrics.total_revenue, 15)
+
+
+@override_settings(SALES_ROLLUP_LAG_SECONDS=0)
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.seller)
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.customers = [
+            User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="password",
+            )
+            for i in range(2)
+        ]
+
+    def place(self, day, customer, total_price, quantity):
+        order = Order.objects.create(
+            user=customer, store=self.store, total_price=total_price, status="pending"
+        )
+        OrderItem.objects.create(
+            order=order, product_name="Shoe", unit_price=1, quantity=quantity
+        )
+        created_at = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc)
+        Order.objects.filter(id=order.id).update(
+            created_at=created_at + timedelta(hours=9)
+        )
+        return order
+
+    def refresh(self):
+        return refresh_sales_rollup()
+
+    def test_rollup_fills_days_incrementally(self):
+        first, second = date(2025, 3, 3), date(2025, 3, 4)
+        self.place(first, self.customers[0], 10, 2)
+        self.place(first, self.customers[0], 15, 1)
+        cancelled = self.place(first, self.customers[1], 5, 1)
+        self.place(second, self.customers[1], 20, 4)
+
+        self.assertEqual(self.refresh(), 2)
+        day = DailySalesRollup.objects.get(store=self.store, day=first)
+        self.assertEqual(
+            (day.revenue, day.orders, day.units_sold, day.customers), (30, 3, 4, 2)
+        )
+
+        change_order_status(self.store, cancelled.id, "cancelled")
+        # Only the day touched by the status change is recomputed.
+        self.assertEqual(self.refresh(), 1)
+        day.refresh_from_db()
+        self.assertEqual(
+            (day.revenue, day.orders, day.units_sold, day.customers), (25, 2, 3, 1)
+        )
+        self.assertEqual(self.refresh(), 0)
+
+    def test_sales_series_reads_rollup(self):
+        # 2025-03-03 is a Monday; the 10th starts the following week.
+        for day, total in [(3, 10), (5, 20), (10, 40)]:
+            self.place(date(2025, 3, day), self.customers[0], total, 1)
+        self.place(date(2025, 3, 5), self.customers[1], 5, 1)
+        self.refresh()
+
+        # store, rollup, distinct customers per week from the orders
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/api/v1/seller_dashboard/sales/",
+                {"granularity": "week", "start": "2025-03-01", "end": "2025-03-31"},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row["period"], row["revenue"], row["orders"], row["customers"])
+                for row in response.data["series"]
+            ],
+            [("2025-03-03", 35.0, 3, 2), ("2025-03-10", 40.0, 1, 1)],
+        )
+
+        response = self.client.get(
+            "/api/v1/seller_dashboard/sales/",
+            {"granularity": "day", "start": "2025-03-03", "end": "2025-03-05"},
+        )
+        self.assertEqual(
+            [(row["period"], row["customers"]) for row in response.data["series"]],
+            [("2025-03-03", 1), ("2025-03-05", 2)],
+        )
+
+        response = self.client.get(
+            "/api/v1/seller_dashboard/sales/", {"granularity": "year"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 
-from .views import DashboardView
+from .views import DashboardView, SalesSeriesView
 
 
 app_name = "seller_dashboard"
@@ -8,4 +8,5 @@ app_name = "seller_dashboard"
 
 urlpatterns = [
     path("", DashboardView.as_view(), name="seller_dashboard"),
+    path("sales/", SalesSeriesView.as_view(), name="sales-series"),
 ]
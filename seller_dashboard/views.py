@@ -87,64 +87,135 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
+from django.db.models import OuterRef, Subquery, Sum
 from datetime import timedelta
-from .models import Dashboard, Loan, Payment
-from .serializers import DashboardSerializer
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from stores.models import Store
+from .models import Dashboard, DailySalesRollup, Loan, StoreMetrics
+from .serializers import (
+    DashboardSerializer,
+    PaymentHistoryQuerySerializer,
+    SalesSeriesQuerySerializer,
+)
+from .metrics import metrics_for_owner
+from .rollup import distinct_customers
+
+
+def _store_metric(field):
+    # One of the owner's StoreMetrics columns, read inside the dashboard query
+    return Subquery(
+        StoreMetrics.objects.filter(store__owner=OuterRef("owner")).values(field)[:1]
+    )
+
+
+LOAN_SUMMARY_FIELDS = (
+    "loan_id",
+    "loan_type",
+    "amount",
+    "interest_rate",
+    "term_months",
+    "start_date",
+    "end_date",
+    "status",
+    "payment_status",
+)
 
 
 class DashboardView(APIView):
     """
-    GET /api/v1/dashboard/
+    GET /api/v1/dashboard/[?payments_page=N&payments_page_size=M]
     Returns a JSON response with dashboard metrics, details of the user's active loan,
-    and payment status/history based on monthly repayments.
+    and payment status/history based on monthly repayments. Pass
+    payments_page_size to page through the payment history of long loans.
     """
 
     def get(self, request):
-        user = request.user
+        user_id = request.user.id
+        params = PaymentHistoryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
 
-        # 1) Get the user's dashboard record
-        dashboard = get_object_or_404(Dashboard, owner=user)
+        # 1) Get the user's dashboard record together with the store's running
+        # sales metrics
+        dashboard = get_object_or_404(
+            Dashboard.objects.annotate(
+                store_revenue=_store_metric("total_revenue"),
+                store_orders=_store_metric("total_orders"),
+                store_customers=_store_metric("total_customers"),
+            ),
+            owner_id=user_id,
+        )
         dashboard_data = DashboardSerializer(dashboard).data
+        if dashboard.store_orders is None:
+            # No metrics row yet: build it (or find the user has no store)
+            metrics = metrics_for_owner(user_id)
+            if metrics:
+                dashboard.store_revenue = metrics.total_revenue
+                dashboard.store_orders = metrics.total_orders
+                dashboard.store_customers = metrics.total_customers
 
-        # 2) Retrieve the user's single active loan (if any)
-        active_loan = Loan.objects.filter(borrower=user, status="active").first()
+        # 2) Retrieve the user's single active loan (if any) joined to its
+        # payments, oldest first: one row per payment, or one without any
+        loan_rows = (
+            Loan.objects.filter(borrower_id=user_id, status="active")
+            .order_by("pk", "payments__payment_date", "payments__id")
+            .values(
+                "pk", *LOAN_SUMMARY_FIELDS, "payments__amount", "payments__payment_date"
+            )
+        )
+        active_loan = None
+        payments = []
+        for row in loan_rows:
+            if active_loan is None:
+                active_loan = row
+            elif row["pk"] != active_loan["pk"]:
+                break
+            if row["payments__payment_date"] is not None:
+                payments.append(row)
 
+        payment_pagination = None
         if active_loan:
-            # Retrieve payments for the active loan, ordered by payment_date
-            payments = active_loan.payments.order_by("payment_date")
-            if payments.exists():
-                last_payment_date = payments.last().payment_date
+            # Totals and the history page are all read from the fetched rows
+            if payments:
+                last_payment_date = payments[-1]["payments__payment_date"]
                 next_payment_date = last_payment_date + timedelta(days=30)
             else:
-                next_payment_date = active_loan.start_date + timedelta(days=30)
+                next_payment_date = active_loan["start_date"] + timedelta(days=30)
 
             # Calculate monthly payment
-            monthly_payment = float(active_loan.amount) / active_loan.term_months
+            monthly_payment = float(active_loan["amount"]) / active_loan["term_months"]
 
             # Total paid for this loan
-            total_paid = payments.aggregate(total_paid=Sum("amount"))["total_paid"] or 0
+            total_paid = sum(payment["payments__amount"] for payment in payments)
 
-            # Build payment history for the active loan
-            payment_history = []
-            for payment in payments.order_by("payment_date"):
-                payment_history.append(
-                    {
-                        "amount": float(payment.amount),
-                        "payment_date": payment.payment_date.isoformat(),
-                    }
-                )
+            history = payments
+            page_size = params.validated_data.get("payments_page_size")
+            if page_size:
+                page = params.validated_data["payments_page"]
+                history = payments[(page - 1) * page_size : page * page_size]
+                payment_pagination = {
+                    "page": page,
+                    "page_size": page_size,
+                    "total": len(payments),
+                }
+            payment_history = [
+                {
+                    "amount": float(payment["payments__amount"]),
+                    "payment_date": payment["payments__payment_date"].isoformat(),
+                }
+                for payment in history
+            ]
 
             loan_summary = {
-                "loan_id": active_loan.loan_id,
-                "loan_type": active_loan.loan_type,
-                "amount": float(active_loan.amount),
-                "interest_rate": active_loan.interest_rate,
-                "term_months": active_loan.term_months,
-                "start_date": active_loan.start_date.isoformat(),
-                "end_date": active_loan.end_date.isoformat(),
-                "status": active_loan.status,
-                "payment_status": active_loan.payment_status,
+                "loan_id": active_loan["loan_id"],
+                "loan_type": active_loan["loan_type"],
+                "amount": float(active_loan["amount"]),
+                "interest_rate": active_loan["interest_rate"],
+                "term_months": active_loan["term_months"],
+                "start_date": active_loan["start_date"].isoformat(),
+                "end_date": active_loan["end_date"].isoformat(),
+                "status": active_loan["status"],
+                "payment_status": active_loan["payment_status"],
             }
 
             payment_status = {
@@ -159,15 +230,79 @@ class DashboardView(APIView):
             payment_status = None
             payment_history = []
 
-        # 3) Build the final response data
+        # Build the final response data
         response_data = {
-            "total_revenue": float(dashboard_data["total_revenue"]),
-            "new_customers": dashboard_data["new_customers"],
-            "total_orders": dashboard_data["total_orders"],
+            "total_revenue": float(dashboard.store_revenue or 0),
+            "new_customers": dashboard.store_customers or 0,
+            "total_orders": dashboard.store_orders or 0,
             "loan_eligibility": dashboard_data["max_loan_amount"],
             "loan_summary": loan_summary,
             "payment_status": payment_status,
             "payment_history": payment_history,
         }
+        if payment_pagination:
+            response_data["payment_history_pagination"] = payment_pagination
 
         return Response(response_data, status=status.HTTP_200_OK)
+
+
+class SalesSeriesView(APIView):
+    """
+    GET /api/v1/seller_dashboard/sales/?granularity=day|week|month[&start=YYYY-MM-DD][&end=YYYY-MM-DD]
+    Revenue, orders, units sold and customers per period for the seller's
+    store, read from the daily sales rollup. For weeks and months, distinct
+    customers are counted from the orders, as daily counts don't add up.
+    """
+
+    # Default window when no start date is given
+    DEFAULT_SPAN = {"day": 30, "week": 7 * 12, "month": 365}
+
+    def get(self, request):
+        params = SalesSeriesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        granularity = params.validated_data["granularity"]
+        end = params.validated_data.get("end") or timezone.now().date()
+        start = params.validated_data.get("start") or end - timedelta(
+            days=self.DEFAULT_SPAN[granularity]
+        )
+
+        store = get_object_or_404(Store, owner_id=request.user.id)
+        rows = (
+            DailySalesRollup.objects.filter(store=store, day__range=(start, end))
+            .annotate(period=Trunc("day", granularity))
+            .values("period")
+            .annotate(
+                revenue=Sum("revenue"),
+                orders=Sum("orders"),
+                units_sold=Sum("units_sold"),
+                customers=Sum("customers"),
+            )
+            .order_by("period")
+        )
+        customers = None
+        if granularity != "day":
+            customers = distinct_customers(store.id, start, end, granularity)
+        series = [
+            {
+                "period": row["period"].isoformat(),
+                "revenue": float(row["revenue"]),
+                "orders": row["orders"],
+                "units_sold": row["units_sold"],
+                "customers": (
+                    row["customers"]
+                    if customers is None
+                    else customers.get(row["period"], 0)
+                ),
+            }
+            for row in rows
+        ]
+
+        return Response(
+            {
+                "granularity": granularity,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "series": series,
+            },
+            status=status.HTTP_200_OK,
+        )
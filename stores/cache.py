@@ -0,0 +1,83 @@
+"""
+Versioned per-store cache for storefront payloads.
+
+Every cached payload key embeds the store's current version, so invalidating a
+store is a single counter bump: old entries simply stop being addressed and
+age out on their own.
+"""
+
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _normalize_store_id(store_id):
+    try:
+        return str(uuid.UUID(str(store_id)))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _version_key(store_id):
+    return f"storefront:{store_id}:version"
+
+
+def get_store_version(store_id):
+    key = _version_key(store_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version key that was evicted can never come
+        # back at a number older entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_store_version(store_id):
+    """Invalidate every cached storefront payload of a store once the current
+    transaction commits."""
+    store_id = _normalize_store_id(store_id)
+    if store_id is None:
+        return
+
+    def bump():
+        try:
+            cache.incr(_version_key(store_id))
+        except ValueError:
+            cache.set(_version_key(store_id), time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def payload_cache_key(store_id, scope, request):
+    """
+    Cache key for a storefront payload, or None for a malformed store id.
+
+    Read the key once, before building the payload: if a write commits while
+    the payload is being built, the bump orphans this key instead of letting
+    stale data be stored under the new version.
+    """
+    store_id = _normalize_store_id(store_id)
+    if store_id is None:
+        return None
+    # The full URL covers query params (cursor, page size) and the host used
+    # for absolute links in the payload.
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    version = get_store_version(store_id)
+    return f"storefront:{store_id}:v{version}:{scope}:{url_hash}"
+
+
+def get_cached_payload(key):
+    if key is None:
+        return None
+    return cache.get(key)
+
+
+def cache_payload(key, payload):
+    if key is None:
+        return
+    cache.set(key, payload, settings.STOREFRONT_CACHE_TIMEOUT)
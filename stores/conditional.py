@@ -0,0 +1,170 @@
+"""
+Conditional GET support (ETag / Last-Modified) for storefront endpoints.
+
+Validators are derived from the updated_at columns of the store and its
+catalog with a single query, so a client holding a fresh copy gets a 304
+without anything being serialized.
+"""
+
+import hashlib
+from collections import namedtuple
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from products.models import Category, Product
+from .cache import cache_payload, get_cached_payload, payload_cache_key
+from .models import Store
+
+Validators = namedtuple("Validators", ["etag", "last_modified"])
+
+
+def _store_subquery(model, aggregate):
+    return Subquery(
+        model.objects.filter(store=OuterRef("pk"))
+        .order_by()
+        .values("store")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def _skip_malformed_ids(get_validators):
+    """Ids come straight from the URL; a malformed one has no validators."""
+
+    @wraps(get_validators)
+    def wrapper(request, object_id):
+        try:
+            return get_validators(request, object_id)
+        except (ValueError, ValidationError):
+            return None
+
+    return wrapper
+
+
+def _build_validators(request, parts):
+    """
+    ETag over the request path plus every part; Last-Modified is the newest
+    timestamp among the parts. Counts are included so deletions change the
+    ETag even though they leave no updated_at behind.
+    """
+    path = request.get_full_path()
+    digest = hashlib.md5(
+        ":".join([path] + [str(part) for part in parts]).encode()
+    ).hexdigest()
+    timestamps = [part for part in parts if hasattr(part, "timestamp")]
+    last_modified = int(max(timestamps).timestamp()) if timestamps else None
+    return Validators(etag=f'W/"{digest}"', last_modified=last_modified)
+
+
+@_skip_malformed_ids
+def product_list_validators(request, store_id):
+    row = (
+        Store.objects.filter(id=store_id)
+        .annotate(
+            products_modified=_store_subquery(Product, Max("updated_at")),
+            product_count=_store_subquery(Product, Count("id")),
+            categories_modified=_store_subquery(Category, Max("updated_at")),
+            category_count=_store_subquery(Category, Count("id")),
+        )
+        .values_list(
+            "updated_at",
+            "products_modified",
+            "product_count",
+            "categories_modified",
+            "category_count",
+        )
+        .first()
+    )
+    return _build_validators(request, row) if row else None
+
+
+@_skip_malformed_ids
+def category_list_validators(request, store_id):
+    row = (
+        Store.objects.filter(id=store_id)
+        .annotate(
+            categories_modified=_store_subquery(Category, Max("updated_at")),
+            category_count=_store_subquery(Category, Count("id")),
+        )
+        .values_list("categories_modified", "category_count")
+        .first()
+    )
+    return _build_validators(request, row) if row else None
+
+
+@_skip_malformed_ids
+def store_validators(request, store_id):
+    row = (
+        Store.objects.filter(id=store_id)
+        .annotate(customer_count=Count("customers"))
+        .values_list("updated_at", "owner__updated_at", "customer_count")
+        .first()
+    )
+    return _build_validators(request, row) if row else None
+
+
+@_skip_malformed_ids
+def product_validators(request, product_id):
+    # The serialized category reads "<category> - <store>", so both feed in.
+    row = (
+        Product.objects.filter(id=product_id)
+        .values_list("updated_at", "category__updated_at", "store__updated_at")
+        .first()
+    )
+    return _build_validators(request, row) if row else None
+
+
+def not_modified_response(request, validators):
+    """Return a 304 if the request's preconditions match, else None."""
+    if validators is None:
+        return None
+    response = get_conditional_response(
+        request, etag=validators.etag, last_modified=validators.last_modified
+    )
+    if response is not None:
+        set_validator_headers(response, validators)
+    return response
+
+
+def set_validator_headers(response, validators):
+    if validators is None:
+        return response
+    response["ETag"] = quote_etag(validators.etag)
+    if validators.last_modified is not None:
+        response["Last-Modified"] = http_date(validators.last_modified)
+    return response
+
+
+def storefront_response(request, store_id, scope, get_validators, build_response):
+    """
+    Serve a cacheable storefront GET.
+
+    Answers 304 when the client's copy is current, otherwise returns the cached
+    payload, otherwise calls build_response() and caches its data on success.
+    Cached entries carry their validators, so a cache hit costs no queries.
+    """
+    key = payload_cache_key(store_id, scope, request)
+    cached = get_cached_payload(key)
+    if cached is not None:
+        payload, validators = cached
+    else:
+        payload, validators = None, get_validators(request, store_id)
+
+    response = not_modified_response(request, validators)
+    if response is not None:
+        return response
+
+    if payload is not None:
+        response = Response(payload, status=status.HTTP_200_OK)
+    else:
+        response = build_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        cache_payload(key, (response.data, validators))
+    return set_validator_headers(response, validators)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stores", "0006_store_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="store",
+            name="hero_image_variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
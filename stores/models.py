@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 import uuid
 from cloudinary.models import CloudinaryField
 
+from accounts.phone import forget_sellers
+
 User = get_user_model()
 
 
@@ -17,11 +19,33 @@ class Store(models.Model):
     hero_name = models.CharField(max_length=255, null=True, blank=True)
     hero_description = models.TextField(blank=True, null=True)
     hero_image = CloudinaryField("stores/images", null=True)
+    # {variant: url} rendered when hero_image is uploaded, see products.variants
+    hero_image_variants = models.JSONField(default=dict, blank=True)
     template = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     customers = models.ManyToManyField(
         User, related_name="stores", null=True, blank=True
     )
 
     def __str__(self):
         return f"{self.name} - {self.owner.email}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        store = super().from_db(db, field_names, values)
+        store._loaded_owner_id = store.__dict__.get("owner_id")
+        return store
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The owner's WhatsApp number resolves to this store; a new store or a
+        # change of owner makes the cached resolution stale.
+        loaded_owner_id = getattr(self, "_loaded_owner_id", None)
+        if self.owner_id != loaded_owner_id:
+            forget_sellers(loaded_owner_id, self.owner_id)
+            self._loaded_owner_id = self.owner_id
+
+    def delete(self, *args, **kwargs):
+        forget_sellers(self.owner_id)
+        return super().delete(*args, **kwargs)
@@ -1,11 +1,59 @@
+import logging
+
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from rest_framework import serializers
+
+from products.variants import requested_variant, variant_url
 from .models import Store
+from .tasks import render_hero_image_variants
+
+logger = logging.getLogger(__name__)
+
+
+def _queue_hero_image_variants(store_id):
+    try:
+        render_hero_image_variants.delay(store_id)
+    except Exception:
+        # The store is saved and serves the original hero image until
+        # build_image_variants renders what a lost job missed.
+        logger.warning(
+            "Could not queue hero image variants for store %s", store_id, exc_info=True
+        )
 
 
 class StoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Store
         fields = "__all__"
+        read_only_fields = ["hero_image_variants"]
+
+    def _reset_hero_image_variants(self, validated_data):
+        # A new hero image drops the variants of the old one. Its own are
+        # rendered by a job once the store is saved; until then readers get
+        # the original.
+        if "hero_image" not in validated_data:
+            return False
+        validated_data["hero_image_variants"] = {}
+        return isinstance(validated_data["hero_image"], UploadedFile)
+
+    def _render_hero_image_variants(self, store):
+        store_id = str(store.id)
+        transaction.on_commit(lambda: _queue_hero_image_variants(store_id))
+
+    def create(self, validated_data):
+        uploaded = self._reset_hero_image_variants(validated_data)
+        store = super().create(validated_data)
+        if uploaded:
+            self._render_hero_image_variants(store)
+        return store
+
+    def update(self, instance, validated_data):
+        uploaded = self._reset_hero_image_variants(validated_data)
+        store = super().update(instance, validated_data)
+        if uploaded:
+            self._render_hero_image_variants(store)
+        return store
 
 
 # class StoreGetSerializer(serializers.ModelSerializer):
@@ -24,14 +72,16 @@ class StoreGetSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Store
-        fields = "__all__"
+        exclude = ["hero_image_variants"]
         read_only_fields = ["owner", "id", "created_at"]
 
     def get_hero_image(self, obj):
         if obj.hero_image:
-            url = obj.hero_image.url
-            # Use the request context to build an absolute URL
             request = self.context.get("request")
+            url = variant_url(
+                obj.hero_image_variants, obj.hero_image, requested_variant(request)
+            )
+            # Use the request context to build an absolute URL
             if request:
                 return request.build_absolute_uri(url)
             return url
@@ -0,0 +1,26 @@
+import requests
+from celery import shared_task
+from django.utils import timezone
+
+from products.variants import fetch_variants
+from .cache import bump_store_version
+from .models import Store
+
+
+@shared_task(bind=True, max_retries=3)
+def render_hero_image_variants(self, store_id):
+    """Render the variants of a store's newly uploaded hero image."""
+    store = Store.objects.filter(id=store_id).first()
+    if store is None or not store.hero_image or store.hero_image_variants:
+        return False
+    try:
+        variants = fetch_variants(store.hero_image)
+    except requests.RequestException as e:
+        raise self.retry(exc=e, countdown=30)
+    # Only if the hero image wasn't replaced meanwhile
+    updated = Store.objects.filter(id=store_id, hero_image=store.hero_image).update(
+        hero_image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        bump_store_version(store_id)
+    return bool(updated)
@@ -1,3 +1,71 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.tests import (
+    VARIANT_STORAGE,
+    png_bytes,
+    png_file,
+    run_task,
+    serve_originals,
+    slow_upload,
+)
+from .models import Store
+from .tasks import render_hero_image_variants
+
+User = get_user_model()
+
+
+class StoreDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        self.client.force_authenticate(user=self.owner)
+        self.store = Store.objects.create(name="Test Store", owner=self.owner)
+        self.url = f"/api/v1/stores/{self.store.id}/"
+
+    def test_store_detail_is_cached_until_updated(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["name"], "Test Store")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {"name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["name"], "Renamed")
+
+    @VARIANT_STORAGE
+    @mock.patch("cloudinary.models.uploader.upload_resource", side_effect=slow_upload)
+    def test_hero_image_variants(self, upload):
+        with run_task(render_hero_image_variants), serve_originals(
+            png_bytes((1000, 500))
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                self.url,
+                {"hero_image": png_file("hero.png", size=(1000, 500))},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Rendered after the response, by the job queued on commit
+        self.assertTrue(response.data["hero_image"].endswith("/hero.png"))
+        self.store.refresh_from_db()
+        self.assertEqual(self.store.hero_image.public_id, "hero")
+        self.assertEqual(
+            set(self.store.hero_image_variants), {"thumbnail", "card", "full"}
+        )
 
-# Create your tests here.
+        response = self.client.get(self.url, {"variant": "card"})
+        self.assertEqual(
+            response.data["hero_image"], "http://testserver/media/hero_card.webp"
+        )
+        self.assertNotIn("hero_image_variants", response.data)
@@ -8,6 +8,8 @@ from .models import Store
 from .serializers import StoreSerializer, StoreGetSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
+from .cache import bump_store_version
+from .conditional import storefront_response, store_validators
 
 
 class StoreView(APIView):
@@ -18,8 +20,7 @@ class StoreView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        stores = Store.objects.filter(owner=user)
+        stores = Store.objects.filter(owner_id=request.user.id)
         serializer = StoreGetSerializer(stores, many=True, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -40,7 +41,16 @@ class StoreDetailView(APIView):
 
     def get(self, request, id):
         store_id = id
-        store = Store.objects.get(id=store_id)
+        return storefront_response(
+            request,
+            store_id,
+            "store",
+            store_validators,
+            lambda: self.retrieve_store(request, store_id),
+        )
+
+    def retrieve_store(self, request, store_id):
+        store = Store.objects.select_related("owner").get(id=store_id)
         serializer = StoreGetSerializer(store, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -51,6 +61,7 @@ class StoreDetailView(APIView):
         serializer = StoreSerializer(store, data=data, partial=True)
         if serializer.is_valid():
             store = serializer.save()
+            bump_store_version(store.id)
             return Response(StoreGetSerializer(store).data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -58,4 +69,5 @@ class StoreDetailView(APIView):
         store_id = id
         store = Store.objects.get(id=store_id)
         store.delete()
+        bump_store_version(store_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,192 @@
+"""
+Gateway to the generative model behind the WhatsApp `ai` command.
+
+The gateway keeps one warm client per process and answers repeated questions
+(compared after normalization) from a TTL+LRU cache. It also enforces
+per-seller budgets before calling the model. Budgets live in the Django
+cache, so they hold across worker processes. Counters for requests, cache
+hits, rejections, errors and model latency are kept per process; see stats().
+
+The backend is pluggable (AI_BACKEND); FakeBackend answers offline, for tests
+and load tests.
+"""
+
+import re
+import threading
+import time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+SYSTEM_INSTRUCTION = (
+    "You are a helpful assistant responding to questions by online stoee owners on ecomX's  via WhatsApp bot. "
+    "Keep your answers concise and informative, but a bit detailed  since this is for a mobile interface. "
+    "Format your response appropriately for WhatsApp (no HTML, use * for bold, etc.)."
+)
+
+
+class AIBudgetExceeded(Exception):
+    """A seller has too many questions in flight or has used up their rate."""
+
+
+class GeminiBackend:
+    """Google Gemini through a single reusable client."""
+
+    def __init__(self):
+        from google import genai
+        from google.genai import types
+
+        # Model calls time out along with the in-flight budget slot they hold.
+        self.client = genai.Client(
+            api_key=settings.GOOGLE_GENERATIVE_AI_API_KEY,
+            http_options=types.HttpOptions(timeout=settings.AI_REQUEST_TIMEOUT * 1000),
+        )
+        self.config = types.GenerateContentConfig(
+            system_instruction=SYSTEM_INSTRUCTION,
+            max_output_tokens=500,  # Limit response length for WhatsApp
+        )
+
+    def generate(self, prompt):
+        response = self.client.models.generate_content(
+            model=settings.AI_MODEL, config=self.config, contents=[prompt]
+        )
+        return response.text
+
+
+class FakeBackend:
+    """Canned answers after a fixed delay, standing in for the model offline."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return f"Answer to: {prompt}"
+
+
+def normalize_prompt(prompt):
+    """Case, surrounding whitespace and runs of spaces don't change a question."""
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+def _incr(key, timeout):
+    """Increment a counter that expires after timeout, starting it if needed."""
+    while True:
+        if cache.add(key, 1, timeout):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            pass  # expired between add and incr; start it again
+
+
+class AIGateway:
+    def __init__(self, backend):
+        self.backend = backend
+        self._answers = TTLCache(
+            maxsize=settings.AI_CACHE_SIZE, ttl=settings.AI_CACHE_TTL, timer=time.time
+        )
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ["requests", "hits", "misses", "rejected", "errors"], 0
+        )
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _reserve(self, seller_id):
+        # A cap on questions in flight, then a fixed-window rate budget, so a
+        # question turned away for concurrency doesn't use up the rate. The
+        # in-flight counter expires on its own in case a worker dies holding it.
+        active_key = f"ai:{seller_id}:active"
+        active = _incr(active_key, settings.AI_REQUEST_TIMEOUT)
+        if active > settings.AI_MAX_CONCURRENT_PER_SELLER:
+            self._release(seller_id)
+            raise AIBudgetExceeded("concurrency")
+
+        window = int(time.time() // settings.AI_RATE_WINDOW)
+        rate_key = f"ai:{seller_id}:rate:{window}"
+        if _incr(rate_key, settings.AI_RATE_WINDOW) > settings.AI_RATE_LIMIT:
+            self._release(seller_id)
+            raise AIBudgetExceeded("rate")
+
+    def _release(self, seller_id):
+        try:
+            cache.decr(f"ai:{seller_id}:active")
+        except ValueError:
+            pass  # already expired
+
+    def ask(self, seller_id, prompt):
+        """
+        Answer prompt for seller_id, from the cache when the same question was
+        asked recently. Raises AIBudgetExceeded when the seller is over budget;
+        cached answers are free and never count against it.
+        """
+        self._count("requests")
+        key = normalize_prompt(prompt)
+        with self._lock:
+            answer = self._answers.get(key)
+        if answer is not None:
+            self._count("hits")
+            return answer
+        self._count("misses")
+
+        try:
+            self._reserve(seller_id)
+        except AIBudgetExceeded:
+            self._count("rejected")
+            raise
+        started = time.monotonic()
+        try:
+            # The key is only for matching; the model gets the prompt as sent.
+            answer = self.backend.generate(prompt)
+        except Exception:
+            self._count("errors")
+            raise
+        finally:
+            self._release(seller_id)
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+
+        with self._lock:
+            self._answers[key] = answer
+        return answer
+
+    def stats(self):
+        """Counters since the gateway was created, with hit rate and latency."""
+        with self._lock:
+            stats = dict(self._counters)
+            model_calls = stats["misses"] - stats["rejected"]
+            stats["hit_rate"] = (
+                stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+            )
+            stats["avg_latency"] = (
+                self._latency_total / model_calls if model_calls else 0.0
+            )
+            stats["max_latency"] = self._latency_max
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """The process-wide gateway, built on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = AIGateway(import_string(settings.AI_BACKEND)())
+    return _gateway
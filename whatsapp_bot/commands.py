@@ -0,0 +1,138 @@
+"""
+Command routing for the WhatsApp bot.
+
+Commands are registered once, at import, in a trie keyed on the words of the
+command name. Dispatching a message walks one node per word, however many
+commands exist. Each command declares its arguments. These are parsed and
+validated once, before the handler runs, and the handler receives them
+already converted. The help text is generated from the same registry.
+"""
+
+from collections import namedtuple
+from decimal import InvalidOperation
+
+# Everything a handler may need about the message being answered
+Context = namedtuple("Context", ["payload", "seller", "store", "num_media"])
+
+
+class CommandError(Exception):
+    """The arguments of a command don't match its declaration."""
+
+
+class Arg:
+    """
+    One argument of a command: a name shown in usage, a converter (str, int or
+    Decimal) and whether it may be left empty.
+    """
+
+    def __init__(self, name, type=str, required=True):
+        self.name = name
+        self.type = type
+        self.required = required
+
+    def convert(self, value):
+        value = value.strip()
+        if not value:
+            if self.required:
+                raise CommandError(f"{self.name} is required.")
+            return None
+        try:
+            return self.type(value)
+        except (ValueError, InvalidOperation):
+            kind = "a whole number" if self.type is int else "a number"
+            raise CommandError(f"{self.name} must be {kind}.")
+
+
+class Command:
+    def __init__(self, name, handler, description, args=()):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.args = list(args)
+
+    @property
+    def usage(self):
+        if not self.args:
+            return self.name
+        return f"{self.name} {'|'.join(arg.name for arg in self.args)}"
+
+    def parse(self, text):
+        """
+        Map the text after the command name to handler keyword arguments. A
+        single argument takes the whole text; several are separated by "|".
+        """
+        if not self.args:
+            if text:
+                raise CommandError(f"{self.name} takes no arguments.")
+            return {}
+        if len(self.args) == 1:
+            values = [text]
+        else:
+            values = text.split("|")
+            if len(values) != len(self.args):
+                raise CommandError(f"Expected {len(self.args)} values.")
+        return {
+            arg.name.lower(): arg.convert(value)
+            for arg, value in zip(self.args, values)
+        }
+
+
+class CommandRegistry:
+    def __init__(self):
+        self._root = {}
+        self._commands = []
+
+    def command(self, name, description, args=()):
+        """Decorator registering handler(context, **arguments) under name."""
+
+        def register(handler):
+            command = Command(name, handler, description, args)
+            node = self._root
+            for word in name.split():
+                node = node.setdefault(word, {})
+            node[None] = command
+            self._commands.append(command)
+            return handler
+
+        return register
+
+    def resolve(self, text):
+        """
+        Find the longest registered command at the start of text (already
+        lower-cased). Returns (command, remaining text), or (None, text).
+        """
+        node = self._root
+        found, rest = None, text
+        remaining = text.strip()
+        while remaining:
+            word, _, remaining = remaining.partition(" ")
+            node = node.get(word)
+            if node is None:
+                break
+            remaining = remaining.lstrip()
+            if None in node:
+                found, rest = node[None], remaining
+        return found, rest
+
+    def dispatch(self, text, context):
+        """
+        Run the command in text and return its reply, or None if text is not a
+        command.
+        """
+        command, rest = self.resolve(text)
+        if command is None:
+            return None
+        try:
+            arguments = command.parse(rest)
+        except CommandError as e:
+            return f"{e}\nInvalid format. Use: {command.usage}"
+        return command.handler(context, **arguments)
+
+    def help_text(self, store_name):
+        lines = [f"Welcome to *{store_name}*\n\n *Available commands*:\n\n"]
+        for command in self._commands:
+            description = command.description
+            if command.args:
+                description += f" (format: {command.usage})"
+            lines.append(f"*{command.name}* - {description}\n\n")
+        return "".join(lines)
@@ -0,0 +1,125 @@
+"""
+Media attached to WhatsApp messages: downloaded from Twilio and uploaded to
+Cloudinary (with their variants) concurrently, then attached to a product with
+bulk writes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import TemporaryFile
+
+import requests
+from cloudinary.uploader import upload
+from django.conf import settings
+from django.db import transaction
+from requests.adapters import HTTPAdapter
+
+from products.models import Image
+from products.variants import build_variants
+
+_session = None
+
+
+def get_media_session():
+    """
+    Shared HTTP session authenticated against Twilio, with a connection pool
+    sized for the ingestion workers.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.auth = (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        adapter = HTTPAdapter(
+            pool_connections=settings.WHATSAPP_MEDIA_WORKERS,
+            pool_maxsize=settings.WHATSAPP_MEDIA_WORKERS,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def _transfer(session, media_url, folder, public_id):
+    """
+    Download one media file from Twilio, upload it to Cloudinary and render
+    its variants from the same bytes. Returns (public_id, variants).
+    """
+    with session.get(
+        media_url, stream=True, timeout=settings.WHATSAPP_MEDIA_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        # The upload API reads streams fully into memory anyway, so read the
+        # body once and reuse it for the variants.
+        content = response.raw.read()
+    result = upload(content, folder=folder, public_id=public_id)
+    return result["public_id"], build_variants(BytesIO(content), result["public_id"])
+
+
+def download_media(media_url):
+    """
+    Download a media file from Twilio into a temporary file, rewound and ready
+    to read; the caller closes it.
+    """
+    download = TemporaryFile()
+    try:
+        with get_media_session().get(
+            media_url, stream=True, timeout=settings.WHATSAPP_MEDIA_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                download.write(chunk)
+    except Exception:
+        download.close()
+        raise
+    download.seek(0)
+    return download
+
+
+def ingest_media(payload, product, num_media):
+    """
+    Attach every image in the message payload (MediaUrl{i} /
+    MediaContentType{i}) to product. Transfers run in parallel, so the total
+    time is about that of the slowest image. Returns (image_count, errors).
+    """
+    errors = []
+    transfers = []
+    folder = f"products/images/{product.store_id}/{product.id}"
+    for i in range(num_media):
+        media_url = payload.get(f"MediaUrl{i}")
+        media_type = payload.get(f"MediaContentType{i}", "")
+
+        # Make sure we only process images
+        if not media_type.startswith("image/"):
+            errors.append(f"File type {media_type} is not an image and was skipped")
+            continue
+        transfers.append((i, media_url, f"product_{product.id}_image_{i}"))
+
+    if not transfers:
+        return 0, errors
+
+    session = get_media_session()
+    workers = min(settings.WHATSAPP_MEDIA_WORKERS, len(transfers))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            (i, pool.submit(_transfer, session, media_url, folder, public_id))
+            for i, media_url, public_id in transfers
+        ]
+
+    uploaded = []
+    for i, future in futures:
+        try:
+            uploaded.append(future.result())
+        except Exception as e:
+            errors.append(f"Error processing image {i}: {str(e)}")
+
+    if uploaded:
+        with transaction.atomic():
+            images = Image.objects.bulk_create(
+                [
+                    Image(image=public_id, variants=variants)
+                    for public_id, variants in uploaded
+                ]
+            )
+            product.images.add(*images)
+    return len(uploaded), errors
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("whatsapp_bot", "0001_inboundmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inboundmessage",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="inboundmessage",
+            index=models.Index(
+                fields=["status", "created_at"], name="inbound_status_created_idx"
+            ),
+        ),
+    ]
@@ -1,3 +1,40 @@
 from django.db import models
 
-# Create your models here.
+
+class InboundMessage(models.Model):
+    """
+    A WhatsApp message received on the webhook, keyed by Twilio's MessageSid so
+    webhook retries are recognised and processed once.
+    """
+
+    RECEIVED = "received"
+    PROCESSING = "processing"
+    PROCESSED = "processed"
+    REPLIED = "replied"
+    STATUS_CHOICES = [
+        (RECEIVED, "Received"),
+        (PROCESSING, "Processing"),
+        (PROCESSED, "Processed"),
+        (REPLIED, "Replied"),
+    ]
+
+    message_sid = models.CharField(max_length=64, unique=True)
+    sender = models.CharField(max_length=50)
+    # The webhook's POST fields, as sent by Twilio
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=RECEIVED)
+    reply = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a worker started running the command; see requeue_stale_messages
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"], name="inbound_status_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.message_sid} from {self.sender} ({self.status})"
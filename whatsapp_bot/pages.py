@@ -0,0 +1,83 @@
+"""
+Long WhatsApp replies split into pages that fit one message.
+
+A list reply is cut into pages of at most WHATSAPP_MESSAGE_LIMIT characters,
+breaking between entries (blank lines) where possible. The first page is sent
+straight away. The rest wait in the cache, and the seller steps through them
+with `more`.
+"""
+
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+
+FOOTER = "\n\n_Page {page}/{total}. Reply *more* for the next page._"
+LAST_FOOTER = "\n\n_Page {page}/{total}._"
+# Room kept on every page for the footer
+FOOTER_RESERVE = len(FOOTER.format(page=999, total=999))
+
+_ENTRY_BREAK = re.compile(r"(?<=\n\n)")
+
+
+def _cache_key(seller_id):
+    return f"whatsapp:pages:{seller_id}"
+
+
+def _pieces(text, limit):
+    # Entries, then lines of oversized entries, then hard cuts of oversized lines
+    for entry in _ENTRY_BREAK.split(text):
+        if len(entry) <= limit:
+            yield entry
+            continue
+        for line in entry.splitlines(keepends=True):
+            for start in range(0, len(line), limit):
+                yield line[start : start + limit]
+
+
+def split_pages(text, limit):
+    """Split text into pages of at most limit characters."""
+    pages = []
+    current = ""
+    for piece in _pieces(text, limit):
+        if current and len(current) + len(piece) > limit:
+            pages.append(current.rstrip())
+            current = ""
+        current += piece
+    if current.strip() or not pages:
+        pages.append(current.rstrip())
+    return pages
+
+
+def _page(pages, index):
+    if len(pages) == 1:
+        return pages[0]
+    footer = FOOTER if index + 1 < len(pages) else LAST_FOOTER
+    return pages[index] + footer.format(page=index + 1, total=len(pages))
+
+
+def first_page(seller_id, text):
+    """
+    Return the first page of text and keep the others for next_page. Any pages
+    left over from an earlier reply are dropped.
+    """
+    pages = split_pages(text, settings.WHATSAPP_MESSAGE_LIMIT - FOOTER_RESERVE)
+    if len(pages) > 1:
+        cache.set(_cache_key(seller_id), (pages, 1), settings.WHATSAPP_PAGES_TIMEOUT)
+    else:
+        cache.delete(_cache_key(seller_id))
+    return _page(pages, 0)
+
+
+def next_page(seller_id):
+    """The next page of the seller's last list reply, or None if there is none."""
+    key = _cache_key(seller_id)
+    state = cache.get(key)
+    if state is None:
+        return None
+    pages, index = state
+    if index + 1 < len(pages):
+        cache.set(key, (pages, index + 1), settings.WHATSAPP_PAGES_TIMEOUT)
+    else:
+        cache.delete(key)
+    return _page(pages, index)
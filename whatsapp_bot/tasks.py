@@ -0,0 +1,90 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from twilio.base.exceptions import TwilioException
+from twilio.rest import Client
+
+from .models import InboundMessage
+from .views import build_reply
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_twilio_client():
+    """Twilio REST client shared by the sends of this process."""
+    global _client
+    if _client is None:
+        _client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return _client
+
+
+def send_whatsapp_message(to, from_, body):
+    """Send a WhatsApp message through the Twilio REST API."""
+    return get_twilio_client().messages.create(to=to, from_=from_, body=body)
+
+
+@shared_task(bind=True, max_retries=5)
+def process_whatsapp_message(self, message_id):
+    """
+    Run an inbound message's command once, then send the reply. Only the task
+    that claimed the message sends it, and a retry after a failed send only
+    re-sends; the command itself never runs twice.
+    """
+    claimed = InboundMessage.objects.filter(
+        id=message_id, status=InboundMessage.RECEIVED
+    ).update(status=InboundMessage.PROCESSING, claimed_at=timezone.now())
+    if not claimed and not self.request.retries:
+        return  # Handled, or being handled, by another task
+    inbound = InboundMessage.objects.get(id=message_id)
+
+    if claimed:
+        try:
+            reply = build_reply(inbound.payload)
+        except Exception:
+            logger.exception(
+                "Error processing WhatsApp message %s", inbound.message_sid
+            )
+            reply = "Sorry, something went wrong while handling your message."
+        inbound.reply = reply
+        inbound.status = InboundMessage.PROCESSED
+        inbound.processed_at = timezone.now()
+        inbound.save(update_fields=["reply", "status", "processed_at"])
+
+    if inbound.status != InboundMessage.PROCESSED:
+        return
+
+    try:
+        send_whatsapp_message(
+            to=inbound.sender, from_=inbound.payload.get("To"), body=inbound.reply
+        )
+    except TwilioException as e:
+        raise self.retry(exc=e, countdown=2**self.request.retries)
+    inbound.status = InboundMessage.REPLIED
+    inbound.save(update_fields=["status"])
+
+
+@shared_task
+def requeue_stale_messages():
+    """
+    Queue again messages whose task never ran (the enqueue failed) or whose
+    worker died while running the command. Twilio's retries are deduplicated
+    by MessageSid, so nothing else would ever process them.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.WHATSAPP_STALE_AFTER)
+    # A claim older than the cutoff belongs to a dead worker; release it.
+    InboundMessage.objects.filter(
+        status=InboundMessage.PROCESSING, claimed_at__lt=cutoff
+    ).update(status=InboundMessage.RECEIVED, claimed_at=None)
+    stale = list(
+        InboundMessage.objects.filter(
+            status=InboundMessage.RECEIVED, created_at__lt=cutoff
+        ).values_list("id", flat=True)
+    )
+    for message_id in stale:
+        process_whatsapp_message.delay(message_id)
+    return len(stale)
@@ -1,3 +1,407 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from twilio.base.exceptions import TwilioRestException
+from twilio.request_validator import RequestValidator
+
+from orders.models import Order, OrderItem
+from products.models import Category, Image, Product
+from stores.models import Store
+from . import ai, media, views
+from .commands import Arg, CommandRegistry, Context
+from .models import InboundMessage
+from .tasks import process_whatsapp_message, requeue_stale_messages
+
+User = get_user_model()
+
+WEBHOOK_URL = "https://shop.example.com/api/v1/whatsapp_bot/message"
+
+
+@override_settings(WHATSAPP_WEBHOOK_URL=WEBHOOK_URL)
+class WebhookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            username="seller",
+            email="seller@example.com",
+            password="password",
+            user_type="seller",
+            phone_number="+2348000000001",
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+
+    def payload(self, body="help", sid="SM1"):
+        return {
+            "MessageSid": sid,
+            "From": "whatsapp:+2348000000001",
+            "To": "whatsapp:+14155238886",
+            "Body": body,
+            "NumMedia": "0",
+        }
+
+    def post(self, data, signature=None):
+        if signature is None:
+            signature = RequestValidator(settings.TWILIO_AUTH_TOKEN).compute_signature(
+                WEBHOOK_URL, data
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/v1/whatsapp_bot/message", data, HTTP_X_TWILIO_SIGNATURE=signature
+            )
+
+    def test_rejects_bad_signature(self):
+        with mock.patch.object(process_whatsapp_message, "delay") as delay:
+            response = self.post(self.payload(), signature="forged")
+        self.assertEqual(response.status_code, 403)
+        delay.assert_not_called()
+        self.assertFalse(InboundMessage.objects.exists())
+
+    def test_acknowledges_and_enqueues_once_per_message_sid(self):
+        with mock.patch.object(process_whatsapp_message, "delay") as delay:
+            first = self.post(self.payload())
+            retry = self.post(self.payload())
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "application/xml")
+        self.assertNotIn(b"<Message>", first.content)
+        self.assertEqual(retry.status_code, 200)
+        inbound = InboundMessage.objects.get()
+        delay.assert_called_once_with(inbound.id)
+
+    def test_worker_runs_command_once_and_replies(self):
+        inbound = InboundMessage.objects.create(
+            message_sid="SM1", sender="whatsapp:+2348000000001", payload=self.payload()
+        )
+        with mock.patch("whatsapp_bot.tasks.send_whatsapp_message") as send:
+            process_whatsapp_message.apply(args=[inbound.id])
+            process_whatsapp_message.apply(args=[inbound.id])
+
+        send.assert_called_once()
+        self.assertEqual(send.call_args.kwargs["to"], "whatsapp:+2348000000001")
+        self.assertIn("Test Store", send.call_args.kwargs["body"])
+        inbound.refresh_from_db()
+        self.assertEqual(inbound.status, InboundMessage.REPLIED)
+
+    def test_failed_send_is_retried_without_rerunning_the_command(self):
+        inbound = InboundMessage.objects.create(
+            message_sid="SM1",
+            sender="whatsapp:+2348000000001",
+            payload=self.payload("add category Shoes"),
+        )
+        error = TwilioRestException(503, "https://api.twilio.com", "unavailable")
+        with mock.patch(
+            "whatsapp_bot.tasks.send_whatsapp_message", side_effect=[error, None]
+        ) as send:
+            process_whatsapp_message.apply(args=[inbound.id])
+
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(self.store.categories.count(), 1)
+        inbound.refresh_from_db()
+        self.assertEqual(inbound.status, InboundMessage.REPLIED)
+
+    def test_stale_messages_are_queued_again(self):
+        old = timezone.now() - timedelta(seconds=settings.WHATSAPP_STALE_AFTER + 1)
+        never_queued, dead_worker, fresh, running = [
+            InboundMessage.objects.create(
+                message_sid=f"SM{i}", sender="whatsapp:+2348000000001", payload={}
+            )
+            for i in range(4)
+        ]
+        InboundMessage.objects.filter(id=never_queued.id).update(created_at=old)
+        InboundMessage.objects.filter(id=dead_worker.id).update(
+            created_at=old, status=InboundMessage.PROCESSING, claimed_at=old
+        )
+        InboundMessage.objects.filter(id=running.id).update(
+            created_at=old, status=InboundMessage.PROCESSING, claimed_at=timezone.now()
+        )
+
+        with mock.patch.object(process_whatsapp_message, "delay") as delay:
+            self.assertEqual(requeue_stale_messages.apply().get(), 2)
+
+        self.assertEqual(
+            sorted(call.args[0] for call in delay.call_args_list),
+            [never_queued.id, dead_worker.id],
+        )
+        dead_worker.refresh_from_db()
+        self.assertEqual(dead_worker.status, InboundMessage.RECEIVED)
+
+    def test_duplicate_task_does_not_send_a_processed_message_again(self):
+        inbound = InboundMessage.objects.create(
+            message_sid="SM1",
+            sender="whatsapp:+2348000000001",
+            payload=self.payload(),
+            status=InboundMessage.PROCESSED,
+            reply="Already answered",
+        )
+        with mock.patch("whatsapp_bot.tasks.send_whatsapp_message") as send:
+            process_whatsapp_message.apply(args=[inbound.id])
+        send.assert_not_called()
+
+
+class MediaIngestionTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user(
+            username="seller", email="seller@example.com", password="password"
+        )
+        store = Store.objects.create(name="Test Store", owner=seller)
+        self.product = Product.objects.create(name="Shoe", price=10, store=store)
+
+    def payload(self, count):
+        payload = {"NumMedia": str(count)}
+        for i in range(count):
+            payload[f"MediaUrl{i}"] = f"https://api.twilio.com/media/{i}"
+            payload[f"MediaContentType{i}"] = "image/jpeg"
+        payload[f"MediaContentType{count - 1}"] = "video/mp4"
+        return payload
+
+    def test_images_transfer_concurrently_and_attach_in_bulk(self):
+        # The five image transfers only return once all are in flight at once.
+        in_flight = threading.Barrier(5, timeout=5)
+
+        def parallel_transfer(session, media_url, folder, public_id):
+            in_flight.wait()
+            if media_url.endswith("/2"):
+                raise ValueError("broken image")
+            return f"{folder}/{public_id}", {"thumbnail": f"{public_id}_thumbnail"}
+
+        with mock.patch.object(media, "_transfer", side_effect=parallel_transfer):
+            # savepoint, bulk insert images, bulk insert links, release
+            with self.assertNumQueries(4):
+                image_count, errors = media.ingest_media(
+                    self.payload(6), self.product, 6
+                )
+
+        self.assertFalse(in_flight.broken)
+        self.assertEqual(image_count, 4)
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(self.product.images.count(), 4)
+        self.assertEqual(
+            self.product.images.filter(variants__has_key="thumbnail").count(), 4
+        )
+
+
+@override_settings(AI_RATE_LIMIT=3, AI_MAX_CONCURRENT_PER_SELLER=1)
+class AIGatewayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = ai.FakeBackend()
+        self.gateway = ai.AIGateway(self.backend)
+
+    def test_normalized_repeats_are_answered_from_cache(self):
+        first = self.gateway.ask(1, "What is  a SKU?")
+        second = self.gateway.ask(2, "  what is a sku? ")
+
+        self.assertEqual(first, second)
+        # Normalized for the cache only; the model gets the prompt as sent.
+        self.assertEqual(first, "Answer to: What is  a SKU?")
+        self.assertEqual(self.backend.calls, 1)
+        stats = self.gateway.stats()
+        self.assertEqual((stats["requests"], stats["hits"]), (2, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_rate_budget_is_per_seller_and_skips_cache_hits(self):
+        for i in range(3):
+            self.gateway.ask(1, f"question {i}")
+        self.gateway.ask(1, "question 0")
+        with self.assertRaises(ai.AIBudgetExceeded):
+            self.gateway.ask(1, "question 3")
+        self.assertEqual(self.gateway.ask(2, "question 3"), "Answer to: question 3")
+        self.assertEqual(self.gateway.stats()["rejected"], 1)
+
+    def test_concurrent_questions_per_seller_are_capped(self):
+        self.backend.latency = 0.2
+
+        def ask(prompt):
+            try:
+                return self.gateway.ask(1, prompt)
+            except ai.AIBudgetExceeded:
+                return None
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            answers = list(pool.map(ask, ["first", "second"]))
+
+        self.assertEqual(answers.count(None), 1)
+        self.assertEqual(self.backend.calls, 1)
+        # The slot is released once the answer is back, and the rejected
+        # question didn't count against the rate (limit 3).
+        self.assertEqual(self.gateway.ask(1, "third"), "Answer to: third")
+        self.assertEqual(self.gateway.ask(1, "fourth"), "Answer to: fourth")
+
+    def test_counter_expiring_between_add_and_incr_starts_again(self):
+        cache.set("ai:1:active", 1)
+        with mock.patch.object(
+            ai.cache, "incr", side_effect=[ValueError("expired"), 2]
+        ) as incr:
+            self.assertEqual(ai._incr("ai:1:active", 60), 2)
+        self.assertEqual(incr.call_count, 2)
+
+    @override_settings(AI_REQUEST_TIMEOUT=45)
+    def test_gemini_calls_time_out_with_their_budget_slot(self):
+        with mock.patch("google.genai.Client") as client:
+            ai.GeminiBackend()
+        self.assertEqual(client.call_args.kwargs["http_options"].timeout, 45000)
+
+    def test_handle_ai_replies_through_gateway(self):
+        with mock.patch.object(views, "get_gateway", return_value=self.gateway):
+            self.assertEqual(views.handle_ai("hello", 1), "Answer to: hello")
+            with override_settings(AI_RATE_LIMIT=0):
+                reply = views.handle_ai("something else", 1)
+        self.assertIn("try again", reply)
+
+
+class CommandRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            username="seller",
+            email="seller@example.com",
+            password="password",
+            user_type="seller",
+            phone_number="+2348000000001",
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.context = Context(
+            payload={}, seller=self.seller, store=self.store, num_media=0
+        )
+
+    def test_resolves_longest_command_by_words(self):
+        registry = CommandRegistry()
+        for name in ["product", "products", "add product"]:
+            registry.command(name, name, args=[Arg("REST", required=False)])(
+                lambda context, rest: rest
+            )
+
+        command, rest = registry.resolve("add  product shoe|1")
+        self.assertEqual((command.name, rest), ("add product", "shoe|1"))
+        self.assertEqual(registry.resolve("products")[0].name, "products")
+        self.assertEqual(registry.resolve("product 7")[1], "7")
+        self.assertEqual(registry.resolve("add category x"), (None, "add category x"))
+
+    def test_arguments_are_validated_before_the_handler_runs(self):
+        reply = views.commands.dispatch(
+            "add product shoe|boots|cheap|nice|3", self.context
+        )
+        self.assertIn("PRICE must be a number.", reply)
+        self.assertIn("Use: add product NAME|CATEGORY|PRICE|DESCRIPTION|STOCK", reply)
+        self.assertFalse(Product.objects.exists())
+
+        reply = views.commands.dispatch("add product shoe||12.5||3", self.context)
+        product = Product.objects.get()
+        self.assertEqual(
+            (product.name, product.category, product.stock), ("shoe", None, 3)
+        )
+        self.assertIn("Price: N12.50", reply)
+
+    def test_help_is_generated_from_the_registry(self):
+        reply = views.build_reply(
+            {"From": "whatsapp:+2348000000001", "Body": "HELP", "NumMedia": "0"}
+        )
+        self.assertIn("Welcome to *Test Store*", reply)
+        self.assertIn(
+            "*edit category* - Edit a category (format: edit category OLD_NAME|NEW_NAME)",
+            reply,
+        )
+        self.assertIn("*stats* - Show store statistics", reply)
+
+    def test_unknown_text_gets_the_greeting(self):
+        reply = views.commands.dispatch("hello there", self.context)
+        self.assertIsNone(reply)
+
+
+class ListReplyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(
+            username="seller",
+            email="seller@example.com",
+            password="password",
+            user_type="seller",
+            phone_number="+2348000000001",
+        )
+        self.store = Store.objects.create(name="Test Store", owner=self.seller)
+        self.context = Context(
+            payload={}, seller=self.seller, store=self.store, num_media=0
+        )
+        category = Category.objects.create(store=self.store, name="Shoes")
+        image = Image.objects.create(image="image/upload/v1/shoe.png")
+        for i in range(40):
+            product = Product.objects.create(
+                store=self.store,
+                category=category,
+                name=f"Shoe {i}",
+                price=10,
+                description="A comfortable shoe for every day of the week",
+                stock=i,
+            )
+            product.images.add(image)
+
+    def dispatch(self, text):
+        return views.commands.dispatch(text, self.context)
+
+    def test_products_are_listed_from_one_query_in_pages(self):
+        with self.assertNumQueries(1):
+            page = self.dispatch("products")
+        pages = [page]
+        while "Reply *more*" in page:
+            with self.assertNumQueries(0):
+                page = self.dispatch("more")
+            pages.append(page)
+
+        self.assertGreater(len(pages), 1)
+        self.assertTrue(all(len(page) <= 1600 for page in pages))
+        self.assertIn(f"_Page 1/{len(pages)}.", pages[0])
+        text = "".join(pages)
+        for i in range(40):
+            self.assertEqual(text.count(f"Name: Shoe {i}\n"), 1)
+        self.assertIn("Category: Shoes\nPrice: N10.00", text)
+        self.assertIn("Images: 1", text)
+        self.assertIn("Nothing more to show", self.dispatch("more"))
+
+    def test_categories_and_orders_use_fixed_queries(self):
+        with self.assertNumQueries(1):
+            reply = self.dispatch("categories")
+        self.assertIn("Name: Shoes\nProducts: 40", reply)
+
+        for _ in range(3):
+            order = Order.objects.create(
+                user=self.seller, store=self.store, total_price=20
+            )
+            OrderItem.objects.create(
+                order=order, product_name="Shoe 1", unit_price=10, quantity=2
+            )
+        with self.assertNumQueries(2):
+            reply = self.dispatch("orders")
+        self.assertEqual(reply.count("- 2x Shoe 1 (N10.00)"), 3)
+        # A short list drops the pages of the previous one.
+        self.assertIn("Nothing more to show", self.dispatch("more"))
+
+    def test_import_products_from_attached_csv(self):
+        catalog = BytesIO(
+            b"name,category,price,description,stock\n"
+            b"Sandal,Shoes,12,Open toe,4\n"
+            b"Boot,Shoes,abc,,1\n"
+        )
+        context = self.context._replace(
+            num_media=1,
+            payload={
+                "MediaUrl0": "https://api.twilio.com/media/0",
+                "MediaContentType0": "text/csv",
+            },
+        )
+        with mock.patch.object(views, "download_media", return_value=catalog):
+            reply = views.commands.dispatch("import products", context)
+
+        self.assertIn("Imported 1 product(s).", reply)
+        self.assertIn("Row 3: price: A valid number is required.", reply)
+        self.assertTrue(Product.objects.filter(name="Sandal", stock=4).exists())
+
+        reply = views.commands.dispatch("import products", self.context)
+        self.assertIn("Attach a CSV or XLSX file", reply)
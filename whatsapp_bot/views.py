@@ -1,4 +1,3 @@
-import requests
 import json
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -6,72 +5,117 @@ from twilio.twiml.messaging_response import MessagingResponse
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.conf import settings
-from decouple import config
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.db.models import Sum
+from django.utils import timezone
 from urllib.parse import urljoin
-import tempfile
 import os
-from cloudinary.uploader import upload
-from google import genai
-from google.genai import types
 from twilio.twiml.messaging_response import MessagingResponse
+from twilio.request_validator import RequestValidator
+from django.db import transaction
+from django.db.models import Count
+from decimal import Decimal
 import os
 
 # Import your actual models
 from django.contrib.auth import get_user_model
+from accounts.phone import resolve_seller
+from products.catalog_import import (
+    CatalogImportError,
+    detect_format,
+    import_catalog,
+    read_catalog,
+)
 from stores.models import Store
 from products.models import Product, Image, Category
-from orders.models import Order, CartItem
+from orders.models import Order
+from stores.cache import bump_store_version
+from seller_dashboard.metrics import get_store_metrics
+from .ai import AIBudgetExceeded, get_gateway
+from .commands import Arg, CommandRegistry, Context
+from .media import download_media, ingest_media
+from .models import InboundMessage
+from .pages import first_page, next_page
 
 User = get_user_model()
 
-TWILIO_ACCOUNT_SID = config("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = config("TWILIO_AUTH_TOKEN")
-
-# Command structure and help information
-# Update the COMMANDS dictionary to include the new category commands
-COMMANDS = {
-    "help": "Show available commands",
-    "orders": "List recent orders",
-    "products": "List your products",
-    "categories": "List your categories",
-    "add product": "Add a new product (follow format: add product NAME|CATEGORY|PRICE|DESCRIPTION|STOCK). Attach images to add them to the product.",
-    "update product": "Update a product (format: update product ID|NAME|CATEGORY|PRICE|DESCRIPTION|STOCK)",
-    "delete product": "Delete a product (format: delete product ID)",
-    "add category": "Add a new category (format: add category NAME)",
-    "edit category": "Edit a category (format: edit category OLD_NAME|NEW_NAME)",
-    "delete category": "Delete a category (format: delete category NAME)",
-    "stats": "Show store statistics",
-    "ai": "Ask a question to the AI model (format: ai QUESTION)",
-}
-
-
-def get_seller_from_whatsapp(phone_number):
-    """
-    Find the seller based on their WhatsApp number
-    phone_number format: 'whatsapp:+1234567890'
-    """
-    # Extract the number without 'whatsapp:' prefix
-    clean_number = phone_number.replace("whatsapp:", "")
+# WhatsApp commands, registered below with @commands.command. Help text is
+# generated from the registry in registration order.
+commands = CommandRegistry()
 
-    try:
-        # Using your User model with user_type="seller"
-        seller = User.objects.get(phone_number=clean_number, user_type="seller")
-        return seller
-    except User.DoesNotExist:
-        return None
 
+@commands.command("help", "Show available commands")
+def handle_help(context):
+    return commands.help_text(context.store.name)
 
-def get_store_for_seller(seller):
-    """Get the store associated with a seller"""
-    try:
-        # Using your Store model that has an owner field
-        store = Store.objects.get(owner=seller)
-        return store
-    except Store.DoesNotExist:
-        return None
+
+@commands.command("orders", "List recent orders")
+def handle_orders(context):
+    recent_orders = (
+        Order.objects.filter(store=context.store)
+        .prefetch_related("items")
+        .order_by("-created_at")[:6]
+    )
+    return first_page(context.seller.id, format_order_list(recent_orders))
+
+
+@commands.command("products", "List your products")
+def handle_products(context):
+    products = (
+        Product.objects.filter(store=context.store)
+        .annotate(image_count=Count("images"))
+        .values(
+            "id",
+            "name",
+            "category__name",
+            "price",
+            "description",
+            "stock",
+            "image_count",
+        )
+        .order_by("id")
+    )
+    return first_page(context.seller.id, format_product_list(products))
+
+
+@commands.command("categories", "List your categories")
+def handle_categories(context):
+    categories = (
+        Category.objects.filter(store=context.store)
+        .annotate(product_count=Count("products"))
+        .values("id", "name", "product_count")
+        .order_by("id")
+    )
+    return first_page(context.seller.id, format_category_list(categories))
+
+
+@commands.command("more", "Show the next page of a long list")
+def handle_more(context):
+    page = next_page(context.seller.id)
+    if page is None:
+        return "Nothing more to show. Send *products*, *orders* or *categories* to start a list."
+    return page
+
+
+def get_seller_and_store(phone_number):
+    """
+    Find the seller and their store based on their WhatsApp number
+    phone_number format: 'whatsapp:+1234567890'
+
+    Returns (seller, store); either is None when missing. The number is
+    resolved through a cache, so a known seller costs one query by primary
+    key and an unknown number none.
+    """
+    resolved = resolve_seller(phone_number)
+    if resolved is None:
+        return None, None
+    seller_id, store_id = resolved
+    if store_id is None:
+        return User.objects.filter(id=seller_id).first(), None
+    store = Store.objects.select_related("owner").filter(id=store_id).first()
+    if store is None:
+        return None, None
+    return store.owner, store
 
 
 def format_order_list(orders):
@@ -79,219 +123,179 @@ def format_order_list(orders):
     if not orders:
         return "No recent orders found."
 
-    result = "Recent Orders:\n\n"
+    lines = ["Recent Orders:\n"]
     for order in orders:
-        result += f"Order #{order.id} - N{order.total_price:.2f}\n"
-        result += f"Status: {order.status}\n"
-        result += f"Date: {order.created_at.strftime('%Y-%m-%d')}\n"
-
-        # Using your CartItem model to access items in the order
-        if order.cart:
-            cart_items = CartItem.objects.filter(cart=order.cart)
-            result += "Products:\n"
-
-            for item in cart_items:
-                result += f"- {item.quantity}x {item.product.name} (N{item.product.price:.2f})\n"
-
-        result += "\n"
+        lines.append(f"Order #{order.id} - N{order.total_price:.2f}")
+        lines.append(f"Status: {order.status}")
+        lines.append(f"Date: {order.created_at.strftime('%Y-%m-%d')}")
+
+        # Line items snapshotted at checkout (prefetched by the caller)
+        items = order.items.all()
+        if items:
+            lines.append("Products:")
+            lines.extend(
+                f"- {item.quantity}x {item.product_name} (N{item.unit_price:.2f})"
+                for item in items
+            )
+        lines.append("")
 
-    return result
+    return "\n".join(lines) + "\n"
 
 
 def format_product_list(products):
-    """Format a list of products for WhatsApp display"""
+    """
+    Format a list of products for WhatsApp display. Expects rows with
+    category__name and image_count, as built by handle_products.
+    """
     if not products:
         return "No products found in your store."
 
-    result = "Your Products:\n\n"
+    lines = ["Your Products:\n"]
     for product in products:
-        result += f"ID: {product.id}\n"
-        result += f"Name: {product.name}\n"
-        result += f"Category: {product.category.name if product.category else 'None'}\n"
-        result += f"Price: N{product.price:.2f}\n"
-        result += f"Description: {product.description}\n"
-        result += f"Stock: {product.stock}\n"
-        result += f"Images: {product.images.count()}\n\n"
-
-    return result
+        lines.append(f"ID: {product['id']}")
+        lines.append(f"Name: {product['name']}")
+        lines.append(f"Category: {product['category__name'] or 'None'}")
+        lines.append(f"Price: N{product['price']:.2f}")
+        lines.append(f"Description: {product['description']}")
+        lines.append(f"Stock: {product['stock']}")
+        lines.append(f"Images: {product['image_count']}\n")
 
+    return "\n".join(lines) + "\n"
 
-def handle_add_product(store, message_parts):
-    """Handle the add product command and return the created product"""
-    # Expected format: add product NAME|CATEGORY|PRICE|DESCRIPTION|STOCK
-    try:
-        product_info = message_parts[2].split("|")
-        if len(product_info) < 5:
-            return (
-                None,
-                "Invalid format. Use: add product NAME|CATEGORY|PRICE|DESCRIPTION|STOCK",
-            )
 
-        name = product_info[0].strip()
-        category_name = product_info[1].strip()
-        price = float(product_info[2].strip())
-        description = product_info[3].strip()
-        stock = int(product_info[4].strip())
-
-        # Get or create category
-        category = None
-        if category_name:
-            category, created = Category.objects.get_or_create(
-                store=store, name=category_name
-            )
-
-        # Create product using your existing models
-        product = Product.objects.create(
-            store=store,
-            category=category,
-            name=name,
-            price=price,
-            description=description,
-            stock=stock,
-        )
+def _get_category(store, category_name):
+    if not category_name:
+        return None
+    category, created = Category.objects.get_or_create(store=store, name=category_name)
+    return category
+
+
+@commands.command(
+    "add product",
+    "Add a new product. Attach images to add them to the product.",
+    args=[
+        Arg("NAME"),
+        Arg("CATEGORY", required=False),
+        Arg("PRICE", Decimal),
+        Arg("DESCRIPTION", required=False),
+        Arg("STOCK", int),
+    ],
+)
+def handle_add_product(context, name, category, price, description, stock):
+    """Handle the add product command, attaching any images sent with it"""
+    store = context.store
+    product = Product.objects.create(
+        store=store,
+        category=_get_category(store, category),
+        name=name,
+        price=price,
+        description=description or "",
+        stock=stock,
+    )
+    bump_store_version(store.id)
+    result_message = f"Product added successfully!\nID: {product.id}\nName: {name}\nPrice: N{price:.2f}"
 
-        return (
-            product,
-            f"Product added successfully!\nID: {product.id}\nName: {name}\nPrice: N{price:.2f}",
+    if context.num_media > 0:
+        image_count, errors = process_media_to_images(
+            context.payload, product, context.num_media
         )
 
-    except (IndexError, ValueError) as e:
-        return None, f"Error adding product: {str(e)}"
-
-
-def handle_update_product(store, message_parts):
+        # Add image results to the response message
+        result_message += f"\n\n{image_count} images added to product."
+        if errors:
+            result_message += "\nSome errors occurred during image processing."
+    return result_message
+
+
+@commands.command(
+    "update product",
+    "Update a product",
+    args=[
+        Arg("ID", int),
+        Arg("NAME"),
+        Arg("CATEGORY", required=False),
+        Arg("PRICE", Decimal),
+        Arg("DESCRIPTION", required=False),
+        Arg("STOCK", int),
+    ],
+)
+def handle_update_product(context, id, name, category, price, description, stock):
     """Handle the update product command"""
-    # Expected format: update product ID|NAME|CATEGORY|PRICE|DESCRIPTION|STOCK
+    store = context.store
     try:
-        product_info = message_parts[2].split("|")
-        if len(product_info) < 6:
-            return "Invalid format. Use: update product ID|NAME|CATEGORY|PRICE|DESCRIPTION|STOCK"
-
-        product_id = int(product_info[0].strip())
-        name = product_info[1].strip()
-        category_name = product_info[2].strip()
-        price = float(product_info[3].strip())
-        description = product_info[4].strip()
-        stock = int(product_info[5].strip())
-
-        # Get and update the product
-        try:
-            product = Product.objects.get(id=product_id, store=store)
-
-            # Update or create category
-            if category_name:
-                category, created = Category.objects.get_or_create(
-                    store=store, name=category_name
-                )
-                product.category = category
-
-            product.name = name
-            product.price = price
-            product.description = description
-            product.stock = stock
-            product.save()
-
-            return f"Product updated successfully!\nID: {product.id}\nName: {name}\nPrice: N{price:.2f}"
-        except Product.DoesNotExist:
-            return f"Product with ID {product_id} not found in your store."
+        product = Product.objects.get(id=id, store=store)
+    except Product.DoesNotExist:
+        return f"Product with ID {id} not found in your store."
 
-    except (IndexError, ValueError) as e:
-        return f"Error updating product: {str(e)}"
+    # Update or create category
+    if category:
+        product.category = _get_category(store, category)
+    product.name = name
+    product.price = price
+    product.description = description or ""
+    product.stock = stock
+    product.save()
+    bump_store_version(store.id)
 
+    return f"Product updated successfully!\nID: {product.id}\nName: {name}\nPrice: N{price:.2f}"
 
-def handle_delete_product(store, message_parts):
+
+@commands.command("delete product", "Delete a product", args=[Arg("ID", int)])
+def handle_delete_product(context, id):
     """Handle the delete product command"""
-    # Expected format: delete product ID
+    store = context.store
     try:
-        product_id = int(message_parts[2].strip())
-
-        try:
-            product = Product.objects.get(id=product_id, store=store)
-            product_name = product.name
-            product.delete()
-
-            return f"Product '{product_name}' (ID: {product_id}) deleted successfully."
-        except Product.DoesNotExist:
-            return f"Product with ID {product_id} not found in your store."
-
-    except (IndexError, ValueError) as e:
-        return f"Error deleting product: {str(e)}"
-
-
-def process_media_to_images(request, product, num_media):
-    """Process media items in the request and add them as images to the product"""
-    image_count = 0
-    errors = []
-
-    # Process all images attached to the message
-    for i in range(num_media):
-        media_url = request.POST.get(f"MediaUrl{i}")
-        media_type = request.POST.get(f"MediaContentType{i}")
-
-        # Make sure we only process images
-        if not media_type.startswith("image/"):
-            errors.append(f"File type {media_type} is not an image and was skipped")
-            continue
-
-        # Authenticate and download the image
-        auth = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        image_response = requests.get(media_url, auth=auth)
-
-        if image_response.status_code == 200:
-            try:
-                # Create a new Image instance
-                new_image = Image()
-
-                # Create a temporary file to store the image content
-                temp_file = tempfile.NamedTemporaryFile(delete=False)
-                temp_file.write(image_response.content)
-                temp_file.close()
-
-                # Upload to Cloudinary directly using the Cloudinary field
-                # The folder structure can be specified in the upload options
-                upload_result = upload(
-                    temp_file.name,
-                    folder=f"products/images/{product.store.id}/{product.id}",
-                    public_id=f"product_{product.id}_image_{i}",
-                )
-
-                # Now assign the Cloudinary response to the CloudinaryField
-                # Since CloudinaryField handles the URL formatting internally
-                new_image.image = upload_result["public_id"]
-                new_image.save()
+        product = Product.objects.get(id=id, store=store)
+    except Product.DoesNotExist:
+        return f"Product with ID {id} not found in your store."
+
+    product_name = product.name
+    product.delete()
+    bump_store_version(store.id)
+    return f"Product '{product_name}' (ID: {id}) deleted successfully."
+
+
+@commands.command(
+    "product", "Add the attached images to a product", args=[Arg("ID", int)]
+)
+def handle_product_images(context, id):
+    """Attach the images sent with the message to an existing product"""
+    if context.num_media == 0:
+        return "Invalid format. Use: product [ID] and attach images."
+    try:
+        product = Product.objects.get(id=id, store=context.store)
+    except Product.DoesNotExist:
+        return f"Product with ID {id} not found in your store."
 
-                # Remove temporary file
-                os.unlink(temp_file.name)
+    image_count, errors = process_media_to_images(
+        context.payload, product, context.num_media
+    )
+    result_message = f"Added {image_count} images to '{product.name}'."
+    if errors:
+        result_message += "\nSome errors occurred during image processing."
+    return result_message
 
-                # Add the image to the product's images
-                product.images.add(new_image)
-                image_count += 1
 
-            except Exception as e:
-                errors.append(f"Error processing image {i}: {str(e)}")
+def process_media_to_images(payload, product, num_media):
+    """Process media items in the message payload and add them as images to the product"""
+    image_count, errors = ingest_media(payload, product, num_media)
 
+    if image_count:
+        # Adding images doesn't save the product; touch it for conditional GETs.
+        Product.objects.filter(id=product.id).update(updated_at=timezone.now())
+        bump_store_version(product.store_id)
     return image_count, errors
 
 
 def get_store_stats(store):
     """Get statistics about the store"""
     total_products = Product.objects.filter(store=store).count()
-    total_orders = Order.objects.filter(store=store).count()
-
-    # Calculate completed orders revenue
-    revenue = (
-        Order.objects.filter(store=store, status="completed").aggregate(
-            Sum("total_price")
-        )["total_price__sum"]
-        or 0
-    )
-
-    # Get recent customers
-    recent_customers = store.customers.count()
-
-    # Get recent orders
-    recent_orders = Order.objects.filter(store=store).order_by("-created_at")[:5]
-    recent_order_count = recent_orders.count()
+    # Order figures are kept current by seller_dashboard.metrics
+    metrics = get_store_metrics(store.id)
+    total_orders = metrics.total_orders
+    revenue = metrics.delivered_revenue
+    recent_customers = metrics.total_customers
+    recent_order_count = min(total_orders, 5)
 
     result = "Store Statistics:\n\n"
     result += f"Store Name: {store.name}\n"
@@ -304,195 +308,170 @@ def get_store_stats(store):
     return result
 
 
-def handle_ai(message):
+@commands.command(
+    "import products",
+    "Add products in bulk from an attached CSV or XLSX file with the columns "
+    "name, category, price, description, stock",
+)
+def handle_import_products(context):
+    """Import the catalog file attached to the message"""
+    payload = context.payload
+    file_format = detect_format(content_type=payload.get("MediaContentType0"))
+    if context.num_media == 0 or file_format is None:
+        return "Attach a CSV or XLSX file to import. Columns: name, category, price, description, stock."
+
+    try:
+        with download_media(payload.get("MediaUrl0")) as catalog:
+            report = import_catalog(context.store, read_catalog(catalog, file_format))
+    except CatalogImportError as e:
+        return f"Could not import the file: {e}"
+    return first_page(context.seller.id, format_import_report(report))
+
+
+def format_import_report(report):
+    """Format a catalog import result for WhatsApp display"""
+    lines = [f"Imported {report.created} product(s)."]
+    if report.errors:
+        lines.append(f"{len(report.errors)} row(s) were skipped:\n")
+        for error in report.errors:
+            problems = "; ".join(
+                f"{field}: {' '.join(messages)}"
+                for field, messages in error["errors"].items()
+            )
+            lines.append(f"Row {error['row']}: {problems}")
+    return "\n".join(lines)
+
+
+@commands.command("stats", "Show store statistics")
+def handle_stats(context):
+    return get_store_stats(context.store)
+
+
+def handle_ai(query, seller_id):
     """
     Process AI queries from users via WhatsApp
 
     Args:
-        message (str): The message body starting with 'ai'
+        query (str): The question, without the 'ai' command
+        seller_id: The asking seller, for their AI budget
 
     Returns:
         str: Response from the AI model
     """
     try:
-        # Strip 'ai' prefix and extract the actual query
-        query = message.lower().replace("ai", "", 1).strip()
-
-        if not query:
-            return "Please provide a question after 'ai'. Example: 'ai what is a noun?'"
-
-        # Initialize Google Generative AI client
-        api_key = config("GOOGLE_GENERATIVE_AI_API_KEY")
-
-        client = genai.Client(api_key=api_key)
-
-        # Define system instructions
-        sys_instruct = (
-            "You are a helpful assistant responding to questions by online stoee owners on ecomX's  via WhatsApp bot. "
-            "Keep your answers concise and informative, but a bit detailed  since this is for a mobile interface. "
-            "Format your response appropriately for WhatsApp (no HTML, use * for bold, etc.)."
-        )
-
-        # Generate content using Google's Generative AI
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-lite",
-            config=types.GenerateContentConfig(
-                system_instruction=sys_instruct,
-                max_output_tokens=500,  # Limit response length for WhatsApp
-            ),
-            contents=[query],
-        )
-
-        # Extract and clean the response text
-        ai_response = response.text
-
-        return ai_response
+        return get_gateway().ask(seller_id, query)
 
+    except AIBudgetExceeded:
+        return "You've asked a lot of questions recently. Please try again in a little while."
     except Exception as e:
         return f"Sorry, I couldn't process your AI request: {str(e)}"
 
 
-# here
-# Add these functions to your existing code
+@commands.command("ai", "Ask a question to the AI model", args=[Arg("QUESTION")])
+def handle_ai_command(context, question):
+    return "*AI Response:*\n\n" + handle_ai(question, context.seller.id)
 
 
 def format_category_list(categories):
-    """Format a list of categories for WhatsApp display"""
+    """
+    Format a list of categories for WhatsApp display. Expects rows with
+    product_count, as built by handle_categories.
+    """
     if not categories:
         return "No categories found in your store."
 
-    result = "Your Categories:\n\n"
+    lines = ["Your Categories:\n"]
     for category in categories:
-        # Count products in this category
-        product_count = Product.objects.filter(category=category).count()
-        result += f"ID: {category.id}\n"
-        result += f"Name: {category.name}\n"
-        result += f"Products: {product_count}\n\n"
+        lines.append(f"ID: {category['id']}")
+        lines.append(f"Name: {category['name']}")
+        lines.append(f"Products: {category['product_count']}\n")
 
-    return result
+    return "\n".join(lines) + "\n"
 
 
-def handle_add_category(store, message_parts):
+@commands.command("add category", "Add a new category", args=[Arg("NAME")])
+def handle_add_category(context, name):
     """Handle the add category command"""
-    # Expected format: add category NAME
-    try:
-        if len(message_parts) < 3:
-            return "Invalid format. Use: add category NAME"
-
-        category_name = message_parts[2].strip()
-
-        # Check if category already exists
-        existing_category = Category.objects.filter(
-            store=store, name=category_name
-        ).first()
-        if existing_category:
-            return f"Category '{category_name}' already exists with ID: {existing_category.id}"
+    store = context.store
+    # Check if category already exists
+    existing_category = Category.objects.filter(store=store, name=name).first()
+    if existing_category:
+        return f"Category '{name}' already exists with ID: {existing_category.id}"
 
-        # Create category
-        category = Category.objects.create(store=store, name=category_name)
+    # Create category
+    category = Category.objects.create(store=store, name=name)
+    bump_store_version(store.id)
 
-        return f"Category added successfully!\nID: {category.id}\nName: {category_name}"
-
-    except Exception as e:
-        return f"Error adding category: {str(e)}"
+    return f"Category added successfully!\nID: {category.id}\nName: {name}"
 
 
-def handle_edit_category(store, message_parts):
+@commands.command(
+    "edit category", "Edit a category", args=[Arg("OLD_NAME"), Arg("NEW_NAME")]
+)
+def handle_edit_category(context, old_name, new_name):
     """Handle the edit category command"""
-    # Expected format: edit category OLD_NAME|NEW_NAME
+    store = context.store
     try:
-        if len(message_parts) < 3:
-            return "Invalid format. Use: edit category OLD_NAME|NEW_NAME"
-
-        name_parts = message_parts[2].split("|")
-        if len(name_parts) != 2:
-            return "Invalid format. Use: edit category OLD_NAME|NEW_NAME"
-
-        old_name = name_parts[0].strip()
-        new_name = name_parts[1].strip()
+        category = Category.objects.get(store=store, name=old_name)
+    except Category.DoesNotExist:
+        return f"Category '{old_name}' not found in your store."
 
-        # Check if old category exists
-        try:
-            category = Category.objects.get(store=store, name=old_name)
-
-            # Check if new name already exists (but isn't the same category)
-            existing_category = Category.objects.filter(
-                store=store, name=new_name
-            ).first()
-            if existing_category and existing_category.id != category.id:
-                return f"Cannot update: A category named '{new_name}' already exists."
-
-            # Update the category
-            category.name = new_name
-            category.save()
-
-            return f"Category updated successfully!\nID: {category.id}\nNew Name: {new_name}"
+    # Check if new name already exists (but isn't the same category)
+    existing_category = Category.objects.filter(store=store, name=new_name).first()
+    if existing_category and existing_category.id != category.id:
+        return f"Cannot update: A category named '{new_name}' already exists."
 
-        except Category.DoesNotExist:
-            return f"Category '{old_name}' not found in your store."
+    # Update the category
+    category.name = new_name
+    category.save()
+    bump_store_version(store.id)
 
-    except Exception as e:
-        return f"Error updating category: {str(e)}"
+    return f"Category updated successfully!\nID: {category.id}\nNew Name: {new_name}"
 
 
-def handle_delete_category(store, message_parts):
+@commands.command("delete category", "Delete a category", args=[Arg("NAME")])
+def handle_delete_category(context, name):
     """Handle the delete category command"""
-    # Expected format: delete category NAME
+    store = context.store
     try:
-        if len(message_parts) < 3:
-            return "Invalid format. Use: delete category NAME"
-
-        category_name = message_parts[2].strip()
-
-        try:
-            # Find the category
-            category = Category.objects.get(store=store, name=category_name)
+        category = Category.objects.get(store=store, name=name)
+    except Category.DoesNotExist:
+        return f"Category '{name}' not found in your store."
 
-            # Check if products are using this category
-            product_count = Product.objects.filter(category=category).count()
-            if product_count > 0:
-                return f"Cannot delete: Category '{category_name}' is used by {product_count} products. Update these products first."
+    # Check if products are using this category
+    product_count = Product.objects.filter(category=category).count()
+    if product_count > 0:
+        return f"Cannot delete: Category '{name}' is used by {product_count} products. Update these products first."
 
-            # Delete the category
-            category_id = category.id
-            category.delete()
+    # Delete the category
+    category_id = category.id
+    category.delete()
+    bump_store_version(store.id)
 
-            return (
-                f"Category '{category_name}' (ID: {category_id}) deleted successfully."
-            )
-
-        except Category.DoesNotExist:
-            return f"Category '{category_name}' not found in your store."
-
-    except Exception as e:
-        return f"Error deleting category: {str(e)}"
+    return f"Category '{name}' (ID: {category_id}) deleted successfully."
 
 
-@csrf_exempt
-def message(request):
-    user_whatsapp = request.POST.get("From")
-    message_body = request.POST.get("Body", "").strip()
-    num_media = int(request.POST.get("NumMedia", 0))
-    response = MessagingResponse()
+def build_reply(payload):
+    """
+    Run the command in an inbound WhatsApp message (the webhook's POST fields)
+    and return the reply text. Called from the Celery worker, never inside the
+    webhook request.
+    """
+    user_whatsapp = payload.get("From", "")
+    message_body = payload.get("Body", "").strip()
+    num_media = int(payload.get("NumMedia", 0))
 
-    # Identify the seller from their WhatsApp number
-    seller = get_seller_from_whatsapp(user_whatsapp)
+    # Identify the seller and their store from their WhatsApp number
+    seller, store = get_seller_and_store(user_whatsapp)
 
     if not seller:
-        response.message(
+        return (
             "Sorry, your WhatsApp number is not registered with any seller account. "
             "Please register your WhatsApp number in your dashboard settings."
         )
-        return HttpResponse(str(response))
-
-    # Get the seller's store
-    store = get_store_for_seller(seller)
 
     if not store:
-        response.message(
-            "You don't have a store set up yet. Please create a store in the platform first."
-        )
-        return HttpResponse(str(response))
+        return "You don't have a store set up yet. Please create a store in the platform first."
 
     # Check if there's an image without caption (or with empty caption)
     if num_media > 0 and not message_body:
@@ -502,123 +481,68 @@ def message(request):
 
             # Process the images for the latest product
             image_count, errors = process_media_to_images(
-                request, latest_product, num_media
+                payload, latest_product, num_media
             )
 
             result_message = f"Added {image_count} image(s) to your latest product '{latest_product.name}'."
             if errors:
                 result_message += "\nSome errors occurred during image processing."
 
-            response.message(result_message)
-            return HttpResponse(str(response))
+            return result_message
 
         except Product.DoesNotExist:
-            response.message(
-                "You don't have any products yet. Please create a product first."
-            )
-            return HttpResponse(str(response))
-
-    # Process text commands
-    message_parts = message_body.lower().split(" ", 2)
-    command = message_parts[0] if message_parts else ""
-    # ✅
-    # Process various commands
-    if message_body.lower() == "help":
-        help_text = f"Welcome to *{store.name}*\n\n *Available commands*:\n\n"
-        for cmd, desc in COMMANDS.items():
-            help_text += f"*{cmd}* - {desc}\n\n"
-        response.message(help_text)
-    elif message_body.lower().startswith("ai "):
-        ai_response = handle_ai(message_body)
-        ai_response = "*AI Response:*\n\n" + ai_response
-        response.message(ai_response)
-        return HttpResponse(str(response))
-
-    elif message_body.lower() == "orders":
-        # Get recent orders
-        recent_orders = Order.objects.filter(store=store).order_by("-created_at")[:6]
-        response.message(format_order_list(recent_orders))
-
-    elif message_body.lower() == "products":
-        # Get products list
-        products = Product.objects.filter(store=store)
-        response.message(format_product_list(products))
-
-    elif message_body.lower() == "categories":
-        # Get categories list
-        categories = Category.objects.filter(store=store)
-        response.message(format_category_list(categories))
-
-    elif message_body.lower().startswith("add product"):
-        # Create the product
-        product, result_message = handle_add_product(store, message_parts)
-
-        # If product creation was successful and there are images, process them
-        if product and num_media > 0:
-            image_count, errors = process_media_to_images(request, product, num_media)
-
-            # Add image results to the response message
-            result_message += f"\n\n{image_count} images added to product."
-            if errors:
-                result_message += "\nSome errors occurred during image processing."
-
-        response.message(result_message)
-
-    elif message_body.lower().startswith("update product"):
-        result = handle_update_product(store, message_parts)
-        response.message(result)
-
-    elif message_body.lower().startswith("delete product"):
-        result = handle_delete_product(store, message_parts)
-        response.message(result)
-
-    elif message_body.lower().startswith("add category"):
-        result = handle_add_category(store, message_parts)
-        response.message(result)
-
-    elif message_body.lower().startswith("edit category"):
-        result = handle_edit_category(store, message_parts)
-        response.message(result)
-
-    elif message_body.lower().startswith("delete category"):
-        result = handle_delete_category(store, message_parts)
-        response.message(result)
-
-    elif message_body.lower() == "stats":
-        stats = get_store_stats(store)
-        response.message(stats)
-
-    # Handle image uploads for existing products with format "product ID" + images
-    elif message_body.lower().startswith("product ") and num_media > 0:
-        try:
-            # Extract product ID
-            product_id = int(message_body.split("product ")[1].strip())
-
-            try:
-                # Get the product
-                product = Product.objects.get(id=product_id, store=store)
-
-                # Process the images
-                image_count, errors = process_media_to_images(
-                    request, product, num_media
-                )
-
-                result_message = f"Added {image_count} images to '{product.name}'."
-                if errors:
-                    result_message += "\nSome errors occurred during image processing."
-
-                response.message(result_message)
-            except Product.DoesNotExist:
-                response.message(
-                    f"Product with ID {product_id} not found in your store."
-                )
-        except (IndexError, ValueError):
-            response.message("Invalid format. Use: product [ID] and attach images.")
-
-    else:
-        response.message(
+            return "You don't have any products yet. Please create a product first."
+
+    # Commands are matched case-insensitively; arguments have always been
+    # lower-cased along with them.
+    context = Context(payload=payload, seller=seller, store=store, num_media=num_media)
+    reply = commands.dispatch(message_body.lower(), context)
+    if reply is None:
+        reply = (
             f"Hello {seller.full_name}! Welcome to *{store.name}* WhatsApp manager.\n\n"
             "Type *'help'* to see available commands."
         )
+    return reply
+
+
+def _has_valid_signature(request):
+    if not settings.TWILIO_VALIDATE_SIGNATURE:
+        return True
+    # Twilio signs the public URL it posted to; behind a TLS-terminating proxy
+    # that differs from what Django sees, so it can be configured.
+    url = settings.WHATSAPP_WEBHOOK_URL or request.build_absolute_uri()
+    validator = RequestValidator(settings.TWILIO_AUTH_TOKEN)
+    return validator.validate(
+        url, request.POST, request.META.get("HTTP_X_TWILIO_SIGNATURE", "")
+    )
+
+
+@csrf_exempt
+def message(request):
+    """
+    Twilio webhook. Validates and records the message, queues it for the
+    worker and acknowledges straight away with empty TwiML; the reply is sent
+    later through the REST API. Retries of the same MessageSid are ignored.
+    """
+    if request.method != "POST":
+        return HttpResponse(status=405)
+    if not _has_valid_signature(request):
+        return HttpResponse("Invalid Twilio signature", status=403)
+
+    message_sid = request.POST.get("MessageSid")
+    if not message_sid:
+        return HttpResponse("Missing MessageSid", status=400)
+
+    inbound, created = InboundMessage.objects.get_or_create(
+        message_sid=message_sid,
+        defaults={
+            "sender": request.POST.get("From", ""),
+            "payload": request.POST.dict(),
+        },
+    )
+    if created:
+        from .tasks import process_whatsapp_message
+
+        transaction.on_commit(lambda: process_whatsapp_message.delay(inbound.id))
 
-    return HttpResponse(str(response))
+    return HttpResponse(str(MessagingResponse()), content_type="application/xml")